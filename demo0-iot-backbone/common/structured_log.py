@@ -0,0 +1,184 @@
+"""
+GEOINT Demo — IoT Backbone: Structured Logging
+===============================================
+JSON-lines logger shared by the sensor simulator and the alert processor.
+
+Calling a logger only checks the level and appends a tuple to an in-memory
+buffer. A background thread formats the records and writes them to stdout in
+one ``write`` + ``flush`` per batch, so a log call costs well under a
+microsecond on the publish hot path. Records at ``error`` and above wake the
+writer immediately.
+
+High-frequency events go through ``sampled()``, which emits the first of
+every ``LOG_SAMPLE_EVERY`` occurrences of a message and reports how many
+were suppressed since the last emitted one.
+
+If the writer falls behind by ``LOG_BUFFER_RECORDS`` records, new records
+are dropped (never blocking the caller) and the drop count is logged.
+
+Environment Variables:
+    LOG_LEVEL             debug | info | warning | error (default: info)
+    LOG_SAMPLE_EVERY      Emit 1 in N occurrences of sampled events (default: 100)
+    LOG_FLUSH_INTERVAL_S  Seconds between background writes (default: 0.5)
+    LOG_BUFFER_RECORDS    Pending records before new ones are dropped (default: 10000)
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, TextIO
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "critical": 50}
+
+LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "info").strip().lower()
+LOG_SAMPLE_EVERY: int = int(os.environ.get("LOG_SAMPLE_EVERY", "100"))
+LOG_FLUSH_INTERVAL_S: float = float(os.environ.get("LOG_FLUSH_INTERVAL_S", "0.5"))
+LOG_BUFFER_RECORDS: int = int(os.environ.get("LOG_BUFFER_RECORDS", "10000"))
+
+# One pending record: (unix time, level, message, fields)
+_Record = tuple[float, str, str, dict[str, Any]]
+
+
+class StructuredLogger:
+    """Level-filtered, sampled, buffered JSON-lines logger.
+
+    Instances are callable as ``log(level, message, **fields)`` so they drop
+    in for the per-service ``_log`` helpers.
+    """
+
+    def __init__(
+        self,
+        service: str | None = None,
+        *,
+        level: str = LOG_LEVEL,
+        sample_every: int = LOG_SAMPLE_EVERY,
+        flush_interval_s: float = LOG_FLUSH_INTERVAL_S,
+        max_pending: int = LOG_BUFFER_RECORDS,
+        stream: TextIO | None = None,
+    ) -> None:
+        if level not in LEVELS:
+            raise ValueError(f"Unknown log level {level!r}; expected one of {sorted(LEVELS)}")
+        self.service = service
+        self.threshold = LEVELS[level]
+        self.sample_every = max(1, sample_every)
+        self._flush_interval_s = flush_interval_s
+        self._max_pending = max_pending
+        self._stream = stream
+        self._pending: deque[_Record] = deque()
+        self._dropped = 0
+        # Sampling counters are updated without a lock; a lost increment under
+        # contention only shifts which occurrence gets emitted.
+        self._counts: dict[tuple[str, str], int] = {}
+        self._wake = threading.Event()
+        self._writer: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    # -- producer side ------------------------------------------------------
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS.get(level, 0) >= self.threshold
+
+    def __call__(self, level: str, msg: str, **fields: Any) -> None:
+        severity = LEVELS.get(level, 0)
+        if severity < self.threshold:
+            return
+        self._enqueue((time.time(), level, msg, fields), urgent=severity >= LEVELS["error"])
+
+    def sampled(self, level: str, msg: str, **fields: Any) -> None:
+        """Log 1 in ``sample_every`` occurrences of ``(level, msg)``."""
+        severity = LEVELS.get(level, 0)
+        if severity < self.threshold:
+            return
+        key = (level, msg)
+        seen = self._counts.get(key, 0)
+        self._counts[key] = seen + 1
+        if seen % self.sample_every:
+            return
+        if seen:
+            fields["sampled"] = f"1/{self.sample_every}"
+            fields["suppressed"] = self.sample_every - 1
+        self._enqueue((time.time(), level, msg, fields), urgent=severity >= LEVELS["error"])
+
+    def _enqueue(self, record: _Record, urgent: bool) -> None:
+        if len(self._pending) >= self._max_pending:
+            self._dropped += 1
+            return
+        self._pending.append(record)
+        if self._writer is None:
+            self._start_writer()
+        if urgent:
+            self._wake.set()
+
+    # -- writer side ---------------------------------------------------------
+
+    def _start_writer(self) -> None:
+        with self._start_lock:
+            if self._writer is not None or self._closed:
+                return
+            self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._writer.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self._flush_interval_s)
+            self._wake.clear()
+            self._drain()
+
+    def _format(self, record: _Record) -> str:
+        ts, level, msg, fields = record
+        out: dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+            "level": level.upper(),
+        }
+        if self.service is not None:
+            out["service"] = self.service
+        out["message"] = msg
+        out.update(fields)
+        return json.dumps(out, default=str)
+
+    def _drain(self) -> None:
+        pending = self._pending
+        lines: list[str] = []
+        while pending:
+            lines.append(self._format(pending.popleft()))
+        if self._dropped:
+            dropped, self._dropped = self._dropped, 0
+            lines.append(self._format((time.time(), "warning", "Log records dropped", {"dropped": dropped})))
+        if not lines:
+            return
+        stream = self._stream or sys.stdout
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except (OSError, ValueError):
+            # stdout closed during interpreter shutdown
+            pass
+
+    def flush(self) -> None:
+        """Write everything buffered so far from the calling thread."""
+        self._drain()
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join(timeout=2.0)
+        self._drain()
+
+    def _after_fork(self) -> None:
+        # The writer thread does not survive fork; start a fresh one on demand
+        self._writer = None
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
@@ -0,0 +1,167 @@
+"""
+GEOINT Demo — IoT Backbone: Alert Store
+========================================
+Bounded, indexed in-memory history of accepted alerts behind ``GET /alerts``.
+
+Every alert gets a sequence number on arrival. Records live in a ring of
+``capacity`` slots; the oldest is evicted when the ring is full. Because
+alerts arrive in ``received_at`` order, the sequence is also the time index:
+``since`` queries walk back from the newest alert and stop at the first older
+one.
+
+Secondary indexes map ``sensor_type``, ``grid_ref`` and a fixed lat/lon cell
+grid to ascending deques of sequence numbers. Eviction pops the evicted
+alert's entries from the left of each deque, so they never hold stale
+entries and cost O(1) per alert. A query walks whichever matching index is
+smallest, newest first, and checks the remaining filters per record. Pages
+are cut with an opaque cursor (the last sequence number returned).
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from collections import deque
+from typing import Any, Deque, Iterable, Iterator, Optional
+
+Cell = tuple[int, int]
+BBox = tuple[float, float, float, float]  # min_lon, min_lat, max_lon, max_lat
+
+# Walk the cell index only when the bbox covers fewer cells than this;
+# beyond that a scan of the time index is cheaper than merging cell lists.
+_MAX_BBOX_CELLS = 400
+
+
+class AlertStore:
+    """Ring buffer of alerts with time, sensor type, grid_ref and cell indexes."""
+
+    def __init__(self, capacity: int, *, cell_deg: float = 0.01) -> None:
+        self.capacity = max(1, capacity)
+        self.cell_deg = cell_deg
+        self._slots: list[Optional[tuple[float, dict[str, Any]]]] = [None] * self.capacity
+        self._next_seq = 0
+        self._by_type: dict[str, Deque[int]] = {}
+        self._by_grid: dict[str, Deque[int]] = {}
+        self._by_cell: dict[Cell, Deque[int]] = {}
+
+    def __len__(self) -> int:
+        return min(self._next_seq, self.capacity)
+
+    @property
+    def oldest_seq(self) -> int:
+        return max(0, self._next_seq - self.capacity)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    # -- writes ----------------------------------------------------------------
+
+    @staticmethod
+    def _push(index: dict[Any, Deque[int]], key: Any, seq: int) -> None:
+        entries = index.get(key)
+        if entries is None:
+            entries = index[key] = deque()
+        entries.append(seq)
+
+    @staticmethod
+    def _evict(index: dict[Any, Deque[int]], key: Any) -> None:
+        entries = index[key]
+        entries.popleft()
+        if not entries:
+            del index[key]
+
+    def add(self, record: dict[str, Any], received_ts: float) -> int:
+        """Store ``record`` (received at epoch ``received_ts``); returns its sequence."""
+        seq = self._next_seq
+        slot = seq % self.capacity
+        evicted = self._slots[slot]
+        if evicted is not None:
+            old = evicted[1]
+            self._evict(self._by_type, old["sensor_type"])
+            self._evict(self._by_grid, old["grid_ref"])
+            self._evict(self._by_cell, self._cell(old["lat"], old["lon"]))
+        self._slots[slot] = (received_ts, record)
+        self._push(self._by_type, record["sensor_type"], seq)
+        self._push(self._by_grid, record["grid_ref"], seq)
+        self._push(self._by_cell, self._cell(record["lat"], record["lon"]), seq)
+        self._next_seq = seq + 1
+        return seq
+
+    # -- reads -----------------------------------------------------------------
+
+    def _newest_first(self, lists: list[Deque[int]]) -> Iterator[int]:
+        if len(lists) == 1:
+            return reversed(lists[0])
+        return heapq.merge(*(reversed(entries) for entries in lists), reverse=True)
+
+    def _candidates(
+        self,
+        bbox: Optional[BBox],
+        sensor_types: Optional[Iterable[str]],
+        grid_ref: Optional[str],
+        before: Optional[int],
+    ) -> Iterator[int]:
+        """Sequence numbers from the most selective applicable index."""
+        options: list[list[Deque[int]]] = []
+        if sensor_types is not None:
+            options.append([self._by_type[t] for t in set(sensor_types) if t in self._by_type])
+        if grid_ref is not None:
+            options.append([self._by_grid[grid_ref]] if grid_ref in self._by_grid else [])
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            row0, col0 = self._cell(min_lat, min_lon)
+            row1, col1 = self._cell(max_lat, max_lon)
+            if (row1 - row0 + 1) * (col1 - col0 + 1) <= _MAX_BBOX_CELLS:
+                cells = self._by_cell
+                options.append(
+                    [
+                        cells[(row, col)]
+                        for row in range(row0, row1 + 1)
+                        for col in range(col0, col1 + 1)
+                        if (row, col) in cells
+                    ]
+                )
+        if not options:
+            start = self._next_seq if before is None else min(before, self._next_seq)
+            return iter(range(start - 1, self.oldest_seq - 1, -1))
+        best = min(options, key=lambda lists: sum(len(entries) for entries in lists))
+        return self._newest_first(best)
+
+    def query(
+        self,
+        *,
+        since: Optional[float] = None,
+        bbox: Optional[BBox] = None,
+        sensor_types: Optional[Iterable[str]] = None,
+        grid_ref: Optional[str] = None,
+        before: Optional[int] = None,
+        limit: int = 50,
+    ) -> tuple[list[dict[str, Any]], Optional[int]]:
+        """Newest-first page of matching alerts and the cursor for the next page.
+
+        ``before`` is the cursor from a previous page; ``None`` starts at the
+        newest alert. The returned cursor is ``None`` on the last page.
+        """
+        types = frozenset(sensor_types) if sensor_types is not None else None
+        page: list[dict[str, Any]] = []
+        last_seq: Optional[int] = None
+        for seq in self._candidates(bbox, types, grid_ref, before):
+            if before is not None and seq >= before:
+                continue
+            received_ts, record = self._slots[seq % self.capacity]  # type: ignore[misc]
+            if since is not None and received_ts < since:
+                break
+            if types is not None and record["sensor_type"] not in types:
+                continue
+            if grid_ref is not None and record["grid_ref"] != grid_ref:
+                continue
+            if bbox is not None and not (
+                bbox[0] <= record["lon"] <= bbox[2] and bbox[1] <= record["lat"] <= bbox[3]
+            ):
+                continue
+            if len(page) == limit:
+                # One more match exists, so there is a next page
+                return page, last_seq
+            page.append(record)
+            last_seq = seq
+        return page, None
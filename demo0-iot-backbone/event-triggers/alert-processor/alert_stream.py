@@ -0,0 +1,141 @@
+"""
+GEOINT Demo — IoT Backbone: Alert Stream
+=========================================
+Server-Sent Events fan-out of newly accepted alerts behind
+``GET /alerts/stream``.
+
+Each alert is serialised once into a ready-to-send SSE frame. Every
+subscriber gets a reference to that frame in its own bounded queue. Its
+writer wakes at most once per ``flush_s`` and sends everything queued as one
+chunk, so socket writes scale with viewers × flushes rather than viewers ×
+alerts. A
+subscriber that falls behind loses its oldest frames rather than holding
+memory or slowing anyone else down. Before its next frames it is sent a
+``dropped`` event with the number it missed, so a dashboard knows to backfill
+from ``/alerts``. Per-subscriber filters run against the shared record and
+never re-serialise it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Optional
+
+AlertFilter = Callable[[dict[str, Any]], bool]
+
+_HEARTBEAT = b": keepalive\n\n"
+
+
+class Subscriber:
+    """One connected viewer: a bounded frame queue and a wake-up event."""
+
+    def __init__(self, queue_size: int, accept: Optional[AlertFilter]) -> None:
+        self.frames: Deque[bytes] = deque()
+        self.queue_size = queue_size
+        self.accept = accept
+        self.ready = asyncio.Event()
+        self.dropped = 0  # since the last ``dropped`` event was sent
+        self.dropped_total = 0
+
+    def offer(self, frame: bytes) -> bool:
+        """Queue ``frame``; True if an older frame had to be dropped for it."""
+        dropped = len(self.frames) >= self.queue_size
+        if dropped:
+            # Slow consumer: keep the newest alerts, shed the oldest
+            self.frames.popleft()
+            self.dropped += 1
+            self.dropped_total += 1
+        self.frames.append(frame)
+        self.ready.set()
+        return dropped
+
+    def take(self) -> bytes:
+        """Everything queued, as one chunk, prefixed by a drop notice if needed."""
+        chunks = []
+        if self.dropped:
+            chunks.append(b'event: dropped\ndata: {"count": %d}\n\n' % self.dropped)
+            self.dropped = 0
+        chunks.extend(self.frames)
+        self.frames.clear()
+        self.ready.clear()
+        return b"".join(chunks)
+
+
+class AlertBroadcaster:
+    """Serialise-once, bounded-queue fan-out to SSE subscribers."""
+
+    def __init__(
+        self,
+        *,
+        queue_size: int = 256,
+        max_subscribers: int = 1000,
+        heartbeat_s: float = 15.0,
+        flush_s: float = 0.1,
+    ) -> None:
+        self.queue_size = queue_size
+        self.flush_s = flush_s
+        self.max_subscribers = max_subscribers
+        self.heartbeat_s = heartbeat_s
+        self._subscribers: set[Subscriber] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, seq: int, record: dict[str, Any]) -> None:
+        """Queue ``record`` for every interested subscriber (no-op if none)."""
+        if not self._subscribers:
+            return
+        frame: Optional[bytes] = None
+        for sub in self._subscribers:
+            if sub.accept is not None and not sub.accept(record):
+                continue
+            if frame is None:
+                frame = b"id: %d\nevent: alert\ndata: %s\n\n" % (seq, json.dumps(record).encode())
+            self.dropped += sub.offer(frame)
+        if frame is not None:
+            self.published += 1
+
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self, accept: Optional[AlertFilter] = None) -> Optional[Subscriber]:
+        """Register a subscriber, or None when ``max_subscribers`` are connected."""
+        if self.full():
+            return None
+        sub = Subscriber(self.queue_size, accept)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subscribers.discard(sub)
+
+    async def stream(self, accept: Optional[AlertFilter] = None) -> AsyncIterator[bytes]:
+        """SSE body for a new subscriber: batched frames as they arrive, heartbeats when idle.
+
+        The subscriber only exists while the body is being iterated. A viewer
+        that disconnects before the first chunk is never registered, so it
+        cannot leak.
+        """
+        sub = None
+        try:
+            sub = self.subscribe(accept)
+            if sub is None:
+                # Filled up since the endpoint checked
+                return
+            yield b"retry: 2000\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(sub.ready.wait(), timeout=self.heartbeat_s)
+                except asyncio.TimeoutError:
+                    yield _HEARTBEAT
+                    continue
+                # Let the rest of this burst queue up behind the first alert
+                await asyncio.sleep(self.flush_s)
+                yield sub.take()
+        finally:
+            if sub is not None:
+                self.unsubscribe(sub)
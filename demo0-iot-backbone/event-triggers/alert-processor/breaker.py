@@ -0,0 +1,151 @@
+"""
+GEOINT Demo — IoT Backbone: Dispatch Circuit Breaker
+=====================================================
+Closed / open / half-open breaker guarding calls to the vision pipeline.
+
+While closed, every call goes through and its outcome lands in a sliding
+window. Once the window holds at least ``min_calls`` outcomes and either the
+failure rate or the slow-call rate (calls slower than ``slow_call_s``) reaches
+its threshold, the breaker opens. An open breaker rejects calls for
+``open_s`` seconds, then turns half-open and lets ``half_open_probes`` trial
+calls through: if they all succeed it closes, and any failure re-opens it.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Failure-rate and latency circuit breaker for one downstream service."""
+
+    def __init__(
+        self,
+        *,
+        window_s: float = 30.0,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_s: float = 2.0,
+        slow_call_rate: float = 0.8,
+        open_s: float = 15.0,
+        half_open_probes: int = 3,
+        on_change: Optional[Callable[[str, str], None]] = None,
+    ) -> None:
+        self.window_s = window_s
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_s = slow_call_s
+        self.slow_call_rate = slow_call_rate
+        self.open_s = open_s
+        self.half_open_probes = half_open_probes
+        self._on_change = on_change
+        self._state = CLOSED
+        self._opened_at = 0.0
+        # (finished_at, failed, slow) per call in the sliding window
+        self._calls: Deque[tuple[float, bool, bool]] = deque()
+        self._failures = 0
+        self._slow = 0
+        self._probes_issued = 0
+        self._probes_passed = 0
+        self.opened_count = 0
+        self.rejected = 0
+
+    # -- state -----------------------------------------------------------------
+
+    @property
+    def state(self) -> str:
+        """Current state; an expired open period turns half-open on the next ``allow``."""
+        return self._state
+
+    def _maybe_transition(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_s:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        previous, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.opened_count += 1
+        if state in (HALF_OPEN, CLOSED):
+            self._probes_issued = self._probes_passed = 0
+        if state == CLOSED:
+            self._calls.clear()
+            self._failures = self._slow = 0
+        if self._on_change is not None and previous != state:
+            self._on_change(previous, state)
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker turns half-open (0 otherwise)."""
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self.open_s - (time.monotonic() - self._opened_at))
+
+    # -- calls -----------------------------------------------------------------
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; half-open admits a few probes.
+
+        Every admitted call must be settled with ``record``, whatever its fate.
+        """
+        self._maybe_transition()
+        state = self._state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes_issued < self.half_open_probes:
+            self._probes_issued += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, ok: bool, latency_s: float) -> None:
+        """Feed back the outcome of a call admitted by ``allow``."""
+        slow = latency_s >= self.slow_call_s
+        if self._state == HALF_OPEN:
+            if not ok or slow:
+                self._transition(OPEN)
+            else:
+                self._probes_passed += 1
+                if self._probes_passed >= self.half_open_probes:
+                    self._transition(CLOSED)
+            return
+        if self._state == OPEN:
+            # A call admitted before the breaker opened finished late
+            return
+        now = time.monotonic()
+        self._calls.append((now, not ok, slow))
+        self._failures += not ok
+        self._slow += slow
+        self._evict(now)
+        total = len(self._calls)
+        if total >= self.min_calls and (
+            self._failures / total >= self.failure_rate or self._slow / total >= self.slow_call_rate
+        ):
+            self._transition(OPEN)
+
+    def _evict(self, now: float) -> None:
+        calls = self._calls
+        horizon = now - self.window_s
+        while calls and calls[0][0] < horizon:
+            _, failed, slow = calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def snapshot(self) -> dict[str, Any]:
+        """Breaker state for ``/health``."""
+        state = self._state
+        self._evict(time.monotonic())
+        total = len(self._calls)
+        return {
+            "state": state,
+            "window_calls": total,
+            "failure_rate": round(self._failures / total, 3) if total else 0.0,
+            "slow_call_rate": round(self._slow / total, 3) if total else 0.0,
+            "retry_in_s": round(self.retry_in(), 1),
+            "opened_total": self.opened_count,
+        }
@@ -0,0 +1,158 @@
+"""
+GEOINT Demo — IoT Backbone: Alert Coalescing
+=============================================
+Spatio-temporal grouping of alerts ahead of vision job dispatch. During a
+convoy or anomaly scenario many sensors around the same location fire within
+seconds; dispatching each one re-runs inference over the same imagery.
+
+The first alert at a location opens a group and starts its window. Any alert
+that arrives before the window closes in the same grid cell, or in one of the
+eight cells around it, joins that group. When the window closes the group is
+handed to ``on_flush`` as one job listing every contributing sensor.
+
+Cells are a fixed metric grid over lat/lon (``cell_m`` on a side), so the
+index is a plain dict keyed by integer cell coordinates and lookups are nine
+dict probes.
+
+An alert is held against its group (``hold``) until its journal write
+settles (``settle``): only then does it join the job, and a window that
+closes while alerts are still held waits for them. A group whose alerts were
+all withdrawn is dropped rather than dispatched.
+
+A window of 0 turns coalescing off: every alert gets a group of its own,
+even alerts for the same place accepted in one batch.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+Cell = tuple[int, int]
+
+# Metres per degree of latitude (and of longitude at the equator)
+_M_PER_DEG = 111_320.0
+
+
+@dataclass
+class AlertGroup:
+    """Alerts merged into one vision job while its window is open."""
+
+    job_id: str
+    cell: Cell
+    opened_at: float = field(default_factory=time.monotonic)
+    # Latest alert per contributing sensor, in arrival order
+    sensors: dict[str, dict[str, Any]] = field(default_factory=dict)
+    alert_count: int = 0
+    # Running sums over ``sensors`` so the centroid is O(1) to read
+    lat_sum: float = 0.0
+    lon_sum: float = 0.0
+    # Alerts held for this group whose journal write has not settled yet
+    pending: int = 0
+    _timer: Optional[asyncio.TimerHandle] = field(default=None, repr=False)
+
+    def add(self, alert: dict[str, Any]) -> None:
+        previous = self.sensors.get(alert["sensor_id"])
+        if previous is not None:
+            self.lat_sum -= previous["lat"]
+            self.lon_sum -= previous["lon"]
+        self.sensors[alert["sensor_id"]] = alert
+        self.lat_sum += alert["lat"]
+        self.lon_sum += alert["lon"]
+        self.alert_count += 1
+
+    def centroid(self) -> tuple[float, float]:
+        n = len(self.sensors)
+        return self.lat_sum / n, self.lon_sum / n
+
+
+class Coalescer:
+    """Grid-cell index of open alert groups with per-group flush timers."""
+
+    def __init__(
+        self,
+        window_s: float,
+        cell_m: float,
+        on_flush: Callable[[AlertGroup], None],
+    ) -> None:
+        self.window_s = max(0.0, window_s)
+        self.cell_m = cell_m
+        self._on_flush = on_flush
+        self._lat_step = cell_m / _M_PER_DEG
+        self._open: dict[Cell, AlertGroup] = {}
+        # With a zero window groups are never found, only flushed; by job_id
+        self._unindexed: dict[str, AlertGroup] = {}
+
+    def __len__(self) -> int:
+        return len(self._open) + len(self._unindexed)
+
+    def _lon_step(self, row: int) -> float:
+        # Longitude cell width for a latitude row, taken at the row's centre so
+        # every point in the row maps to the same columns
+        lat = (row + 0.5) * self._lat_step
+        return self.cell_m / (_M_PER_DEG * max(math.cos(math.radians(lat)), 1e-6))
+
+    def cell_of(self, lat: float, lon: float) -> Cell:
+        row = math.floor(lat / self._lat_step)
+        return row, math.floor(lon / self._lon_step(row))
+
+    def find(self, lat: float, lon: float) -> Optional[AlertGroup]:
+        """The open group anchored in this cell or a neighbouring one."""
+        if not self._open or self.window_s == 0:
+            return None
+        row = math.floor(lat / self._lat_step)
+        for r in (row, row - 1, row + 1):
+            col = math.floor(lon / self._lon_step(r))
+            for c in (col, col - 1, col + 1):
+                group = self._open.get((r, c))
+                if group is not None:
+                    return group
+        return None
+
+    def open(self, job_id: str, lat: float, lon: float) -> AlertGroup:
+        """Start a new group anchored at the cell containing (lat, lon)."""
+        group = AlertGroup(job_id, self.cell_of(lat, lon))
+        if self.window_s == 0:
+            self._unindexed[job_id] = group
+        else:
+            self._open[group.cell] = group
+        group._timer = asyncio.get_running_loop().call_later(self.window_s, self._flush, group)
+        return group
+
+    def hold(self, group: AlertGroup) -> None:
+        """Reserve a place in ``group`` for an alert that is not durable yet."""
+        group.pending += 1
+
+    def settle(self, group: AlertGroup, alert: Optional[dict[str, Any]]) -> None:
+        """Add a held alert once it is durable, or withdraw it (``None``)."""
+        group.pending -= 1
+        if alert is not None:
+            group.add(alert)
+        if group.pending == 0 and group._timer is None:
+            # The window closed while this alert was held
+            self._finish(group)
+
+    def _flush(self, group: AlertGroup) -> None:
+        if self._open.get(group.cell) is group:
+            del self._open[group.cell]
+        self._unindexed.pop(group.job_id, None)
+        group._timer = None
+        if group.pending == 0:
+            self._finish(group)
+
+    def _finish(self, group: AlertGroup) -> None:
+        if group.sensors:
+            self._on_flush(group)
+
+    def close(self) -> int:
+        """Cancel open windows without flushing; returns how many were open."""
+        groups = [*self._open.values(), *self._unindexed.values()]
+        for group in groups:
+            if group._timer is not None:
+                group._timer.cancel()
+        self._open.clear()
+        self._unindexed.clear()
+        return len(groups)
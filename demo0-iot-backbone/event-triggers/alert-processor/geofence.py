@@ -0,0 +1,242 @@
+"""
+GEOINT Demo — IoT Backbone: Geofence Index
+===========================================
+In-memory point-in-polygon lookup of the named areas of interest (NAIs) an
+alert falls in, so each alert is tagged without a database round trip.
+
+Areas come from the ``named_areas`` PostGIS table (demo2's
+``01-init-schema.sql``) or a GeoJSON FeatureCollection file. With neither
+configured, the seed areas from that schema are used. An index is immutable
+once built. A refresh builds a new one and swaps it in whole, so lookups
+never see a half-loaded set.
+
+The index is a uniform lat/lon grid. Each cell lists the areas that reach
+it, ordered by priority. A cell that no polygon edge touches is classified
+once at build time: wholly inside (listed, no test needed) or wholly outside
+(not listed). A boundary cell keeps only the edges a rightward ray from
+inside that cell could cross. A lookup is therefore one dict probe plus a
+ray cast over a handful of edges, however detailed the polygon. An area whose
+bounding box would cover more than ``_MAX_AREA_CELLS`` cells is not gridded;
+it is ray cast in full on every lookup instead.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+Cell = tuple[int, int]
+Edge = tuple[float, float, float, float]  # lon1, lat1, lon2, lat2
+# (area, edges to ray cast); None means the whole cell is inside the area
+CellEntry = tuple["NamedArea", Optional[tuple[Edge, ...]]]
+
+# Most urgent first; anything unrecognised ranks as "normal"
+PRIORITY_RANK = {"critical": 0, "high": 1, "normal": 2, "low": 3}
+
+_MAX_AREA_CELLS = 10_000
+
+NAMED_AREAS_SQL = (
+    "SELECT name, category, priority, ST_AsGeoJSON(geom) FROM named_areas WHERE geom IS NOT NULL"
+)
+
+# Seed rows of named_areas in demo2-geo-platform/postgis/init-scripts/01-init-schema.sql
+DEFAULT_AREAS: tuple[tuple[str, str, str, dict[str, Any]], ...] = (
+    (
+        "Pentagon Observation Zone",
+        "military",
+        "high",
+        {
+            "type": "Polygon",
+            "coordinates": [[[-77.06, 38.87], [-77.04, 38.87], [-77.04, 38.88], [-77.06, 38.88], [-77.06, 38.87]]],
+        },
+    ),
+    (
+        "Reagan Airport Approach",
+        "aviation",
+        "normal",
+        {
+            "type": "Polygon",
+            "coordinates": [[[-77.05, 38.84], [-77.03, 38.84], [-77.03, 38.86], [-77.05, 38.86], [-77.05, 38.84]]],
+        },
+    ),
+    (
+        "Potomac River Patrol",
+        "maritime",
+        "normal",
+        {
+            "type": "Polygon",
+            "coordinates": [[[-77.06, 38.85], [-77.04, 38.85], [-77.04, 38.87], [-77.06, 38.87], [-77.06, 38.85]]],
+        },
+    ),
+)
+
+
+def priority_rank(priority: Optional[str]) -> int:
+    return PRIORITY_RANK.get((priority or "normal").lower(), PRIORITY_RANK["normal"])
+
+
+def _ray_cast(edges: Iterable[Edge], lon: float, lat: float) -> bool:
+    """Even-odd rule: does a ray from (lon, lat) towards +lon cross an odd count?"""
+    inside = False
+    for x1, y1, x2, y2 in edges:
+        if (y1 > lat) != (y2 > lat) and lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1:
+            inside = not inside
+    return inside
+
+
+@dataclass(frozen=True)
+class NamedArea:
+    """One NAI polygon (or multipolygon), flattened to edges for ray casting."""
+
+    name: str
+    category: Optional[str]
+    priority: str
+    bbox: tuple[float, float, float, float]  # min_lon, min_lat, max_lon, max_lat
+    edges: tuple[Edge, ...] = field(repr=False)
+    # What an alert is tagged with; shared by every alert in the area
+    tag: dict[str, Any] = field(repr=False, compare=False)
+
+    @property
+    def rank(self) -> int:
+        return priority_rank(self.priority)
+
+    def contains(self, lon: float, lat: float) -> bool:
+        """Even-odd ray cast; holes and multipolygon parts fall out naturally."""
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        if not (min_lon <= lon <= max_lon and min_lat <= lat <= max_lat):
+            return False
+        return _ray_cast(self.edges, lon, lat)
+
+
+def make_area(name: str, category: Optional[str], priority: Optional[str], geometry: dict[str, Any]) -> NamedArea:
+    """Build a ``NamedArea`` from a GeoJSON Polygon or MultiPolygon geometry."""
+    kind = geometry.get("type")
+    if kind == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif kind == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError(f"area {name!r}: unsupported geometry type {kind!r}")
+    edges: list[Edge] = []
+    for rings in polygons:
+        for ring in rings:
+            points = [(float(p[0]), float(p[1])) for p in ring]
+            if len(points) < 3:
+                continue
+            if points[0] != points[-1]:
+                points.append(points[0])
+            edges.extend((x1, y1, x2, y2) for (x1, y1), (x2, y2) in zip(points, points[1:]) if y1 != y2)
+    if not edges:
+        raise ValueError(f"area {name!r}: empty geometry")
+    lons = [x for edge in edges for x in (edge[0], edge[2])]
+    lats = [y for edge in edges for y in (edge[1], edge[3])]
+    priority = (priority or "normal").lower()
+    return NamedArea(
+        name=name,
+        category=category,
+        priority=priority,
+        bbox=(min(lons), min(lats), max(lons), max(lats)),
+        edges=tuple(edges),
+        tag={"name": name, "category": category, "priority": priority},
+    )
+
+
+class GeofenceIndex:
+    """Immutable grid index over a set of named areas."""
+
+    def __init__(self, areas: Iterable[NamedArea], *, cell_deg: float = 0.01, source: str = "") -> None:
+        self.cell_deg = cell_deg
+        self.source = source
+        self.areas: tuple[NamedArea, ...] = tuple(sorted(areas, key=lambda a: (a.rank, a.name)))
+        cells: dict[Cell, list[CellEntry]] = {}
+        large: list[NamedArea] = []
+        for area in self.areas:
+            min_lon, min_lat, max_lon, max_lat = area.bbox
+            row0, col0 = self._cell(min_lat, min_lon)
+            row1, col1 = self._cell(max_lat, max_lon)
+            if (row1 - row0 + 1) * (col1 - col0 + 1) > _MAX_AREA_CELLS:
+                large.append(area)
+                continue
+            for cell, edges in self._rasterise(area, row0, row1, col0, col1):
+                cells.setdefault(cell, []).append((area, edges))
+        # Areas were added in priority order, so every cell list is sorted too
+        self._cells: dict[Cell, tuple[CellEntry, ...]] = {cell: tuple(found) for cell, found in cells.items()}
+        self._large = tuple(large)
+
+    def __len__(self) -> int:
+        return len(self.areas)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def _rasterise(
+        self, area: NamedArea, row0: int, row1: int, col0: int, col1: int
+    ) -> Iterable[tuple[Cell, Optional[tuple[Edge, ...]]]]:
+        """The cells ``area`` reaches, each with the edges a lookup must test."""
+        step = self.cell_deg
+        # Widen every cell a little so float rounding in _cell can't place a
+        # point just outside the band its edges were collected for
+        eps = step * 1e-6
+        for row in range(row0, row1 + 1):
+            band_lo, band_hi = row * step - eps, (row + 1) * step + eps
+            band = [e for e in area.edges if min(e[1], e[3]) <= band_hi and max(e[1], e[3]) >= band_lo]
+            if not band:
+                continue
+            touched: set[int] = set()
+            for x1, _, x2, _ in band:
+                touched.update(range(math.floor((min(x1, x2) - eps) / step), math.floor((max(x1, x2) + eps) / step) + 1))
+            centre_lat = (row + 0.5) * step
+            for col in range(col0, col1 + 1):
+                if col in touched:
+                    # Boundary cell: edges wholly west of it can't meet an eastward ray
+                    west = col * step - eps
+                    yield (row, col), tuple(e for e in band if max(e[0], e[2]) >= west)
+                elif _ray_cast(band, (col + 0.5) * step, centre_lat):
+                    yield (row, col), None
+
+    def lookup(self, lat: float, lon: float) -> list[NamedArea]:
+        """Areas containing (lat, lon), most urgent priority first."""
+        candidates = self._cells.get(self._cell(lat, lon), ())
+        found = [area for area, edges in candidates if edges is None or _ray_cast(edges, lon, lat)]
+        if self._large:
+            found.extend(area for area in self._large if area.contains(lon, lat))
+            found.sort(key=lambda a: a.rank)
+        return found
+
+
+# ---------------------------------------------------------------------------
+# Area sources (blocking; run them off the event loop)
+# ---------------------------------------------------------------------------
+
+
+def default_areas() -> list[NamedArea]:
+    return [make_area(*row) for row in DEFAULT_AREAS]
+
+
+def load_geojson(path: str) -> list[NamedArea]:
+    """Areas from a FeatureCollection with name/category/priority properties."""
+    with open(path, encoding="utf-8") as fh:
+        collection = json.load(fh)
+    areas = []
+    for n, feature in enumerate(collection.get("features", ())):
+        props = feature.get("properties") or {}
+        areas.append(
+            make_area(
+                props.get("name") or f"area-{n}",
+                props.get("category"),
+                props.get("priority"),
+                feature["geometry"],
+            )
+        )
+    return areas
+
+
+def load_postgis(dsn: str, timeout_s: float = 10.0) -> list[NamedArea]:
+    """Areas from the ``named_areas`` table; one query per refresh."""
+    import psycopg  # only needed when a PostGIS source is configured
+
+    with psycopg.connect(dsn, connect_timeout=max(1, int(timeout_s))) as conn:
+        rows = conn.execute(NAMED_AREAS_SQL).fetchall()
+    return [make_area(name, category, priority, json.loads(geojson)) for name, category, priority, geojson in rows]
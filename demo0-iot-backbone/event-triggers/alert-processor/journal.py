@@ -0,0 +1,220 @@
+"""
+GEOINT Demo — IoT Backbone: Alert Journal
+==========================================
+Durable record of accepted alerts and their vision dispatch state, so a
+restarted alert processor can rebuild its recent-alert buffer and resume
+jobs that were still queued or waiting on a retry.
+
+Storage is a SQLite database in WAL mode. Writes are group-committed: every
+insert/update issued within one commit interval lands in a single
+transaction (one fsync), executed off the event loop. Callers that need
+durability before acknowledging (``record_alerts``) await the commit of their
+batch; state updates are fire-and-forget and ride along with the next one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+# Dispatch states
+QUEUED = "queued"
+DISPATCHED = "dispatched"
+FAILED = "failed"
+DROPPED = "dropped"
+SHED = "shed"
+
+# Several alerts can share one job once they are coalesced, so alerts and
+# jobs are journaled separately. A job row only tracks dispatch state; its
+# request is rebuilt from the job's alerts on replay, so a growing group never
+# rewrites its whole request on every commit.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    alert_id    TEXT PRIMARY KEY,
+    job_id      TEXT NOT NULL,
+    received_at TEXT NOT NULL,
+    alert       TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_created ON alerts (created_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_job ON alerts (job_id);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    state       TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated_at);
+"""
+
+_INSERT_ALERT = (
+    "INSERT OR IGNORE INTO alerts (alert_id, job_id, received_at, alert, created_at) VALUES (?, ?, ?, ?, ?)"
+)
+_INSERT_JOB = (
+    "INSERT OR IGNORE INTO jobs (job_id, state, attempts, created_at, updated_at) VALUES (?, ?, 0, ?, ?)"
+)
+_UPDATE_JOB = "UPDATE jobs SET state = ?, attempts = ?, updated_at = ? WHERE job_id = ?"
+_PRUNE_JOBS = "DELETE FROM jobs WHERE state != ? AND updated_at < ?"
+_PRUNE_ALERTS = (
+    "DELETE FROM alerts WHERE created_at < ? AND job_id NOT IN (SELECT job_id FROM jobs WHERE state = ?)"
+)
+
+# Prune finished jobs at most this often (seconds)
+_PRUNE_INTERVAL_S = 300.0
+
+
+class PendingJob(NamedTuple):
+    job_id: str
+    alerts: list[dict[str, Any]]  # in arrival order
+    attempts: int
+
+
+class AlertJournal:
+    """Group-committed SQLite journal of alerts and dispatch state."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        commit_interval_s: float = 0.01,
+        synchronous_full: bool = True,
+        retention_s: float = 86400.0,
+    ) -> None:
+        self.path = path
+        self.commit_interval_s = commit_interval_s
+        self.retention_s = retention_s
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Only ever used from one thread at a time: startup reads, then the
+        # commit task's to_thread calls, which are strictly sequential
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if synchronous_full else 'NORMAL'}")
+        self._conn.executescript(_SCHEMA)
+        self._ops: list[tuple[str, tuple[Any, ...]]] = []
+        self._waiters: list[asyncio.Future[None]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._last_prune = 0.0
+        self._closing = False
+        self.commits = 0
+        self.committed_ops = 0
+
+    # -- reads (startup only) ------------------------------------------------
+
+    def pending(self) -> list[PendingJob]:
+        """Jobs accepted but never delivered or abandoned, oldest first."""
+        jobs = {
+            job_id: PendingJob(job_id, [], attempts)
+            for job_id, attempts in self._conn.execute(
+                "SELECT job_id, attempts FROM jobs WHERE state = ? ORDER BY created_at", (QUEUED,)
+            )
+        }
+        for job_id, alert in self._conn.execute(
+            "SELECT job_id, alert FROM alerts WHERE job_id IN (SELECT job_id FROM jobs WHERE state = ?) "
+            "ORDER BY created_at",
+            (QUEUED,),
+        ):
+            jobs[job_id].alerts.append(json.loads(alert))
+        return [job for job in jobs.values() if job.alerts]
+
+    def recent(self, limit: int) -> list[dict[str, Any]]:
+        """The ``limit`` most recently received alert records, oldest first."""
+        rows = self._conn.execute(
+            "SELECT alert FROM alerts ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [json.loads(alert) for (alert,) in reversed(rows)]
+
+    # -- writes ----------------------------------------------------------------
+
+    async def record_alerts(self, alerts: list[dict[str, Any]]) -> None:
+        """Journal newly accepted alerts (and the jobs they feed, if new).
+
+        Returns once the batch holding these writes is committed.
+        """
+        now = time.time()
+        ops = self._ops
+        for job_id in {alert["job_id"] for alert in alerts}:
+            ops.append((_INSERT_JOB, (job_id, QUEUED, now, now)))
+        for alert in alerts:
+            ops.append((_INSERT_ALERT, (alert["alert_id"], alert["job_id"], alert["received_at"], json.dumps(alert), now)))
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._wake.set()
+        await waiter
+
+    def mark(self, job_id: str, state: str, attempts: int) -> None:
+        """Record a dispatch state change in the next group commit."""
+        self._ops.append((_UPDATE_JOB, (state, attempts, time.time(), job_id)))
+        self._wake.set()
+
+    def _commit(self, ops: list[tuple[str, tuple[Any, ...]]]) -> None:
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            for sql, params in ops:
+                conn.execute(sql, params)
+            now = time.time()
+            if now - self._last_prune >= _PRUNE_INTERVAL_S:
+                conn.execute(_PRUNE_JOBS, (QUEUED, now - self.retention_s))
+                conn.execute(_PRUNE_ALERTS, (now - self.retention_s, QUEUED))
+                self._last_prune = now
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def _flush(self) -> None:
+        ops, self._ops = self._ops, []
+        waiters, self._waiters = self._waiters, []
+        if not ops:
+            return
+        try:
+            await asyncio.to_thread(self._commit, ops)
+        except Exception as exc:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+            raise
+        self.commits += 1
+        self.committed_ops += len(ops)
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            if not self._closing:
+                # Let the rest of this interval's writes join the batch
+                await asyncio.sleep(self.commit_interval_s)
+            self._wake.clear()
+            try:
+                await self._flush()
+            except Exception:
+                # Waiters already carry the error; keep committing later batches
+                pass
+            if self._closing:
+                return
+
+    # -- lifecycle ---------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="alert-journal")
+
+    async def close(self) -> None:
+        """Commit whatever is still buffered and close the database."""
+        self._closing = True
+        if self._task is not None:
+            self._wake.set()
+            await self._task
+            self._task = None
+        else:
+            await self._flush()
+        self._conn.close()
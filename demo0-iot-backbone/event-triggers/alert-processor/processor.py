@@ -5,50 +5,155 @@ FastAPI service that receives anomaly alert payloads from the Azure IoT
 Operations data pipeline and triggers downstream vision pipeline jobs.
 
 Endpoints:
-    POST /trigger  — Receive alert payload, dispatch vision pipeline job.
-    GET  /health   — Liveness / readiness probe.
-    GET  /alerts   — Return last 50 alerts (in-memory ring buffer).
+    POST /trigger  — Receive alert payload, coalesce it into a vision pipeline job.
+    GET  /health   — Liveness / readiness probe, with vision circuit breaker state.
+    GET  /alerts   — Query recent alerts (since, bbox, type, grid_ref filters;
+                     cursor pagination) from the in-memory alert store.
+    GET  /alerts/stream — Server-Sent Events push of new alerts (type, bbox filters).
+    GET  /metrics  — Dispatch queue metrics (Prometheus text format).
 
 Environment Variables:
     VISION_PIPELINE_URL  URL for demo1 vision pipeline job API
                          (default: http://demo1-vision-service:8080/jobs)
     ALERT_PROCESSOR_PORT HTTP port to bind on (default: 8080)
+    MAX_VISION_RETRIES   Dispatch attempts per job (default: 3)
+    VISION_RETRY_BASE_DELAY  First retry delay in seconds, doubled per attempt
+                         (default: 1.0)
+    VISION_TIMEOUT_S     Per-request timeout (default: 5.0)
+    VISION_HTTP2         Negotiate HTTP/2 with https endpoints (default: true)
+    VISION_MAX_CONNECTIONS  Connection pool size (default: 100)
+    VISION_MAX_KEEPALIVE Idle keep-alive connections kept open (default: 20)
+    VISION_MAX_CONCURRENT  Outstanding dispatch requests at once (default: 32)
+    DISPATCH_QUEUE_SIZE  Queued jobs before /trigger answers 503 for anything
+                         but jobs more urgent than the least urgent queued
+                         one, which displace it (default: 1000)
+    DISPATCH_WORKERS     Workers draining the dispatch queue (default: 8)
+    DISPATCH_PRIORITY_WEIGHTS  Scheduling weights of the critical, high, normal
+                         and low priority levels (default: 8,4,2,1)
+    DISPATCH_AGEING_S    Seconds a queued job waits at one priority level
+                         before moving up to the next (default: 5)
+    ALERT_STORE_SIZE     Alerts kept queryable via /alerts (default: 10000)
+    ALERT_STREAM_QUEUE   Alerts buffered per /alerts/stream viewer before its
+                         oldest are dropped (default: 256)
+    ALERT_STREAM_MAX_SUBSCRIBERS  Concurrent stream viewers (default: 1000)
+    ALERT_STREAM_HEARTBEAT_S  Keep-alive comment interval when idle (default: 15)
+    ALERT_STREAM_FLUSH_MS  Longest an alert waits to share a write with the
+                         alerts behind it (default: 100)
+    COALESCE_WINDOW_S    Seconds an alert group stays open for nearby alerts to
+                         join before its job is queued; 0 queues every alert
+                         on its own (default: 5.0)
+    COALESCE_CELL_M      Grid cell size in metres; alerts in the same or an
+                         adjacent cell share a group (default: 500)
+    PRIORITY_SENSOR_TYPES  Sensor types that raise an alert's priority
+                         (default: seismic,rf-detector)
+    PRIORITY_SEVERE_MAGNITUDE  Seismic magnitude that counts as severe (default: 4.0)
+    PRIORITY_SEVERE_POWER_DBM  RF power that counts as severe (default: -25)
+    BREAKER_FAILURE_RATE Failure share of recent calls that opens the breaker
+                         (default: 0.5)
+    BREAKER_SLOW_CALL_S  Calls at least this slow count as slow (default: 2.0)
+    BREAKER_SLOW_CALL_RATE  Slow share of recent calls that opens the breaker
+                         (default: 0.8)
+    BREAKER_WINDOW_S     Sliding window the rates are computed over (default: 30)
+    BREAKER_MIN_CALLS    Calls in the window before the breaker may open
+                         (default: 10)
+    BREAKER_OPEN_S       Seconds the breaker stays open before probing
+                         (default: 15)
+    BREAKER_HALF_OPEN_PROBES  Successful probes needed to close again (default: 3)
+    BREAKER_PARK_SIZE    Jobs above low priority held while the breaker is open;
+                         beyond this they are shed too (default: 1000)
+    ALERT_JOURNAL_PATH   SQLite journal of accepted alerts and dispatch state,
+                         replayed on startup; empty disables it
+                         (default: /data/alert-journal.db)
+    ALERT_JOURNAL_COMMIT_MS  Group-commit interval for journal writes (default: 10)
+    ALERT_JOURNAL_SYNC   SQLite synchronous mode, FULL or NORMAL (default: FULL)
+    ALERT_JOURNAL_RETENTION_H  Hours to keep finished jobs (default: 24)
+    GEOFENCE_POSTGIS_DSN libpq DSN of the PostGIS database whose named_areas
+                         tag alerts with the NAIs they fall in (default: unset)
+    GEOFENCE_FILE        GeoJSON FeatureCollection of named areas, used when no
+                         DSN is set; with neither, the named_areas seed rows
+                         from demo2's 01-init-schema.sql apply (default: unset)
+    GEOFENCE_REFRESH_S   Seconds between named area reloads; 0 loads once
+                         (default: 300)
+    GEOFENCE_CELL_DEG    Grid cell size of the area index in degrees
+                         (default: 0.01)
+    RULES_FILE           Threshold rules evaluated against raw telemetry (see
+                         rules.py and alert-rules.conf); unset disables them
+                         (default: unset)
+    RULES_TOPICS         Comma-separated telemetry topics the rules read
+                         (default: geoint/sensors/+/+/telemetry,
+                         geoint/sensors/+/envelope)
+    SHARD_COUNT          Replicas sharing the alert load; above 1 enables
+                         sharded mode: MQTT shared subscriptions, with each
+                         grid_ref consistently hashed to one owning replica
+                         (default: 1)
+    SHARD_ID             This replica's shard, 0 .. SHARD_COUNT-1 (default:
+                         the StatefulSet ordinal at the end of HOSTNAME)
+    SHARD_GROUP          Shared subscription group name (default: alert-processor)
+    SHARD_TOPIC_PREFIX   Alerts and readings for another shard are forwarded to
+                         <prefix>/<shard>/alerts and <prefix>/<shard>/telemetry
+                         (default: geoint/alert-processor/shards)
+    MQTT_BATCH_MAX       Alert messages validated and handed to the event loop
+                         together (default: 500)
+    MQTT_BATCH_LINGER_MS Longest a batch waits to fill after its first message
+                         (default: 5)
+    MQTT_ALERT_CLIENT_ID Client id of the bridge's persistent session, which
+                         keeps unacknowledged alerts across reconnects and
+                         restarts (default: alert-processor-<hostname>)
+    MQTT_JOURNAL_RETRIES Extra journal write attempts for an MQTT batch before
+                         it is left unacked for redelivery (default: 3)
+    LOG_LEVEL, LOG_SAMPLE_EVERY, LOG_FLUSH_INTERVAL_S, LOG_BUFFER_RECORDS
+                         Logging controls; see common/structured_log.py
 """
 
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import os
+import queue
+import socket
 import sys
+import threading
+import time
 import uuid
 from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Deque, Optional
+from typing import Any, Deque, Iterable, Optional
 
 import httpx
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from paho.mqtt import client as mqtt
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import from_json, to_json
+
+import breaker
+import geofence
+import journal
+import rules
+from alert_store import AlertStore, BBox
+from alert_stream import AlertBroadcaster
+from breaker import CircuitBreaker
+from coalesce import AlertGroup, Coalescer
+from geofence import GeofenceIndex
+from journal import AlertJournal
+from rules import RuleEngine
+from scheduler import WeightedPriorityQueue
+from sharding import HashRing, ordinal_from_hostname
+from structured_log import StructuredLogger
 
 # ---------------------------------------------------------------------------
 # Structured JSON logging
 # ---------------------------------------------------------------------------
 logging.basicConfig(level=logging.INFO, stream=sys.stdout)
 logger = logging.getLogger("alert-processor")
+# httpx logs every request at INFO; dispatch outcomes are logged by _dispatch_vision_job
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 
-def _log(level: str, msg: str, **kwargs: Any) -> None:
-    record: dict[str, Any] = {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "level": level.upper(),
-        "service": "alert-processor",
-        "message": msg,
-        **kwargs,
-    }
-    print(json.dumps(record), flush=True)
+# Buffered + level-filtered; per-alert routine events go through _log.sampled()
+_log = StructuredLogger("alert-processor")
 
 
 def _env_flag(name: str, default: bool = False) -> bool:
@@ -66,6 +171,47 @@ VISION_PIPELINE_URL: str = os.environ.get(
 )
 MAX_VISION_RETRIES: int = int(os.environ.get("MAX_VISION_RETRIES", "3"))
 VISION_RETRY_BASE_DELAY: float = float(os.environ.get("VISION_RETRY_BASE_DELAY", "1.0"))
+VISION_TIMEOUT_S: float = float(os.environ.get("VISION_TIMEOUT_S", "5.0"))
+VISION_HTTP2: bool = _env_flag("VISION_HTTP2", True)
+VISION_MAX_CONNECTIONS: int = int(os.environ.get("VISION_MAX_CONNECTIONS", "100"))
+VISION_MAX_KEEPALIVE: int = int(os.environ.get("VISION_MAX_KEEPALIVE", "20"))
+VISION_MAX_CONCURRENT: int = int(os.environ.get("VISION_MAX_CONCURRENT", "32"))
+DISPATCH_QUEUE_SIZE: int = int(os.environ.get("DISPATCH_QUEUE_SIZE", "1000"))
+DISPATCH_WORKERS: int = int(os.environ.get("DISPATCH_WORKERS", "8"))
+DISPATCH_PRIORITY_WEIGHTS: list[int] = [
+    int(w) for w in os.environ.get("DISPATCH_PRIORITY_WEIGHTS", "8,4,2,1").split(",") if w.strip()
+]
+if len(DISPATCH_PRIORITY_WEIGHTS) != 4:
+    raise ValueError("DISPATCH_PRIORITY_WEIGHTS needs four weights: critical,high,normal,low")
+DISPATCH_AGEING_S: float = float(os.environ.get("DISPATCH_AGEING_S", "5"))
+ALERT_STORE_SIZE: int = int(os.environ.get("ALERT_STORE_SIZE", "10000"))
+ALERT_STREAM_QUEUE: int = int(os.environ.get("ALERT_STREAM_QUEUE", "256"))
+ALERT_STREAM_MAX_SUBSCRIBERS: int = int(os.environ.get("ALERT_STREAM_MAX_SUBSCRIBERS", "1000"))
+ALERT_STREAM_HEARTBEAT_S: float = float(os.environ.get("ALERT_STREAM_HEARTBEAT_S", "15"))
+ALERT_STREAM_FLUSH_MS: float = float(os.environ.get("ALERT_STREAM_FLUSH_MS", "100"))
+COALESCE_WINDOW_S: float = float(os.environ.get("COALESCE_WINDOW_S", "5.0"))
+COALESCE_CELL_M: float = float(os.environ.get("COALESCE_CELL_M", "500"))
+PRIORITY_SENSOR_TYPES: frozenset[str] = frozenset(
+    t.strip() for t in os.environ.get("PRIORITY_SENSOR_TYPES", "seismic,rf-detector").split(",") if t.strip()
+)
+PRIORITY_SEVERE_MAGNITUDE: float = float(os.environ.get("PRIORITY_SEVERE_MAGNITUDE", "4.0"))
+PRIORITY_SEVERE_POWER_DBM: float = float(os.environ.get("PRIORITY_SEVERE_POWER_DBM", "-25"))
+BREAKER_FAILURE_RATE: float = float(os.environ.get("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_S: float = float(os.environ.get("BREAKER_SLOW_CALL_S", "2.0"))
+BREAKER_SLOW_CALL_RATE: float = float(os.environ.get("BREAKER_SLOW_CALL_RATE", "0.8"))
+BREAKER_WINDOW_S: float = float(os.environ.get("BREAKER_WINDOW_S", "30"))
+BREAKER_MIN_CALLS: int = int(os.environ.get("BREAKER_MIN_CALLS", "10"))
+BREAKER_OPEN_S: float = float(os.environ.get("BREAKER_OPEN_S", "15"))
+BREAKER_HALF_OPEN_PROBES: int = int(os.environ.get("BREAKER_HALF_OPEN_PROBES", "3"))
+BREAKER_PARK_SIZE: int = int(os.environ.get("BREAKER_PARK_SIZE", "1000"))
+ALERT_JOURNAL_PATH: str = os.environ.get("ALERT_JOURNAL_PATH", "/data/alert-journal.db")
+ALERT_JOURNAL_COMMIT_MS: float = float(os.environ.get("ALERT_JOURNAL_COMMIT_MS", "10"))
+ALERT_JOURNAL_SYNC: str = os.environ.get("ALERT_JOURNAL_SYNC", "FULL").strip().upper()
+ALERT_JOURNAL_RETENTION_H: float = float(os.environ.get("ALERT_JOURNAL_RETENTION_H", "24"))
+GEOFENCE_POSTGIS_DSN: str = os.environ.get("GEOFENCE_POSTGIS_DSN", "")
+GEOFENCE_FILE: str = os.environ.get("GEOFENCE_FILE", "")
+GEOFENCE_REFRESH_S: float = float(os.environ.get("GEOFENCE_REFRESH_S", "300"))
+GEOFENCE_CELL_DEG: float = float(os.environ.get("GEOFENCE_CELL_DEG", "0.01"))
 PORT: int = int(os.environ.get("ALERT_PROCESSOR_PORT", "") or "8080")
 MQTT_BRIDGE_ENABLED: bool = _env_flag("MQTT_ALERT_BRIDGE_ENABLED", True)
 MQTT_ALERT_HOST: str = os.environ.get("MQTT_ALERT_HOST", "aio-broker-nodeport")
@@ -73,13 +219,61 @@ MQTT_ALERT_PORT: int = int(os.environ.get("MQTT_ALERT_PORT", "1883"))
 MQTT_ALERT_TOPIC: str = os.environ.get(
     "MQTT_ALERT_TOPIC", "geoint/pipelines/alerts"
 )
+RULES_FILE: str = os.environ.get("RULES_FILE", "")
+RULES_TOPICS: list[str] = [
+    t.strip()
+    for t in os.environ.get("RULES_TOPICS", "geoint/sensors/+/+/telemetry,geoint/sensors/+/envelope").split(",")
+    if t.strip()
+]
+SHARD_COUNT: int = int(os.environ.get("SHARD_COUNT", "1"))
+SHARD_ID: Optional[int] = (
+    int(os.environ["SHARD_ID"]) if os.environ.get("SHARD_ID") else ordinal_from_hostname(os.environ.get("HOSTNAME", ""))
+)
+SHARD_GROUP: str = os.environ.get("SHARD_GROUP", "alert-processor")
+SHARD_TOPIC_PREFIX: str = os.environ.get("SHARD_TOPIC_PREFIX", "geoint/alert-processor/shards").rstrip("/")
+MQTT_BATCH_MAX: int = int(os.environ.get("MQTT_BATCH_MAX", "500"))
+MQTT_BATCH_LINGER_MS: float = float(os.environ.get("MQTT_BATCH_LINGER_MS", "5"))
+MQTT_ALERT_CLIENT_ID: str = os.environ.get("MQTT_ALERT_CLIENT_ID") or f"alert-processor-{socket.gethostname()}"
+MQTT_JOURNAL_RETRIES: int = int(os.environ.get("MQTT_JOURNAL_RETRIES", "3"))
 MQTT_ALERT_USERNAME: Optional[str] = os.environ.get("MQTT_ALERT_USERNAME")
 MQTT_ALERT_PASSWORD: Optional[str] = os.environ.get("MQTT_ALERT_PASSWORD")
+if SHARD_COUNT > 1:
+    if SHARD_ID is None or not 0 <= SHARD_ID < SHARD_COUNT:
+        raise ValueError(f"sharded mode needs SHARD_ID in 0..{SHARD_COUNT - 1} (or a StatefulSet HOSTNAME)")
+    if not MQTT_BRIDGE_ENABLED:
+        raise ValueError("sharded mode forwards alerts over MQTT; MQTT_ALERT_BRIDGE_ENABLED must be true")
 
-# In-memory ring buffer — last 50 alerts
-_alert_buffer: Deque[dict[str, Any]] = deque(maxlen=50)
+# Indexed in-memory alert history — last ALERT_STORE_SIZE alerts
+_alert_store = AlertStore(ALERT_STORE_SIZE)
+# Live push of new alerts to /alerts/stream viewers
+_alert_stream = AlertBroadcaster(
+    queue_size=ALERT_STREAM_QUEUE,
+    max_subscribers=ALERT_STREAM_MAX_SUBSCRIBERS,
+    heartbeat_s=ALERT_STREAM_HEARTBEAT_S,
+    flush_s=ALERT_STREAM_FLUSH_MS / 1000.0,
+)
 _mqtt_client: Optional[mqtt.Client] = None
 _event_loop: Optional[asyncio.AbstractEventLoop] = None
+# Shared vision pipeline client and dispatch limiter, created at startup
+_http_client: Optional[httpx.AsyncClient] = None
+_dispatch_slots: Optional[asyncio.Semaphore] = None
+_dispatch_queue: Optional[WeightedPriorityQueue[DispatchJob]] = None
+_dispatch_workers: list[asyncio.Task[None]] = []
+# Vision circuit breaker and the jobs it is holding back
+_breaker: Optional[CircuitBreaker] = None
+_parked: Deque[DispatchJob] = deque()
+_unpark_task: Optional[asyncio.Task[None]] = None
+# Durable alert/dispatch journal (None when ALERT_JOURNAL_PATH is empty)
+_journal: Optional[AlertJournal] = None
+_replay_task: Optional[asyncio.Task[None]] = None
+# Open alert groups indexed by grid cell, created at startup
+_coalescer: Optional[Coalescer] = None
+# Named areas of interest; replaced whole on each refresh
+_geofence = GeofenceIndex((), cell_deg=GEOFENCE_CELL_DEG)
+_geofence_task: Optional[asyncio.Task[None]] = None
+_geofence_failures = 0
+# grid_ref -> owning replica in sharded mode; None when running unsharded
+_ring: Optional[HashRing] = HashRing(SHARD_COUNT) if SHARD_COUNT > 1 else None
 
 # ---------------------------------------------------------------------------
 # Pydantic models
@@ -97,11 +291,687 @@ class AlertPayload(BaseModel):
     timestamp: str
     reading: dict[str, Any]
     alert: bool
+    # Rules that raised this alert from telemetry; empty for published alerts
+    matched_rules: list[str] = []
 
 
 class TriggerResponse(BaseModel):
+    # "queued" (opened a new job), "coalesced" (joined one) or "forwarded"
+    # (sent on to the shard that owns its grid_ref, which assigns the ids)
     status: str
+    job_id: Optional[str] = None
+    alert_id: Optional[str] = None
+    shard: Optional[int] = None  # replica that owns the alert, in sharded mode
+
+
+# ---------------------------------------------------------------------------
+# Vision pipeline dispatch
+# ---------------------------------------------------------------------------
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """One pooled client for every dispatch, so jobs reuse warm connections.
+
+    HTTP/2 is negotiated via ALPN and therefore only applies to https URLs;
+    plain http endpoints still get HTTP/1.1 keep-alive pooling.
+    """
+    return httpx.AsyncClient(
+        http2=VISION_HTTP2,
+        timeout=VISION_TIMEOUT_S,
+        limits=httpx.Limits(
+            max_connections=VISION_MAX_CONNECTIONS,
+            max_keepalive_connections=VISION_MAX_KEEPALIVE,
+        ),
+    )
+
+
+@dataclass
+class DispatchJob:
+    """One vision pipeline job waiting in, or being retried through, the queue."""
+
     job_id: str
+    request: dict[str, Any]
+    accepted_at: float = field(default_factory=time.monotonic)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+    priority: int = 2  # PRIORITY_CRITICAL .. PRIORITY_LOW
+
+
+PRIORITY_CRITICAL = 0
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
+PRIORITY_NAMES = ("critical", "high", "normal", "low")
+
+# Points an alert earns from the most urgent named area it falls in
+_AREA_POINTS = {"critical": 3, "high": 2, "normal": 1}
+# Reading field and threshold at which a sensor's alert counts as severe
+_SEVERITY = {
+    "seismic": ("magnitude", PRIORITY_SEVERE_MAGNITUDE),
+    "rf-detector": ("power_dbm", PRIORITY_SEVERE_POWER_DBM),
+}
+
+
+def _alert_priority(sensor_type: str, reading: dict[str, Any], area_priority: Optional[str]) -> int:
+    """Priority level of one alert, scored from area, sensor type and severity.
+
+    A severe seismic hit in a high-priority area is critical. A weather
+    anomaly in no area at all is low.
+    """
+    points = _AREA_POINTS.get(area_priority, 0) if area_priority else 0
+    if sensor_type in PRIORITY_SENSOR_TYPES:
+        points += 1
+    severity = _SEVERITY.get(sensor_type)
+    if severity is not None:
+        value = reading.get(severity[0])
+        if isinstance(value, (int, float)) and value >= severity[1]:
+            points += 2
+    if points >= 4:
+        return PRIORITY_CRITICAL
+    if points >= 2:
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL if points else PRIORITY_LOW
+
+
+def _job_priority(request: dict[str, Any]) -> int:
+    """A job is as urgent as its most urgent contributing alert."""
+    return min(
+        _alert_priority(s["sensor_type"], s["reading"], s.get("area_priority")) for s in request["sensors"]
+    )
+
+
+class DispatchMetrics:
+    """Counters plus a sliding window of queue wait times for ``/metrics``."""
+
+    def __init__(self, window: int = 2048) -> None:
+        self.alerts = 0
+        self.coalesced = 0
+        self.enqueued = 0
+        self.rejected = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.retries = 0
+        self.retry_pending = 0
+        self.shed = 0
+        self.displaced = 0
+        self.forwarded = 0
+        self.in_progress = 0
+        self.wait_sum_s = 0.0
+        self.wait_count = 0
+        self._waits: Deque[float] = deque(maxlen=window)
+
+    def observe_wait(self, seconds: float) -> None:
+        self._waits.append(seconds)
+        self.wait_sum_s += seconds
+        self.wait_count += 1
+
+    def wait_quantiles(self) -> dict[str, float]:
+        if not self._waits:
+            return {}
+        ordered = sorted(self._waits)
+        last = len(ordered) - 1
+        return {q: ordered[round(float(q) * last)] for q in ("0.5", "0.9", "0.99")}
+
+
+_metrics = DispatchMetrics()
+
+
+async def _post_job(job: DispatchJob) -> bool:
+    """Make one dispatch attempt. Returns True once the pipeline accepts the job.
+
+    At most ``VISION_MAX_CONCURRENT`` requests are outstanding at once.
+    """
+    assert _http_client is not None and _dispatch_slots is not None, "dispatcher not started"
+    assert _breaker is not None
+    if not _breaker.allow():
+        _park_or_shed(job)
+        return False
+    job.attempts += 1
+    elapsed = 0.0
+    try:
+        async with _dispatch_slots:
+            started = time.monotonic()
+            try:
+                resp = await _http_client.post(VISION_PIPELINE_URL, json=job.request)
+                resp.raise_for_status()
+            finally:
+                elapsed = time.monotonic() - started
+    except httpx.HTTPError as exc:
+        _breaker.record(False, elapsed)
+        if _breaker.state != breaker.CLOSED:
+            # Downstream is out; don't spend retries (or timers) against it
+            _park_or_shed(job)
+        elif job.attempts < MAX_VISION_RETRIES:
+            delay = VISION_RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+            _log(
+                "warning",
+                "Vision pipeline dispatch failed, retrying",
+                attempt=job.attempts,
+                max_retries=MAX_VISION_RETRIES,
+                retry_delay_s=delay,
+                url=VISION_PIPELINE_URL,
+                error=str(exc),
+                job_id=job.job_id,
+            )
+            _schedule_retry(job, delay)
+        else:
+            _metrics.failed += 1
+            _journal_mark(job, journal.FAILED)
+            _log(
+                "warning",
+                "Could not reach vision pipeline after retries (non-fatal)",
+                attempts=MAX_VISION_RETRIES,
+                url=VISION_PIPELINE_URL,
+                error=str(exc),
+                job_id=job.job_id,
+            )
+        return False
+    except BaseException:
+        # A client bug or cancellation still settles the call; otherwise a
+        # half-open breaker would hold the probe slot forever
+        _breaker.record(False, elapsed)
+        raise
+    _breaker.record(True, elapsed)
+    _metrics.dispatched += 1
+    _journal_mark(job, journal.DISPATCHED)
+    _log.sampled(
+        "info",
+        "Vision pipeline job dispatched",
+        job_id=job.job_id,
+        status=resp.status_code,
+        latency_ms=round((time.monotonic() - job.accepted_at) * 1000.0, 1),
+    )
+    return True
+
+
+def _schedule_retry(job: DispatchJob, delay: float) -> None:
+    """Re-enqueue ``job`` after ``delay`` without holding a worker while waiting."""
+    _metrics.retries += 1
+    _metrics.retry_pending += 1
+    # Persist the attempt count so a replayed job keeps its retry budget
+    _journal_mark(job, journal.QUEUED)
+
+    def _requeue() -> None:
+        _metrics.retry_pending -= 1
+        if not _enqueue(job):
+            _journal_mark(job, journal.DROPPED)
+
+    asyncio.get_running_loop().call_later(delay, _requeue)
+
+
+def _park_or_shed(job: DispatchJob) -> None:
+    """Hold a job until the breaker closes; shed it if it is low priority."""
+    if job.priority < PRIORITY_LOW and len(_parked) < BREAKER_PARK_SIZE:
+        _parked.append(job)
+        return
+    _metrics.shed += 1
+    _journal_mark(job, journal.SHED)
+    _log.sampled(
+        "warning",
+        "Vision breaker open; job shed",
+        job_id=job.job_id,
+        priority=PRIORITY_NAMES[job.priority],
+        parked=len(_parked),
+    )
+
+
+def _on_breaker_change(previous: str, state: str) -> None:
+    global _unpark_task
+    _log(
+        "warning" if state == breaker.OPEN else "info",
+        "Vision breaker state changed",
+        previous=previous,
+        state=state,
+        parked=len(_parked),
+        url=VISION_PIPELINE_URL,
+    )
+    loop = asyncio.get_running_loop()
+    if state == breaker.OPEN:
+        # Without fresh alerts nothing would probe; feed parked jobs in once
+        # the open period ends
+        loop.call_later(BREAKER_OPEN_S, _release_probes)
+    elif state == breaker.CLOSED and _parked and (_unpark_task is None or _unpark_task.done()):
+        _unpark_task = loop.create_task(_unpark(), name="breaker-unpark")
+
+
+def _release_probes() -> None:
+    for _ in range(min(BREAKER_HALF_OPEN_PROBES, len(_parked))):
+        if not _enqueue(_parked.popleft()):
+            break
+
+
+async def _unpark() -> None:
+    """Move parked jobs back onto the queue, waiting for space as needed."""
+    assert _dispatch_queue is not None
+    released = 0
+    while _parked and _breaker is not None and _breaker.state == breaker.CLOSED:
+        job = _parked.popleft()
+        job.enqueued_at = time.monotonic()
+        await _dispatch_queue.put(job)
+        _metrics.enqueued += 1
+        released += 1
+    _log("info", "Released parked jobs", released=released, still_parked=len(_parked))
+
+
+def _enqueue(job: DispatchJob) -> bool:
+    """Put ``job`` on the dispatch queue; False (and counted) if it is full.
+
+    On a full queue a more urgent job displaces the newest least urgent one,
+    which is dropped in its place.
+    """
+    assert _dispatch_queue is not None, "dispatcher not started"
+    job.enqueued_at = time.monotonic()
+    try:
+        displaced = _dispatch_queue.put_nowait(job)
+    except asyncio.QueueFull:
+        _metrics.rejected += 1
+        _log.sampled("warning", "Dispatch queue full; job dropped", job_id=job.job_id, attempts=job.attempts)
+        return False
+    _metrics.enqueued += 1
+    if displaced is not None:
+        _metrics.displaced += 1
+        _journal_mark(displaced, journal.DROPPED)
+        _log.sampled(
+            "warning",
+            "Dispatch queue full; lower-priority job displaced",
+            job_id=displaced.job_id,
+            priority=PRIORITY_NAMES[displaced.priority],
+            by_job_id=job.job_id,
+        )
+    return True
+
+
+async def _dispatch_worker(worker: int) -> None:
+    assert _dispatch_queue is not None
+    while True:
+        job = await _dispatch_queue.get()
+        _metrics.observe_wait(time.monotonic() - job.enqueued_at)
+        _metrics.in_progress += 1
+        try:
+            await _post_job(job)
+        except Exception as exc:  # pragma: no cover - keep the worker alive
+            _log("error", "Dispatch worker error", worker=worker, job_id=job.job_id, error=str(exc))
+        finally:
+            _metrics.in_progress -= 1
+
+
+async def _start_dispatcher() -> None:
+    global _http_client, _dispatch_slots, _dispatch_queue, _coalescer, _breaker
+    if _http_client is not None:
+        return
+    _http_client = _create_http_client()
+    _breaker = CircuitBreaker(
+        window_s=BREAKER_WINDOW_S,
+        min_calls=BREAKER_MIN_CALLS,
+        failure_rate=BREAKER_FAILURE_RATE,
+        slow_call_s=BREAKER_SLOW_CALL_S,
+        slow_call_rate=BREAKER_SLOW_CALL_RATE,
+        open_s=BREAKER_OPEN_S,
+        half_open_probes=BREAKER_HALF_OPEN_PROBES,
+        on_change=_on_breaker_change,
+    )
+    _dispatch_slots = asyncio.Semaphore(VISION_MAX_CONCURRENT)
+    _dispatch_queue = WeightedPriorityQueue(
+        DISPATCH_QUEUE_SIZE,
+        DISPATCH_PRIORITY_WEIGHTS,
+        ageing_s=DISPATCH_AGEING_S,
+        level_of=lambda job: job.priority,
+    )
+    _coalescer = Coalescer(COALESCE_WINDOW_S, COALESCE_CELL_M, _flush_group)
+    _dispatch_workers.extend(
+        asyncio.create_task(_dispatch_worker(n), name=f"dispatch-{n}") for n in range(DISPATCH_WORKERS)
+    )
+    _log(
+        "info",
+        "Vision dispatcher started",
+        url=VISION_PIPELINE_URL,
+        http2=VISION_HTTP2,
+        max_connections=VISION_MAX_CONNECTIONS,
+        max_concurrent=VISION_MAX_CONCURRENT,
+        workers=DISPATCH_WORKERS,
+        queue_size=DISPATCH_QUEUE_SIZE,
+        priority_weights=DISPATCH_PRIORITY_WEIGHTS,
+        ageing_s=DISPATCH_AGEING_S,
+        coalesce_window_s=COALESCE_WINDOW_S,
+        coalesce_cell_m=COALESCE_CELL_M,
+    )
+
+
+async def _stop_dispatcher() -> None:
+    global _http_client
+    if _unpark_task is not None:
+        _unpark_task.cancel()
+    if _parked:
+        # Parked jobs are still journaled as queued and replay on the next start
+        _log("warning", "Dispatcher stopped with parked jobs", parked=len(_parked))
+    if _coalescer is not None and (open_groups := _coalescer.close()):
+        # Journaled groups are replayed on the next start
+        _log("warning", "Dispatcher stopped with open alert groups", groups=open_groups)
+    for task in _dispatch_workers:
+        task.cancel()
+    await asyncio.gather(*_dispatch_workers, return_exceptions=True)
+    _dispatch_workers.clear()
+    if _dispatch_queue is not None and not _dispatch_queue.empty():
+        _log("warning", "Dispatcher stopped with queued jobs", queued=_dispatch_queue.qsize())
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# ---------------------------------------------------------------------------
+# Alert journal
+# ---------------------------------------------------------------------------
+
+
+def _journal_mark(job: DispatchJob, state: str) -> None:
+    if _journal is not None:
+        _journal.mark(job.job_id, state, job.attempts)
+
+
+def _open_journal() -> None:
+    """Open the journal and restore the alert store from it."""
+    global _journal, _replay_task
+    if not ALERT_JOURNAL_PATH:
+        _log("info", "Alert journal disabled via configuration")
+        return
+    _journal = AlertJournal(
+        ALERT_JOURNAL_PATH,
+        commit_interval_s=ALERT_JOURNAL_COMMIT_MS / 1000.0,
+        synchronous_full=ALERT_JOURNAL_SYNC != "NORMAL",
+        retention_s=ALERT_JOURNAL_RETENTION_H * 3600.0,
+    )
+    for record in _journal.recent(ALERT_STORE_SIZE):
+        _alert_store.add(record, datetime.fromisoformat(record["received_at"]).timestamp())
+    pending = _journal.pending()
+    _journal.start()
+    _log("info", "Alert journal opened", path=ALERT_JOURNAL_PATH, pending=len(pending), sync=ALERT_JOURNAL_SYNC)
+    if pending:
+        _replay_task = asyncio.create_task(_replay_pending(pending), name="journal-replay")
+
+
+async def _replay_pending(pending: list[journal.PendingJob]) -> None:
+    """Re-queue jobs that were accepted but not finished before the last exit.
+
+    Waits for queue space rather than dropping, so a large backlog drains in
+    behind live traffic instead of being rejected.
+    """
+    assert _dispatch_queue is not None
+    for entry in pending:
+        group = AlertGroup(entry.job_id, (0, 0))
+        for record in entry.alerts:
+            group.add(_sensor_entry(record))
+        request = _job_request(group)
+        job = DispatchJob(entry.job_id, request, attempts=entry.attempts, priority=_job_priority(request))
+        await _dispatch_queue.put(job)
+        _metrics.enqueued += 1
+    _log("info", "Replayed journaled jobs", jobs=len(pending))
+
+
+async def _close_journal() -> None:
+    global _journal, _replay_task
+    if _replay_task is not None:
+        _replay_task.cancel()
+        await asyncio.gather(_replay_task, return_exceptions=True)
+        _replay_task = None
+    if _journal is not None:
+        await _journal.close()
+        _log("info", "Alert journal closed", commits=_journal.commits, ops=_journal.committed_ops)
+        _journal = None
+
+
+# ---------------------------------------------------------------------------
+# Geofence enrichment
+# ---------------------------------------------------------------------------
+
+
+def _geofence_source() -> str:
+    if GEOFENCE_POSTGIS_DSN:
+        return "postgis"
+    return "file" if GEOFENCE_FILE else "default"
+
+
+def _build_geofence() -> GeofenceIndex:
+    """Load named areas from the configured source and index them (blocking)."""
+    source = _geofence_source()
+    if source == "postgis":
+        areas = geofence.load_postgis(GEOFENCE_POSTGIS_DSN)
+    elif source == "file":
+        areas = geofence.load_geojson(GEOFENCE_FILE)
+    else:
+        areas = geofence.default_areas()
+    return GeofenceIndex(areas, cell_deg=GEOFENCE_CELL_DEG, source=source)
+
+
+async def _load_geofence() -> bool:
+    """Swap in a freshly loaded index; on failure keep serving the current one."""
+    global _geofence, _geofence_failures
+    try:
+        index = await asyncio.to_thread(_build_geofence)
+    except Exception as exc:
+        _geofence_failures += 1
+        _log(
+            "warning",
+            "Named area load failed; keeping previous areas",
+            source=_geofence_source(),
+            areas=len(_geofence),
+            error=str(exc),
+        )
+        return False
+    changed = [a.tag for a in index.areas] != [a.tag for a in _geofence.areas]
+    _geofence = index
+    if changed:
+        _log("info", "Named areas loaded", source=index.source, areas=len(index))
+    return True
+
+
+async def _refresh_geofence() -> None:
+    while True:
+        await asyncio.sleep(GEOFENCE_REFRESH_S)
+        await _load_geofence()
+
+
+async def _start_geofence() -> None:
+    global _geofence_task
+    await _load_geofence()
+    # The built-in seed areas never change, so only real sources are polled
+    if GEOFENCE_REFRESH_S > 0 and _geofence_source() != "default":
+        _geofence_task = asyncio.create_task(_refresh_geofence(), name="geofence-refresh")
+
+
+async def _stop_geofence() -> None:
+    global _geofence_task
+    if _geofence_task is not None:
+        _geofence_task.cancel()
+        await asyncio.gather(_geofence_task, return_exceptions=True)
+        _geofence_task = None
+
+
+def _area_tags(lat: float, lon: float) -> tuple[list[dict[str, Any]], Optional[str]]:
+    """The named areas containing (lat, lon) and the most urgent priority."""
+    areas = _geofence.lookup(lat, lon)
+    return [area.tag for area in areas], areas[0].priority if areas else None
+
+
+# ---------------------------------------------------------------------------
+# Alert coalescing
+# ---------------------------------------------------------------------------
+
+
+_SENSOR_FIELDS = ("sensor_id", "sensor_type", "grid_ref", "lat", "lon", "timestamp", "reading")
+
+
+def _sensor_entry(record: dict[str, Any]) -> dict[str, Any]:
+    """The part of an alert record a vision job lists per contributing sensor."""
+    entry = {name: record[name] for name in _SENSOR_FIELDS}
+    # Journaled before geofencing existed: no areas recorded
+    entry["areas"] = [area["name"] for area in record.get("areas") or ()]
+    entry["area_priority"] = record.get("area_priority")
+    return entry
+
+
+def _job_request(group: AlertGroup) -> dict[str, Any]:
+    """Vision job body for a group: the first alert plus every contributor."""
+    sensors = list(group.sensors.values())
+    first = sensors[0]
+    lat, lon = group.centroid()
+    areas = {name: None for s in sensors for name in s["areas"]}
+    priorities = [s["area_priority"] for s in sensors if s["area_priority"]]
+    return {
+        "job_id": group.job_id,
+        "grid_ref": first["grid_ref"],
+        "lat": round(lat, 6),
+        "lon": round(lon, 6),
+        "trigger_sensor": first["sensor_id"],
+        "trigger_type": first["sensor_type"],
+        "triggered_at": first["timestamp"],
+        "grid_refs": sorted({s["grid_ref"] for s in sensors}),
+        "sensors": sensors,
+        "alert_count": group.alert_count,
+        "areas": list(areas),
+        "area_priority": min(priorities, key=geofence.priority_rank) if priorities else None,
+    }
+
+
+def _flush_group(group: AlertGroup) -> None:
+    """Window closed: queue the group's job (dropped if the queue is full)."""
+    request = _job_request(group)
+    job = DispatchJob(group.job_id, request, accepted_at=group.opened_at, priority=_job_priority(request))
+    if not _enqueue(job):
+        _journal_mark(job, journal.DROPPED)
+        return
+    if group.alert_count > 1:
+        _log.sampled(
+            "info",
+            "Coalesced alerts into one vision job",
+            job_id=group.job_id,
+            alerts=group.alert_count,
+            sensors=len(group.sensors),
+            grid_refs=job.request["grid_refs"],
+        )
+
+
+_BREAKER_STATE_VALUE = {breaker.CLOSED: 0, breaker.HALF_OPEN: 1, breaker.OPEN: 2}
+
+
+def _render_metrics() -> str:
+    """Dispatch metrics in the Prometheus text exposition format."""
+    depth = _dispatch_queue.qsize() if _dispatch_queue is not None else 0
+    lines = [
+        "# HELP alert_dispatch_queue_depth Jobs waiting for a dispatch worker.",
+        "# TYPE alert_dispatch_queue_depth gauge",
+        f"alert_dispatch_queue_depth {depth}",
+        "# HELP alert_dispatch_queue_level_depth Jobs waiting at each priority level.",
+        "# TYPE alert_dispatch_queue_level_depth gauge",
+    ]
+    if _dispatch_queue is not None:
+        lines += [
+            f'alert_dispatch_queue_level_depth{{priority="{PRIORITY_NAMES[level]}"}} {count}'
+            for level, count in enumerate(_dispatch_queue.depths())
+        ]
+    lines += [
+        "# HELP alert_dispatch_queue_capacity Maximum queued jobs before new alerts are rejected.",
+        "# TYPE alert_dispatch_queue_capacity gauge",
+        f"alert_dispatch_queue_capacity {DISPATCH_QUEUE_SIZE}",
+        "# HELP alert_dispatch_in_progress Dispatch requests currently being attempted.",
+        "# TYPE alert_dispatch_in_progress gauge",
+        f"alert_dispatch_in_progress {_metrics.in_progress}",
+        "# HELP alert_coalesce_groups_open Alert groups whose coalescing window is still open.",
+        "# TYPE alert_coalesce_groups_open gauge",
+        f"alert_coalesce_groups_open {len(_coalescer) if _coalescer is not None else 0}",
+        "# HELP alert_dispatch_breaker_state Vision circuit breaker: 0 closed, 1 half-open, 2 open.",
+        "# TYPE alert_dispatch_breaker_state gauge",
+        f"alert_dispatch_breaker_state {_BREAKER_STATE_VALUE[_breaker.state] if _breaker is not None else 0}",
+        "# HELP alert_dispatch_parked Jobs held while the breaker is open.",
+        "# TYPE alert_dispatch_parked gauge",
+        f"alert_dispatch_parked {len(_parked)}",
+        "# HELP alert_dispatch_retry_pending Jobs waiting out a retry backoff.",
+        "# TYPE alert_dispatch_retry_pending gauge",
+        f"alert_dispatch_retry_pending {_metrics.retry_pending}",
+    ]
+    for name, value, help_text in (
+        ("alerts", _metrics.alerts, "Alerts accepted for dispatch."),
+        ("coalesced", _metrics.coalesced, "Alerts merged into an already open job."),
+        ("enqueued", _metrics.enqueued, "Jobs placed on the dispatch queue (including retries)."),
+        ("rejected", _metrics.rejected, "Jobs dropped because the queue was full."),
+        ("dispatched", _metrics.dispatched, "Jobs accepted by the vision pipeline."),
+        ("failed", _metrics.failed, "Jobs abandoned after MAX_VISION_RETRIES attempts."),
+        ("retries", _metrics.retries, "Dispatch attempts that were scheduled for retry."),
+        ("shed", _metrics.shed, "Low-priority jobs dropped while the breaker was open."),
+        ("forwarded", _metrics.forwarded, "/trigger alerts forwarded to their owner shard."),
+        ("displaced", _metrics.displaced, "Queued jobs dropped to make room for a more urgent one."),
+        ("aged", _dispatch_queue.aged if _dispatch_queue else 0, "Queued jobs moved up a priority level by ageing."),
+        ("breaker_opened", _breaker.opened_count if _breaker else 0, "Times the vision breaker opened."),
+        ("journal_commits", _journal.commits if _journal else 0, "Group commits written to the alert journal."),
+    ):
+        lines += [
+            f"# HELP alert_dispatch_{name}_total {help_text}",
+            f"# TYPE alert_dispatch_{name}_total counter",
+            f"alert_dispatch_{name}_total {value}",
+        ]
+    lines += [
+        "# HELP alert_geofence_areas Named areas in the geofence index.",
+        "# TYPE alert_geofence_areas gauge",
+        f"alert_geofence_areas {len(_geofence)}",
+        "# HELP alert_geofence_load_failures_total Named area reloads that failed.",
+        "# TYPE alert_geofence_load_failures_total counter",
+        f"alert_geofence_load_failures_total {_geofence_failures}",
+        "# HELP alert_stream_subscribers Connected /alerts/stream viewers.",
+        "# TYPE alert_stream_subscribers gauge",
+        f"alert_stream_subscribers {len(_alert_stream)}",
+        "# HELP alert_stream_published_total Alerts serialised for at least one stream viewer.",
+        "# TYPE alert_stream_published_total counter",
+        f"alert_stream_published_total {_alert_stream.published}",
+        "# HELP alert_stream_dropped_total Stream frames dropped for slow viewers.",
+        "# TYPE alert_stream_dropped_total counter",
+        f"alert_stream_dropped_total {_alert_stream.dropped}",
+    ]
+    if _ring is not None:
+        lines += [
+            "# HELP alert_shard_info This replica's shard in sharded mode.",
+            "# TYPE alert_shard_info gauge",
+            f'alert_shard_info{{shard="{SHARD_ID}",shards="{SHARD_COUNT}"}} 1',
+        ]
+    for name, value, help_text in (
+        ("messages", _bridge_stats.messages, "Messages received by the MQTT alert bridge."),
+        ("invalid", _bridge_stats.invalid, "Bridge messages that failed validation."),
+        ("batches", _bridge_stats.batches, "Micro-batches handed from the bridge to the event loop."),
+        ("telemetry", _bridge_stats.telemetry, "Telemetry messages received for the alert rules."),
+        ("telemetry_invalid", _bridge_stats.telemetry_invalid, "Telemetry messages the rules could not read."),
+        ("forwarded_alerts", _bridge_stats.forwarded_alerts, "Bridge alerts forwarded to their owner shard."),
+        ("forwarded_telemetry", _bridge_stats.forwarded_telemetry, "Readings forwarded to their owner shard."),
+        ("shard_received", _bridge_stats.shard_received, "Alerts other shards forwarded to this one."),
+    ):
+        lines += [
+            f"# HELP alert_mqtt_{name}_total {help_text}",
+            f"# TYPE alert_mqtt_{name}_total counter",
+            f"alert_mqtt_{name}_total {value}",
+        ]
+    if _rule_engine is not None:
+        lines += [
+            "# HELP alert_rules_samples_total Telemetry readings evaluated against the alert rules.",
+            "# TYPE alert_rules_samples_total counter",
+            f"alert_rules_samples_total {_rule_engine.samples}",
+            "# HELP alert_rules_sensors Sensors with rule window state.",
+            "# TYPE alert_rules_sensors gauge",
+            f"alert_rules_sensors {_rule_engine.sensors}",
+            "# HELP alert_rules_fired_total Alerts raised by each rule.",
+            "# TYPE alert_rules_fired_total counter",
+        ]
+        lines += [
+            f'alert_rules_fired_total{{rule="{name}"}} {count}'
+            for name, count in _rule_engine.fired.items()
+        ]
+    lines += [
+        "# HELP alert_dispatch_queue_wait_seconds Time jobs spend queued before a worker picks them up.",
+        "# TYPE alert_dispatch_queue_wait_seconds summary",
+    ]
+    for quantile, value in _metrics.wait_quantiles().items():
+        lines.append(f'alert_dispatch_queue_wait_seconds{{quantile="{quantile}"}} {value:.6f}')
+    lines += [
+        f"alert_dispatch_queue_wait_seconds_sum {_metrics.wait_sum_s:.6f}",
+        f"alert_dispatch_queue_wait_seconds_count {_metrics.wait_count}",
+    ]
+    return "\n".join(lines) + "\n"
 
 
 # ---------------------------------------------------------------------------
@@ -110,117 +980,631 @@ class TriggerResponse(BaseModel):
 app = FastAPI(title="GEOINT Alert Processor", version="1.0.0")
 
 
-async def process_alert(payload: AlertPayload) -> TriggerResponse:
-    """Shared alert handling logic for HTTP and MQTT inputs."""
+def _accept_alert(payload: AlertPayload) -> tuple[TriggerResponse, dict[str, Any], AlertGroup]:
+    """Validate one alert and hold its place in a coalescing group.
+
+    Nothing is visible yet: the caller passes the result to ``_commit_alerts``,
+    which journals the record before the alert joins its job, the store and
+    the stream. Synchronous so a batch of alerts can be accepted without
+    yielding and then share a single journal commit.
+    """
     if not payload.alert:
         raise HTTPException(status_code=400, detail="Payload alert field is false")
 
-    job_id = str(uuid.uuid4())
+    alert_id = str(uuid.uuid4())
+    assert _coalescer is not None, "dispatcher not started"
+    areas, area_priority = _area_tags(payload.lat, payload.lon)
+    # Join the open job for this area if there is one; otherwise open a new
+    # group, which is queued for dispatch when its window closes. Workers then
+    # dispatch it (with retries) in the background, so ingestion never waits
+    # on the vision service.
+    group = _coalescer.find(payload.lat, payload.lon)
+    status = "coalesced"
+    if group is None:
+        # Only new jobs add load, so only they are refused under backpressure,
+        # and only if nothing less urgent is queued for them to displace
+        if _dispatch_queue is not None and not _dispatch_queue.admits(
+            _alert_priority(payload.sensor_type, payload.reading, area_priority)
+        ):
+            _metrics.rejected += 1
+            raise HTTPException(status_code=503, detail="Dispatch queue full")
+        group = _coalescer.open(str(uuid.uuid4()), payload.lat, payload.lon)
+        status = "queued"
+    else:
+        _metrics.coalesced += 1
+    _metrics.alerts += 1
+    job_id = group.job_id
+    received_at = datetime.now(timezone.utc)
     alert_record: dict[str, Any] = {
+        "alert_id": alert_id,
         "job_id": job_id,
-        "received_at": datetime.now(timezone.utc).isoformat(),
+        "received_at": received_at.isoformat(),
         **payload.model_dump(),
+        "areas": areas,
+        "area_priority": area_priority,
     }
-    _alert_buffer.append(alert_record)
-    _log(
+    _coalescer.hold(group)
+    _log.sampled(
         "info",
         "Alert received",
         sensor_id=payload.sensor_id,
         sensor_type=payload.sensor_type,
         grid_ref=payload.grid_ref,
         job_id=job_id,
+        status=status,
+        area_priority=area_priority,
     )
+    response = TriggerResponse(status=status, job_id=job_id, alert_id=alert_id, shard=SHARD_ID if _ring else None)
+    return response, alert_record, group
 
-    # Dispatch vision pipeline job (best-effort — do not block on failure)
-    job_request = {
-        "job_id": job_id,
-        "grid_ref": payload.grid_ref,
-        "lat": payload.lat,
-        "lon": payload.lon,
-        "trigger_sensor": payload.sensor_id,
-        "trigger_type": payload.sensor_type,
-        "triggered_at": payload.timestamp,
-    }
-    for attempt in range(MAX_VISION_RETRIES):
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                resp = await client.post(VISION_PIPELINE_URL, json=job_request)
-                resp.raise_for_status()
-                _log("info", "Vision pipeline job dispatched", job_id=job_id, status=resp.status_code)
+
+def _settle_alerts(accepted: list[tuple[AlertGroup, dict[str, Any]]], durable: bool) -> None:
+    """Release held alerts: into their jobs, the store and the stream once
+    journaled, or withdrawn from their groups if the write failed."""
+    for group, record in accepted:
+        if _coalescer is not None:
+            _coalescer.settle(group, _sensor_entry(record) if durable else None)
+        if durable:
+            received_at = datetime.fromisoformat(record["received_at"]).timestamp()
+            _alert_stream.publish(_alert_store.add(record, received_at), record)
+
+
+async def _commit_alerts(accepted: list[tuple[AlertGroup, dict[str, Any]]], retries: int = 0) -> None:
+    """Journal alerts from ``_accept_alert``, retrying up to ``retries`` times,
+    then settle them either way.
+
+    A withdrawn alert was never dispatched or shown, so the sender's retry
+    (or the broker's redelivery) does not duplicate it.
+    """
+    records = [record for _, record in accepted]
+    try:
+        for attempt in range(retries + 1):
+            try:
+                await _journal_alerts(records)
                 break
-        except httpx.HTTPError as exc:
-            if attempt < MAX_VISION_RETRIES - 1:
-                delay = VISION_RETRY_BASE_DELAY * (2 ** attempt)
-                _log(
-                    "warning",
-                    "Vision pipeline dispatch failed, retrying",
-                    attempt=attempt + 1,
-                    max_retries=MAX_VISION_RETRIES,
-                    retry_delay_s=delay,
-                    url=VISION_PIPELINE_URL,
-                    error=str(exc),
-                    job_id=job_id,
-                )
-                await asyncio.sleep(delay)
-            else:
-                _log(
-                    "warning",
-                    "Could not reach vision pipeline after retries (non-fatal)",
-                    attempts=MAX_VISION_RETRIES,
-                    url=VISION_PIPELINE_URL,
-                    error=str(exc),
-                    job_id=job_id,
-                )
-
-    return TriggerResponse(status="triggered", job_id=job_id)
+            except HTTPException:
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(_JOURNAL_RETRY_DELAY_S * 2**attempt)
+    except BaseException:
+        _settle_alerts(accepted, durable=False)
+        raise
+    _settle_alerts(accepted, durable=True)
+
+
+# First pause before an MQTT batch's journal write is retried; doubled per attempt
+_JOURNAL_RETRY_DELAY_S = 0.5
+
+
+async def _journal_alerts(records: list[dict[str, Any]]) -> None:
+    """Wait until ``records`` are durable.
+
+    Every alert accepted in the same commit interval shares one transaction.
+    A restart replays each unfinished job from the alerts journaled for it,
+    including a group whose window was still open.
+    """
+    if _journal is None or not records:
+        return
+    try:
+        await _journal.record_alerts(records)
+    except Exception as exc:
+        _log("error", "Alert journal write failed", alerts=len(records), error=str(exc))
+        # Never acknowledge an alert that is not durable; the sender retries
+        raise HTTPException(status_code=503, detail="Alert journal write failed") from exc
+
+
+async def process_alert(payload: AlertPayload) -> TriggerResponse:
+    """Accept one alert and acknowledge once it is journaled.
+
+    In sharded mode an alert for another replica's grid_ref is forwarded
+    instead, and acknowledged once the broker has it.
+    """
+    owner = _remote_owner(payload.grid_ref)
+    if owner is not None:
+        return await _forward_alert(payload, owner)
+    response, record, group = _accept_alert(payload)
+    # Shielded: a caller that goes away must not leave the alert held
+    await asyncio.shield(_commit_alerts([(group, record)]))
+    return response
 
 
 @app.post("/trigger", response_model=TriggerResponse)
 async def trigger(payload: AlertPayload) -> TriggerResponse:
     """
-    Receive an alert payload from IoT Operations, log it, and dispatch a
-    vision pipeline job for the affected grid reference.
+    Receive an alert payload from IoT Operations, log it, and fold it into
+    the vision pipeline job for the affected area.
+
+    Returns once the alert is journaled. ``status`` is ``queued`` when the
+    alert opened a new job and ``coalesced`` when it joined an open one;
+    503 if a new job is needed and the dispatch queue is full. In sharded mode
+    it is ``forwarded`` when another replica owns the alert's grid_ref.
     """
     return await process_alert(payload)
 
 
 @app.get("/health")
 async def health() -> JSONResponse:
-    """Liveness / readiness probe."""
-    return JSONResponse({"status": "ok", "service": "alert-processor"})
+    """Liveness / readiness probe.
+
+    Stays 200 while the vision breaker is open: alerts are still accepted and
+    journaled, only dispatch is held back. ``status`` reports ``degraded``.
+    """
+    vision = _breaker.snapshot() if _breaker is not None else {"state": breaker.CLOSED}
+    return JSONResponse(
+        {
+            "status": "ok" if vision["state"] == breaker.CLOSED else "degraded",
+            "service": "alert-processor",
+            "dispatch_queue_depth": _dispatch_queue.qsize() if _dispatch_queue is not None else 0,
+            "vision_breaker": {**vision, "parked": len(_parked), "shed_total": _metrics.shed},
+            "geofence": {"source": _geofence.source, "areas": len(_geofence)},
+            "shard": {"id": SHARD_ID, "count": SHARD_COUNT} if _ring else None,
+        }
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """Dispatch queue depth, wait times and outcome counters for Prometheus."""
+    return PlainTextResponse(_render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def _parse_since(value: str) -> float:
+    """Epoch seconds, or an ISO 8601 timestamp (naive means UTC)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since must be epoch seconds or ISO 8601") from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_types(value: Optional[str]) -> Optional[list[str]]:
+    return [t for t in value.split(",") if t] if value else None
+
+
+def _parse_bbox(value: str) -> BBox:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat") from None
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox minimums must not exceed maximums")
+    return min_lon, min_lat, max_lon, max_lat
 
 
 @app.get("/alerts")
-async def list_alerts() -> JSONResponse:
-    """Return the last 50 alerts from the in-memory ring buffer."""
-    return JSONResponse(list(_alert_buffer))
+async def list_alerts(
+    since: Optional[str] = Query(None, description="Only alerts received at or after this time"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    sensor_type: Optional[str] = Query(None, alias="type", description="Comma-separated sensor types"),
+    grid_ref: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+) -> JSONResponse:
+    """Query the alert store, newest first.
+
+    Pass ``next_cursor`` back as ``cursor`` to fetch the following page; it is
+    null on the last page.
+    """
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    alerts, next_seq = _alert_store.query(
+        since=_parse_since(since) if since else None,
+        bbox=_parse_bbox(bbox) if bbox else None,
+        sensor_types=_parse_types(sensor_type),
+        grid_ref=grid_ref,
+        before=int(cursor) if cursor is not None else None,
+        limit=limit,
+    )
+    return JSONResponse(
+        {
+            "alerts": alerts,
+            "next_cursor": str(next_seq) if next_seq is not None else None,
+            "stored": len(_alert_store),
+        }
+    )
+
+
+@app.get("/alerts/stream")
+async def stream_alerts(
+    sensor_type: Optional[str] = Query(None, alias="type", description="Comma-separated sensor types"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+) -> StreamingResponse:
+    """Push each newly accepted alert as a Server-Sent Event.
+
+    Events are ``alert`` (data is the alert record, id its /alerts sequence)
+    and ``dropped`` (data ``{"count": n}``) when this viewer fell more than
+    ALERT_STREAM_QUEUE alerts behind and missed some.
+    """
+    types = frozenset(_parse_types(sensor_type) or ())
+    box = _parse_bbox(bbox) if bbox else None
+
+    def accept(record: dict[str, Any]) -> bool:
+        if types and record["sensor_type"] not in types:
+            return False
+        return box is None or (box[0] <= record["lon"] <= box[2] and box[1] <= record["lat"] <= box[3])
+
+    if _alert_stream.full():
+        raise HTTPException(status_code=503, detail="Too many stream subscribers")
+    return StreamingResponse(
+        _alert_stream.stream(accept if types or box else None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 def _should_start_mqtt_bridge() -> bool:
-    return MQTT_BRIDGE_ENABLED and bool(MQTT_ALERT_TOPIC)
+    return MQTT_BRIDGE_ENABLED and (bool(MQTT_ALERT_TOPIC) or _rule_engine is not None or _ring is not None)
 
 
-def _schedule_alert_from_mqtt(payload: AlertPayload) -> None:
-    if _event_loop is None:
-        _log("warning", "MQTT bridge not initialized; dropping alert")
-        return
+class BridgeStats:
+    """MQTT bridge counters; each is written by a single thread."""
+
+    def __init__(self) -> None:
+        self.messages = 0  # paho network thread
+        self.invalid = 0  # batcher thread
+        self.batches = 0  # batcher thread
+        self.telemetry = 0  # paho network thread
+        self.telemetry_invalid = 0  # rules thread
+        self.forwarded_alerts = 0  # batcher thread
+        self.forwarded_telemetry = 0  # rules thread
+        self.shard_received = 0  # paho network thread
 
-    future = asyncio.run_coroutine_threadsafe(process_alert(payload), _event_loop)
 
-    def _handle_future_result(task: asyncio.Future) -> None:
+_bridge_stats = BridgeStats()
+_ALERT_ADAPTER: TypeAdapter[AlertPayload] = TypeAdapter(AlertPayload)
+_ALERT_BATCH_ADAPTER: TypeAdapter[list[AlertPayload]] = TypeAdapter(list[AlertPayload])
+# (message, already routed to this shard) from paho's network thread; None
+# stops the batcher
+_mqtt_inbox: queue.SimpleQueue[Optional[tuple[mqtt.MQTTMessage, bool]]] = queue.SimpleQueue()
+_mqtt_batcher: Optional[threading.Thread] = None
+_bridge_tasks: set[asyncio.Task[None]] = set()
+# The most recent batch's journal-then-ack task; each batch acks after it
+_last_ack_task: Optional[asyncio.Task[None]] = None
+
+
+def _validate_batch(raws: list[bytes]) -> list[AlertPayload]:
+    """Parse and validate a whole batch straight from bytes in one call.
+
+    The payloads are spliced into one JSON array. If that fails (or a payload
+    smuggled in extra array items), each message is validated on its own so
+    only the bad ones are dropped.
+    """
+    try:
+        payloads = _ALERT_BATCH_ADAPTER.validate_json(b"[" + b",".join(raws) + b"]")
+        if len(payloads) == len(raws):
+            return payloads
+    except ValidationError:
+        pass
+    payloads = []
+    for raw in raws:
         try:
-            task.result()
-        except HTTPException as exc:  # pragma: no cover - logged for observability
-            _log(
+            payloads.append(_ALERT_ADAPTER.validate_json(raw))
+        except ValidationError as exc:
+            _bridge_stats.invalid += 1
+            _log.sampled("warning", "MQTT payload failed validation", error=str(exc))
+    return payloads
+
+
+def _run_mqtt_batcher(loop: asyncio.AbstractEventLoop) -> None:
+    """Collect raw messages into micro-batches and hand each to the loop once.
+
+    A batch closes after ``MQTT_BATCH_MAX`` messages or ``MQTT_BATCH_LINGER_MS``
+    after its first message, whichever comes first.
+    """
+    inbox = _mqtt_inbox
+    linger_s = MQTT_BATCH_LINGER_MS / 1000.0
+    stopping = False
+    while not stopping:
+        first = inbox.get()
+        if first is None:
+            return
+        batch = [first]
+        deadline = time.monotonic() + linger_s
+        while len(batch) < MQTT_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = inbox.get(timeout=remaining) if remaining > 0 else inbox.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                stopping = True
+                break
+            batch.append(entry)
+        _bridge_stats.batches += 1
+        fresh = [message.payload for message, routed in batch if not routed]
+        # Only real alerts are worth a hop to another shard
+        alerts = _route_alerts([payload for payload in _validate_batch(fresh) if payload.alert]) if fresh else []
+        if len(fresh) < len(batch):
+            # Forwarded by another shard: ours by definition, never re-routed
+            forwarded = _validate_batch([message.payload for message, routed in batch if routed])
+            alerts += [payload for payload in forwarded if payload.alert]
+        # Every message in the batch, dropped ones included, is acked once the
+        # batch is journaled
+        acks = [(message.mid, message.qos) for message, _ in batch if message.qos]
+        if alerts or acks:
+            try:
+                loop.call_soon_threadsafe(_ingest_mqtt_batch, alerts, acks)
+            except RuntimeError:  # loop closed during shutdown
+                return
+
+
+def _route_alerts(payloads: list[AlertPayload]) -> list[AlertPayload]:
+    """Forward alerts owned by other shards; returns the ones owned here."""
+    if _ring is None:
+        return payloads
+    local = []
+    for payload in payloads:
+        owner = _remote_owner(payload.grid_ref)
+        if owner is None:
+            local.append(payload)
+        else:
+            _forward_to_shard(owner, "alerts", payload.model_dump_json().encode(), qos=1)
+            _bridge_stats.forwarded_alerts += 1
+    return local
+
+
+def _ingest_mqtt_batch(payloads: list[AlertPayload], acks: Optional[list[tuple[int, int]]] = None) -> None:
+    """Accept a validated batch on the event loop; journal it in one commit.
+
+    ``acks`` are the (mid, qos) of the batch's messages, acknowledged only
+    after the commit, so the broker still holds anything that was lost.
+    """
+    global _last_ack_task
+    accepted: list[tuple[AlertGroup, dict[str, Any]]] = []
+    for payload in payloads:
+        try:
+            _, record, group = _accept_alert(payload)
+        except HTTPException as exc:
+            _log.sampled(
                 "warning",
                 "MQTT alert rejected",
                 status=exc.status_code,
                 detail=exc.detail,
             )
-        except Exception as exc:  # pragma: no cover - defensive logging
-            _log("error", "MQTT alert processing failed", error=str(exc))
+            continue
+        accepted.append((group, record))
+    if not accepted and not acks:
+        return
+    task = asyncio.get_running_loop().create_task(_journal_then_ack(accepted, acks or [], _last_ack_task))
+    _last_ack_task = task
+    _bridge_tasks.add(task)
+    task.add_done_callback(_bridge_tasks.discard)
+
+
+async def _journal_then_ack(
+    accepted: list[tuple[AlertGroup, dict[str, Any]]],
+    acks: list[tuple[int, int]],
+    previous: Optional[asyncio.Task[None]],
+) -> None:
+    try:
+        await _commit_alerts(accepted, retries=MQTT_JOURNAL_RETRIES)
+    except HTTPException:
+        # Left unacked and withdrawn; the persistent session hands the batch
+        # back when the bridge next reconnects
+        _log("error", "MQTT batch left unacked after journal retries", messages=len(acks))
+        return
+    if previous is not None:
+        # PUBACKs go out in the order the messages arrived
+        await asyncio.wait([previous])
+    client = _mqtt_client
+    if client is not None:
+        for mid, qos in acks:
+            client.ack(mid, qos)
+
+
+# ---------------------------------------------------------------------------
+# Sharding
+# ---------------------------------------------------------------------------
+
+_SHARD_TOPIC_ROOT = SHARD_TOPIC_PREFIX + "/"
+# How long an HTTP caller waits for the broker to take a forwarded alert
+_FORWARD_TIMEOUT_S = 5.0
+
+
+def _remote_owner(grid_ref: str) -> Optional[int]:
+    """The shard that owns ``grid_ref`` if it is not this one; None otherwise."""
+    if _ring is None:
+        return None
+    owner = _ring.owner(grid_ref)
+    return None if owner == SHARD_ID else owner
+
+
+def _shard_topic(shard: Optional[int], kind: str) -> str:
+    return f"{_SHARD_TOPIC_ROOT}{shard}/{kind}"
+
+
+def _shared(topic: str) -> str:
+    """Ingest topics are shared across the group in sharded mode."""
+    return f"$share/{SHARD_GROUP}/{topic}" if _ring is not None else topic
+
+
+def _forward_to_shard(shard: int, kind: str, body: bytes, qos: int) -> mqtt.MQTTMessageInfo:
+    # paho's publish is thread-safe; the batcher and rules threads both use it
+    assert _mqtt_client is not None, "MQTT bridge not started"
+    return _mqtt_client.publish(_shard_topic(shard, kind), body, qos=qos)
+
+
+async def _forward_alert(payload: AlertPayload, owner: int) -> TriggerResponse:
+    """Hand an HTTP alert to its owning shard; returns once the broker has it."""
+    if _mqtt_client is None:
+        raise HTTPException(status_code=503, detail="MQTT bridge not connected; cannot reach owner shard")
+    info = _forward_to_shard(owner, "alerts", payload.model_dump_json().encode(), qos=1)
+    try:
+        await asyncio.to_thread(info.wait_for_publish, _FORWARD_TIMEOUT_S)
+    except (RuntimeError, ValueError):
+        pass
+    if not info.is_published():
+        _log.sampled("warning", "Alert forward to owner shard failed", shard=owner, grid_ref=payload.grid_ref)
+        raise HTTPException(status_code=503, detail=f"Could not forward to owner shard {owner}")
+    _metrics.forwarded += 1
+    return TriggerResponse(status="forwarded", shard=owner)
+
+
+def _on_shard_alert_message(
+    _client: mqtt.Client,
+    _userdata: Any,
+    message: mqtt.MQTTMessage,
+) -> None:
+    _bridge_stats.shard_received += 1
+    _mqtt_inbox.put((message, True))
+
+
+# ---------------------------------------------------------------------------
+# Telemetry rules
+# ---------------------------------------------------------------------------
+
+# Columnar multi-reading payload published by the simulator in envelope mode
+ENVELOPE_SCHEMA = "geoint.telemetry.envelope/v1"
+
+_rule_engine: Optional[RuleEngine] = None
+# Raw (topic, payload) telemetry from paho's network thread; None stops the
+# rules thread
+_telemetry_inbox: queue.SimpleQueue[Optional[tuple[str, bytes]]] = queue.SimpleQueue()
+_rules_thread: Optional[threading.Thread] = None
+
+
+def _load_rule_engine() -> None:
+    """Compile RULES_FILE; a bad rules file stops startup."""
+    global _rule_engine
+    if not RULES_FILE:
+        return
+    _rule_engine = RuleEngine(rules.load_rules(RULES_FILE))
+    _log("info", "Alert rules loaded", path=RULES_FILE, rules=len(_rule_engine), topics=RULES_TOPICS)
+    if not MQTT_BRIDGE_ENABLED:
+        _log("warning", "Alert rules loaded but the MQTT bridge is disabled; no telemetry will reach them")
+
+
+def _rule_alert(fired: list[rules.Rule], sample: dict[str, Any]) -> AlertPayload:
+    """The alert a telemetry sample raised; validated like a published one."""
+    return AlertPayload.model_validate({**sample, "alert": True, "matched_rules": [rule.name for rule in fired]})
 
-    future.add_done_callback(_handle_future_result)
+
+def _sub_envelope(message: dict[str, Any], indices: list[int]) -> bytes:
+    """The readings at ``indices`` of an envelope, as an envelope of their own."""
+    return to_json(
+        {
+            "schema": ENVELOPE_SCHEMA,
+            "sensor_type": message["sensor_type"],
+            "timestamp": message["timestamp"],
+            "count": len(indices),
+            **{
+                name: [message[name][i] for i in indices]
+                for name in ("sensor_id", "grid_ref", "lat", "lon", "alert")
+                if name in message
+            },
+            "reading": {name: [column[i] for i in indices] for name, column in message["reading"].items()},
+        }
+    )
+
+
+def _evaluate_telemetry(engine: RuleEngine, topic: str, raw: bytes) -> list[AlertPayload]:
+    """Run one telemetry message (single reading or envelope) through the rules.
+
+    In sharded mode, readings whose grid_ref another shard owns are forwarded
+    there first, so each sensor's rule windows live on one replica.
+    """
+    # Forwarded from another shard: already ours, and not a sensor topic
+    routed = _ring is not None and topic.startswith(_SHARD_TOPIC_ROOT)
+    if not routed and topic.endswith("/telemetry"):
+        # geoint/sensors/{type}/{id}/telemetry: types without rules are
+        # skipped without parsing
+        parts = topic.split("/")
+        if len(parts) >= 3 and not engine.rules_for(parts[-3]):
+            return []
+    message = from_json(raw)
+    if message.get("schema") != ENVELOPE_SCHEMA:
+        if _ring is not None and not routed and (owner := _remote_owner(message["grid_ref"])) is not None:
+            _forward_to_shard(owner, "telemetry", raw, qos=0)
+            _bridge_stats.forwarded_telemetry += 1
+            return []
+        fired = engine.evaluate(message["sensor_type"], message["sensor_id"], message["reading"])
+        return [_rule_alert(fired, message)] if fired else []
+    sensor_type = message["sensor_type"]
+    wanted = {rule.field for rule in engine.rules_for(sensor_type)}
+    if not wanted:
+        return []
+    indices: Iterable[int] = range(len(message["sensor_id"]))
+    if _ring is not None and not routed:
+        by_owner: dict[Optional[int], list[int]] = {}
+        for i, grid_ref in enumerate(message["grid_ref"]):
+            by_owner.setdefault(_remote_owner(grid_ref), []).append(i)
+        indices = by_owner.pop(None, [])
+        for owner, owned in by_owner.items():
+            assert owner is not None
+            _forward_to_shard(owner, "telemetry", _sub_envelope(message, owned), qos=0)
+            _bridge_stats.forwarded_telemetry += len(owned)
+    columns = message["reading"]
+    sensor_ids = message["sensor_id"]
+    # Only the columns the rules read are transposed per sensor
+    used = [(name, columns[name]) for name in wanted if name in columns]
+    alerts = []
+    for i in indices:
+        sensor_id = sensor_ids[i]
+        fired = engine.evaluate(sensor_type, sensor_id, {name: column[i] for name, column in used})
+        if fired:
+            sample = {
+                "sensor_id": sensor_id,
+                "sensor_type": sensor_type,
+                "grid_ref": message["grid_ref"][i],
+                "lat": message["lat"][i],
+                "lon": message["lon"][i],
+                "timestamp": message["timestamp"],
+                "reading": {name: column[i] for name, column in columns.items()},
+            }
+            alerts.append(_rule_alert(fired, sample))
+    return alerts
+
+
+def _run_rules(loop: asyncio.AbstractEventLoop, engine: RuleEngine) -> None:
+    """Evaluate queued telemetry and hand any alerts it raises to the loop.
+
+    Runs on its own thread so rule evaluation never delays the event loop or
+    the alert batcher. Whatever has queued up is drained in one pass, up to
+    ``MQTT_BATCH_MAX`` messages.
+    """
+    inbox = _telemetry_inbox
+    while True:
+        batch = [inbox.get()]
+        while len(batch) < MQTT_BATCH_MAX:
+            try:
+                batch.append(inbox.get_nowait())
+            except queue.Empty:
+                break
+        alerts: list[AlertPayload] = []
+        stopping = False
+        for entry in batch:
+            if entry is None:
+                stopping = True
+                break
+            try:
+                alerts.extend(_evaluate_telemetry(engine, *entry))
+            except (ValueError, KeyError, TypeError, IndexError) as exc:
+                _bridge_stats.telemetry_invalid += 1
+                _log.sampled("warning", "Telemetry message could not be evaluated", topic=entry[0], error=str(exc))
+        if alerts:
+            try:
+                loop.call_soon_threadsafe(_ingest_mqtt_batch, alerts)
+            except RuntimeError:  # loop closed during shutdown
+                return
+        if stopping:
+            return
+
+
+def _on_telemetry_message(
+    client: mqtt.Client,
+    _userdata: Any,
+    message: mqtt.MQTTMessage,
+) -> None:
+    _bridge_stats.telemetry += 1
+    # A lost reading only shifts a rule window, so telemetry is acked at once
+    client.ack(message.mid, message.qos)
+    _telemetry_inbox.put((message.topic, message.payload))
 
 
 def _on_mqtt_connect(
@@ -231,13 +1615,23 @@ def _on_mqtt_connect(
     _properties: Any = None,
 ) -> None:
     if reason_code == 0:
-        client.subscribe(MQTT_ALERT_TOPIC, qos=1)
+        topics = [(_shared(MQTT_ALERT_TOPIC), 1)] if MQTT_ALERT_TOPIC else []
+        if _rule_engine is not None:
+            # A lost reading only shifts a rule window by one sample; not
+            # worth a PUBACK per telemetry message
+            topics += [(_shared(topic), 0) for topic in RULES_TOPICS]
+        if _ring is not None:
+            # What other shards forward to this one
+            topics.append((_shard_topic(SHARD_ID, "alerts"), 1))
+            if _rule_engine is not None:
+                topics.append((_shard_topic(SHARD_ID, "telemetry"), 0))
+        client.subscribe(topics)
         _log(
             "info",
             "MQTT alert bridge connected",
             host=MQTT_ALERT_HOST,
             port=MQTT_ALERT_PORT,
-            topic=MQTT_ALERT_TOPIC,
+            topics=[topic for topic, _ in topics],
         )
     else:
         _log(
@@ -249,7 +1643,13 @@ def _on_mqtt_connect(
         )
 
 
-def _on_mqtt_disconnect(client: mqtt.Client, _userdata: Any, reason_code: int) -> None:
+def _on_mqtt_disconnect(
+    client: mqtt.Client,
+    _userdata: Any,
+    _flags: Any,
+    reason_code: int,
+    _properties: Any = None,
+) -> None:
     _log(
         "info",
         "MQTT alert bridge disconnected",
@@ -263,26 +1663,9 @@ def _on_mqtt_message(
     _userdata: Any,
     message: mqtt.MQTTMessage,
 ) -> None:
-    try:
-        decoded = message.payload.decode("utf-8")
-        data = json.loads(decoded)
-    except UnicodeDecodeError as exc:
-        _log("warning", "MQTT payload decode failed", error=str(exc))
-        return
-    except json.JSONDecodeError as exc:
-        _log("warning", "MQTT payload is not valid JSON", error=str(exc))
-        return
-
-    if not data.get("alert"):
-        return
-
-    try:
-        payload = AlertPayload(**data)
-    except ValidationError as exc:
-        _log("warning", "MQTT payload failed schema validation", error=str(exc))
-        return
-
-    _schedule_alert_from_mqtt(payload)
+    # paho's network thread only hands the bytes off; parsing happens per batch
+    _bridge_stats.messages += 1
+    _mqtt_inbox.put((message, False))
 
 
 async def _start_mqtt_bridge() -> None:
@@ -290,15 +1673,38 @@ async def _start_mqtt_bridge() -> None:
         _log("info", "MQTT alert bridge disabled via configuration")
         return
 
-    global _mqtt_client, _event_loop
+    global _mqtt_client, _event_loop, _mqtt_batcher, _rules_thread
     if _mqtt_client is not None:
         return
 
     _event_loop = asyncio.get_running_loop()
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    _mqtt_batcher = threading.Thread(
+        target=_run_mqtt_batcher, args=(_event_loop,), name="mqtt-batcher", daemon=True
+    )
+    _mqtt_batcher.start()
+    # Alerts are acked once journaled, not when the callback returns. The
+    # session outlives the connection, so an alert left unacked is redelivered
+    # when the bridge reconnects or the replica restarts under the same id.
+    client = mqtt.Client(
+        mqtt.CallbackAPIVersion.VERSION2,
+        client_id=MQTT_ALERT_CLIENT_ID,
+        clean_session=False,
+        manual_ack=True,
+    )
     client.on_connect = _on_mqtt_connect
     client.on_message = _on_mqtt_message
     client.on_disconnect = _on_mqtt_disconnect
+    if _rule_engine is not None:
+        _rules_thread = threading.Thread(
+            target=_run_rules, args=(_event_loop, _rule_engine), name="alert-rules", daemon=True
+        )
+        _rules_thread.start()
+        for topic in RULES_TOPICS:
+            client.message_callback_add(topic, _on_telemetry_message)
+        if _ring is not None:
+            client.message_callback_add(_shard_topic(SHARD_ID, "telemetry"), _on_telemetry_message)
+    if _ring is not None:
+        client.message_callback_add(_shard_topic(SHARD_ID, "alerts"), _on_shard_alert_message)
     if MQTT_ALERT_USERNAME:
         client.username_pw_set(MQTT_ALERT_USERNAME, MQTT_ALERT_PASSWORD)
 
@@ -315,20 +1721,38 @@ def _stop_mqtt_bridge() -> None:
     if _mqtt_client is None:
         return
 
-    _mqtt_client.loop_stop()
+    # The batcher and rules threads may still forward through the client, so
+    # they finish first; disconnecting before loop_stop lets the network
+    # thread send what they queued
+    if _mqtt_batcher is not None:
+        _mqtt_inbox.put(None)
+        _mqtt_batcher.join(timeout=2.0)
+    if _rules_thread is not None:
+        _telemetry_inbox.put(None)
+        _rules_thread.join(timeout=2.0)
     _mqtt_client.disconnect()
+    _mqtt_client.loop_stop()
     _mqtt_client = None
     _log("info", "MQTT alert bridge stopped")
 
 
 @app.on_event("startup")
 async def _on_startup() -> None:
+    _load_rule_engine()
+    await _start_geofence()
+    await _start_dispatcher()
+    _open_journal()
     await _start_mqtt_bridge()
 
 
 @app.on_event("shutdown")
 async def _on_shutdown() -> None:
     _stop_mqtt_bridge()
+    await _stop_geofence()
+    await _stop_dispatcher()
+    await _close_journal()
+    # uvicorn re-raises SIGTERM once shutdown completes, so atexit never runs
+    _log.flush()
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,199 @@
+"""
+GEOINT Demo — IoT Backbone: Threshold Rules
+============================================
+Declarative alert rules evaluated against raw sensor telemetry, so the
+processor decides what counts as an anomaly instead of trusting the
+simulator's ``alert`` flag.
+
+A rules file holds one rule per line; ``#`` starts a comment::
+
+    # [name:] sensor_type.field  op  value  [for K of N [samples]]
+    seismic.magnitude > 2.5 for 3 of 5
+    rf-burst: rf-detector.power_dbm >= -40 for 2 of 3
+    weather-station.temperature_c > 35
+    rf-detector.modulation == "FHSS"
+
+``op`` is one of ``> >= < <= == !=``. ``sensor_type`` may be ``*`` to match
+every type. A rule holds once at least K of a sensor's last N samples passed
+its comparison (default 1 of 1), and fires when it goes from not holding to
+holding. It fires again only after it has stopped holding.
+
+The file is compiled once. Rules are grouped by sensor type, so a sample only
+meets the rules that can apply to it. Each sensor's window for a rule is an
+N-bit shift register in a plain int (N ≤ 64). Recording a sample is a shift
+and a mask, and the K-of-N test is a popcount. Per-sensor state is one small
+list of ints, whatever the window lengths.
+"""
+
+from __future__ import annotations
+
+import operator
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+MAX_WINDOW = 64
+
+_OPS: dict[str, Callable[[Any, Any], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+_RULE_RE = re.compile(
+    r"""^\s*
+    (?:(?P<name>[\w.-]+)\s*:\s*)?
+    (?P<type>\*|[\w-]+)\.(?P<field>\w+)\s*
+    (?P<op>>=|<=|==|!=|>|<)\s*
+    (?:(?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|"(?P<string>[^"]*)")
+    (?:\s+for\s+(?P<k>\d+)\s+of\s+(?P<n>\d+)(?:\s+samples?)?)?
+    \s*$""",
+    re.VERBOSE,
+)
+
+
+class RuleError(ValueError):
+    """A rules file line that does not parse or makes no sense."""
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One compiled threshold rule."""
+
+    name: str
+    sensor_type: str  # or "*"
+    field: str
+    op: str
+    value: float | str
+    k: int = 1
+    n: int = 1
+    mask: int = field(repr=False, default=1)  # low N bits
+    # Compiled comparison: reading value -> passed
+    test: Callable[[Any], bool] = field(repr=False, compare=False, default=lambda _: False)
+
+
+def _compile_test(op: str, value: float | str) -> Callable[[Any], bool]:
+    compare = _OPS[op]
+    if isinstance(value, str):
+        return lambda v: v.__class__ is str and compare(v, value)
+    # bool is an int subclass but never a meaningful reading to compare
+    numeric = (int, float)
+    return lambda v: v.__class__ in numeric and compare(v, value)
+
+
+def parse_rule(text: str, line: int = 0) -> Rule:
+    match = _RULE_RE.match(text)
+    if match is None:
+        raise RuleError(f"line {line}: cannot parse rule {text.strip()!r}")
+    groups = match.groupdict()
+    value: float | str
+    if groups["number"] is not None:
+        value = float(groups["number"])
+    else:
+        value = groups["string"]
+        if groups["op"] not in ("==", "!="):
+            raise RuleError(f"line {line}: strings only compare with == or !=")
+    k = int(groups["k"] or 1)
+    n = int(groups["n"] or 1)
+    if not 1 <= k <= n <= MAX_WINDOW:
+        raise RuleError(f"line {line}: need 1 <= K <= N <= {MAX_WINDOW}, got {k} of {n}")
+    canonical = f'{groups["type"]}.{groups["field"]} {groups["op"]} {groups["number"] or repr(value)}'
+    if n > 1:
+        canonical += f" for {k} of {n}"
+    return Rule(
+        name=groups["name"] or canonical,
+        sensor_type=groups["type"],
+        field=groups["field"],
+        op=groups["op"],
+        value=value,
+        k=k,
+        n=n,
+        mask=(1 << n) - 1,
+        test=_compile_test(groups["op"], value),
+    )
+
+
+def parse_rules(text: str) -> list[Rule]:
+    rules = []
+    for line, raw in enumerate(text.splitlines(), start=1):
+        stripped = raw.split("#", 1)[0].strip()
+        if stripped:
+            rules.append(parse_rule(stripped, line))
+    names = [rule.name for rule in rules]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise RuleError(f"duplicate rule names: {', '.join(duplicates)}")
+    return rules
+
+
+def load_rules(path: str) -> list[Rule]:
+    with open(path, encoding="utf-8") as fh:
+        return parse_rules(fh.read())
+
+
+class RuleEngine:
+    """Per-sensor sliding-window evaluation of a compiled rule set.
+
+    Not thread-safe: feed it from one thread.
+    """
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self.rules = tuple(rules)
+        self._wildcard = tuple(rule for rule in self.rules if rule.sensor_type == "*")
+        self._by_type: dict[str, tuple[Rule, ...]] = {}
+        for rule in self.rules:
+            if rule.sensor_type != "*":
+                self._by_type.setdefault(rule.sensor_type, ())
+        for sensor_type in self._by_type:
+            self._by_type[sensor_type] = tuple(
+                rule for rule in self.rules if rule.sensor_type in (sensor_type, "*")
+            )
+        # (sensor_type, sensor_id) -> one window per rule, then the bitmask
+        # of rules currently holding
+        self._state: dict[tuple[str, str], list[int]] = {}
+        self.samples = 0
+        self.fired: dict[str, int] = {rule.name: 0 for rule in self.rules}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @property
+    def sensors(self) -> int:
+        return len(self._state)
+
+    def rules_for(self, sensor_type: str) -> tuple[Rule, ...]:
+        rules = self._by_type.get(sensor_type)
+        return self._wildcard if rules is None else rules
+
+    def evaluate(self, sensor_type: str, sensor_id: str, reading: dict[str, Any]) -> Optional[list[Rule]]:
+        """Record one sample; returns the rules it made fire, if any."""
+        rules = self.rules_for(sensor_type)
+        if not rules:
+            return None
+        self.samples += 1
+        key = (sensor_type, sensor_id)
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = [0] * (len(rules) + 1)
+        holding = state[-1]
+        fired: Optional[list[Rule]] = None
+        get = reading.get
+        for i, rule in enumerate(rules):
+            value = get(rule.field)
+            window = ((state[i] << 1) | (value is not None and rule.test(value))) & rule.mask
+            state[i] = window
+            flag = 1 << i
+            if window.bit_count() >= rule.k:
+                if not holding & flag:
+                    holding |= flag
+                    self.fired[rule.name] += 1
+                    if fired is None:
+                        fired = []
+                    fired.append(rule)
+            else:
+                holding &= ~flag
+        state[-1] = holding
+        return fired
@@ -0,0 +1,189 @@
+"""
+GEOINT Demo — IoT Backbone: Dispatch Scheduler
+===============================================
+Bounded multi-level queue in front of the vision dispatch workers.
+
+Each priority level (0 = most urgent) is a FIFO. ``get`` picks a level by
+smooth weighted round robin over the non-empty levels. With weights 8:4:2:1
+and every level busy, the urgent level gets eight of every fifteen slots and
+the least urgent still gets one, so nothing starves. A level that is alone in
+the queue gets every slot.
+
+Ageing bounds how long a job can wait behind more urgent traffic. A job that
+has sat at its level for ``ageing_s`` moves up one level, and it keeps moving
+up every ``ageing_s`` until it reaches the top.
+
+When the queue is full, a job is admitted only if something less urgent is
+queued. The newest job at the least urgent non-empty level is displaced and
+returned to the caller. Under saturation the least important work is dropped
+first.
+
+The API mirrors the parts of ``asyncio.Queue`` the dispatcher uses.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Generic, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def _wakeup_next(waiters: Deque[asyncio.Future[None]]) -> None:
+    while waiters:
+        waiter = waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+            break
+
+
+class WeightedPriorityQueue(Generic[T]):
+    """Multi-level queue with weighted fair scheduling, ageing and displacement."""
+
+    def __init__(
+        self,
+        maxsize: int,
+        weights: Sequence[int],
+        *,
+        ageing_s: float,
+        level_of: Callable[[T], int],
+    ) -> None:
+        if not weights:
+            raise ValueError("at least one priority level is required")
+        self.maxsize = max(1, maxsize)
+        self.weights = tuple(max(1, int(w)) for w in weights)
+        self.ageing_s = ageing_s
+        self._level_of = level_of
+        # Per level: (time the item reached this level, item), oldest first
+        self._levels: list[Deque[tuple[float, T]]] = [deque() for _ in self.weights]
+        self._credit = [0] * len(self.weights)
+        self._size = 0
+        self._getters: Deque[asyncio.Future[None]] = deque()
+        self._putters: Deque[asyncio.Future[None]] = deque()
+        self.aged = 0
+        self.displaced = 0
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def full(self) -> bool:
+        return self._size >= self.maxsize
+
+    def depths(self) -> list[int]:
+        return [len(level) for level in self._levels]
+
+    def level(self, item: T) -> int:
+        return min(max(self._level_of(item), 0), len(self._levels) - 1)
+
+    def admits(self, level: int) -> bool:
+        """Whether a job at ``level`` would be accepted right now."""
+        return not self.full() or any(self._levels[lower] for lower in range(level + 1, len(self._levels)))
+
+    # -- writes ----------------------------------------------------------------
+
+    def _push(self, item: T) -> None:
+        self._levels[self.level(item)].append((time.monotonic(), item))
+        self._size += 1
+        _wakeup_next(self._getters)
+
+    def put_nowait(self, item: T) -> Optional[T]:
+        """Queue ``item``; returns the job it displaced, if the queue was full.
+
+        Raises ``asyncio.QueueFull`` when nothing less urgent can make room.
+        """
+        displaced: Optional[T] = None
+        if self.full():
+            level = self.level(item)
+            for lower in range(len(self._levels) - 1, level, -1):
+                if self._levels[lower]:
+                    displaced = self._levels[lower].pop()[1]
+                    if not self._levels[lower]:
+                        self._credit[lower] = 0
+                    self._size -= 1
+                    self.displaced += 1
+                    break
+            else:
+                raise asyncio.QueueFull
+        self._push(item)
+        return displaced
+
+    async def put(self, item: T) -> None:
+        """Queue ``item``, waiting for space rather than displacing anything."""
+        while self.full():
+            putter = asyncio.get_running_loop().create_future()
+            self._putters.append(putter)
+            try:
+                await putter
+            except BaseException:
+                putter.cancel()
+                try:
+                    self._putters.remove(putter)
+                except ValueError:
+                    pass
+                if not self.full() and not putter.cancelled():
+                    _wakeup_next(self._putters)
+                raise
+        self._push(item)
+
+    # -- reads -----------------------------------------------------------------
+
+    def _age(self) -> None:
+        now = time.monotonic()
+        for level in range(1, len(self._levels)):
+            waiting = self._levels[level]
+            while waiting and (waited := now - waiting[0][0]) >= self.ageing_s:
+                # Ageing is applied lazily, so catch up on every period missed
+                target = max(0, level - int(waited // self.ageing_s))
+                self._levels[target].append((now, waiting.popleft()[1]))
+                self.aged += 1
+            if not waiting:
+                self._credit[level] = 0
+
+    def _pick(self) -> int:
+        """Smooth weighted round robin over the non-empty levels."""
+        best = -1
+        total = 0
+        for level, waiting in enumerate(self._levels):
+            if waiting:
+                self._credit[level] += self.weights[level]
+                total += self.weights[level]
+                if best < 0 or self._credit[level] > self._credit[best]:
+                    best = level
+        self._credit[best] -= total
+        return best
+
+    def get_nowait(self) -> T:
+        if self._size == 0:
+            raise asyncio.QueueEmpty
+        if self.ageing_s > 0:
+            self._age()
+        level = self._pick()
+        waiting = self._levels[level]
+        item = waiting.popleft()[1]
+        if not waiting:
+            self._credit[level] = 0
+        self._size -= 1
+        _wakeup_next(self._putters)
+        return item
+
+    async def get(self) -> T:
+        while self.empty():
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except BaseException:
+                getter.cancel()
+                try:
+                    self._getters.remove(getter)
+                except ValueError:
+                    pass
+                if not self.empty() and not getter.cancelled():
+                    _wakeup_next(self._getters)
+                raise
+        return self.get_nowait()
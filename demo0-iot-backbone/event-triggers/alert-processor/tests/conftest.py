@@ -0,0 +1,23 @@
+"""Make the processor modules and the shared ``common`` modules importable,
+as the Docker image does by copying them side by side."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent
+sys.path[:0] = [str(_HERE.parent), str(_HERE.parents[2] / "common")]
+
+
+class FakeClock:
+    """Stands in for ``time`` in modules that read ``time.monotonic()``."""
+
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+import breaker
+import processor
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from conftest import FakeClock
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(breaker, "time", fake)
+    return fake
+
+
+def _breaker(changes: list[tuple[str, str]] | None = None) -> CircuitBreaker:
+    on_change = None if changes is None else (lambda old, new: changes.append((old, new)))
+    return CircuitBreaker(
+        window_s=30.0,
+        min_calls=4,
+        failure_rate=0.5,
+        slow_call_s=2.0,
+        slow_call_rate=0.75,
+        open_s=15.0,
+        half_open_probes=2,
+        on_change=on_change,
+    )
+
+
+def _trip(cb: CircuitBreaker) -> None:
+    for _ in range(cb.min_calls):
+        assert cb.allow()
+        cb.record(False, 0.1)
+
+
+def test_stays_closed_below_min_calls(clock: FakeClock) -> None:
+    cb = _breaker()
+    for _ in range(3):
+        cb.record(False, 0.1)
+    assert cb.state == CLOSED
+
+
+def test_opens_on_failure_rate_and_rejects(clock: FakeClock) -> None:
+    changes: list[tuple[str, str]] = []
+    cb = _breaker(changes)
+    cb.record(True, 0.1)
+    cb.record(True, 0.1)
+    cb.record(False, 0.1)
+    assert cb.state == CLOSED
+    cb.record(False, 0.1)
+    assert cb.state == OPEN and changes == [(CLOSED, OPEN)]
+    assert not cb.allow()
+    assert cb.rejected == 1
+    assert cb.retry_in() == pytest.approx(15.0)
+
+
+def test_opens_on_slow_call_rate(clock: FakeClock) -> None:
+    cb = _breaker()
+    for latency in (2.5, 3.0, 2.0, 0.1):
+        cb.record(True, latency)
+    assert cb.state == OPEN
+
+
+def test_outcomes_older_than_the_window_are_evicted(clock: FakeClock) -> None:
+    cb = _breaker()
+    for _ in range(3):
+        cb.record(False, 0.1)
+    clock.advance(31.0)
+    cb.record(False, 0.1)
+    assert cb.state == CLOSED
+    assert cb.snapshot()["window_calls"] == 1
+
+
+def test_reading_state_has_no_side_effects(clock: FakeClock) -> None:
+    cb = _breaker()
+    _trip(cb)
+    clock.advance(20.0)
+    assert cb.state == OPEN
+    assert cb.snapshot()["state"] == OPEN
+    assert cb.allow()
+    assert cb.state == HALF_OPEN
+
+
+def test_half_open_closes_after_all_probes_pass(clock: FakeClock) -> None:
+    changes: list[tuple[str, str]] = []
+    cb = _breaker(changes)
+    _trip(cb)
+    clock.advance(15.0)
+    assert cb.allow() and cb.allow()
+    # Only half_open_probes calls are admitted until they settle
+    assert not cb.allow()
+    cb.record(True, 0.1)
+    assert cb.state == HALF_OPEN
+    cb.record(True, 0.1)
+    assert cb.state == CLOSED
+    assert changes == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+    assert cb.snapshot()["window_calls"] == 0
+
+
+@pytest.mark.parametrize("ok, latency", [(False, 0.1), (True, 5.0)])
+def test_failed_or_slow_probe_reopens(clock: FakeClock, ok: bool, latency: float) -> None:
+    cb = _breaker()
+    _trip(cb)
+    clock.advance(15.0)
+    assert cb.allow()
+    cb.record(ok, latency)
+    assert cb.state == OPEN
+    assert cb.opened_count == 2
+
+
+def test_late_result_while_open_is_ignored(clock: FakeClock) -> None:
+    cb = _breaker()
+    _trip(cb)
+    cb.record(True, 0.1)
+    assert cb.state == OPEN
+    assert cb.snapshot()["window_calls"] == cb.min_calls
+
+
+@pytest.mark.parametrize("error", [RuntimeError("client bug"), asyncio.CancelledError()])
+def test_dispatch_settles_a_probe_that_raises(
+    clock: FakeClock, monkeypatch: pytest.MonkeyPatch, error: BaseException
+) -> None:
+    class BrokenClient:
+        async def post(self, *_args: Any, **_kwargs: Any) -> Any:
+            raise error
+
+    cb = CircuitBreaker(min_calls=1, open_s=15.0, half_open_probes=1)
+    monkeypatch.setattr(processor, "_breaker", cb)
+    monkeypatch.setattr(processor, "_http_client", BrokenClient())
+    cb.record(False, 0.1)
+    clock.advance(15.0)
+
+    async def dispatch() -> None:
+        monkeypatch.setattr(processor, "_dispatch_slots", asyncio.Semaphore(1))
+        await processor._post_job(processor.DispatchJob("job-1", {}))
+
+    with pytest.raises(type(error)):
+        asyncio.run(dispatch())
+    # The probe counted as a failure instead of holding the only slot forever
+    assert cb.state == OPEN
+    clock.advance(15.0)
+    assert cb.allow()
@@ -0,0 +1,218 @@
+"""Alerts become visible and are acknowledged only once they are journaled."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Optional
+
+import pytest
+from fastapi import HTTPException
+
+import processor
+from alert_store import AlertStore
+from coalesce import AlertGroup, Coalescer
+
+
+class FakeJournal:
+    """``record_alerts`` fails the first ``failures`` calls, and every call
+    holding an alert from a ``poisoned`` sensor."""
+
+    def __init__(self, failures: int = 0, poisoned: tuple[str, ...] = ()) -> None:
+        self.failures = failures
+        self.poisoned = poisoned
+        self.committed: list[dict[str, Any]] = []
+
+    async def record_alerts(self, records: list[dict[str, Any]]) -> None:
+        await asyncio.sleep(0)
+        if any(record["sensor_id"] in self.poisoned for record in records):
+            raise OSError("disk I/O error")
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk I/O error")
+        self.committed += records
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.acked: list[int] = []
+
+    def ack(self, mid: int, qos: int) -> None:
+        self.acked.append(mid)
+
+
+@pytest.fixture
+def flushed(monkeypatch: pytest.MonkeyPatch) -> list[AlertGroup]:
+    groups: list[AlertGroup] = []
+    monkeypatch.setattr(processor, "_coalescer", Coalescer(0.05, 500.0, groups.append))
+    monkeypatch.setattr(processor, "_alert_store", AlertStore(100))
+    monkeypatch.setattr(processor, "_dispatch_queue", None)
+    monkeypatch.setattr(processor, "_last_ack_task", None)
+    monkeypatch.setattr(processor, "_JOURNAL_RETRY_DELAY_S", 0.0)
+    return groups
+
+
+def _alert(sensor_id: str = "s-1", lat: float = 51.5) -> processor.AlertPayload:
+    return processor.AlertPayload(
+        sensor_id=sensor_id,
+        sensor_type="seismic",
+        grid_ref="33U 1 1",
+        lat=lat,
+        lon=-0.1,
+        timestamp="2026-01-01T00:00:00Z",
+        reading={"magnitude": 3.0},
+        alert=True,
+    )
+
+
+def _use_journal(monkeypatch: pytest.MonkeyPatch, journal: Optional[FakeJournal]) -> None:
+    monkeypatch.setattr(processor, "_journal", journal)
+
+
+def test_committed_alert_is_stored_and_dispatched(monkeypatch: pytest.MonkeyPatch, flushed: list[AlertGroup]) -> None:
+    journal = FakeJournal()
+    _use_journal(monkeypatch, journal)
+
+    async def scenario() -> processor.TriggerResponse:
+        response = await processor.process_alert(_alert())
+        await asyncio.sleep(0.1)
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.status == "queued"
+    assert [record["alert_id"] for record in journal.committed] == [response.alert_id]
+    assert len(processor._alert_store) == 1
+    assert [group.job_id for group in flushed] == [response.job_id]
+
+
+def test_failed_commit_is_withdrawn(monkeypatch: pytest.MonkeyPatch, flushed: list[AlertGroup]) -> None:
+    _use_journal(monkeypatch, FakeJournal(failures=1))
+
+    async def scenario() -> None:
+        with pytest.raises(HTTPException) as exc_info:
+            await processor.process_alert(_alert())
+        assert exc_info.value.status_code == 503
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    # Never shown, never dispatched: the sender's retry is the only copy
+    assert len(processor._alert_store) == 0
+    assert flushed == []
+
+
+def test_window_closing_mid_commit_waits_for_held_alerts(
+    monkeypatch: pytest.MonkeyPatch, flushed: list[AlertGroup]
+) -> None:
+    class SlowJournal(FakeJournal):
+        async def record_alerts(self, records: list[dict[str, Any]]) -> None:
+            await asyncio.sleep(0.1)  # longer than the coalescing window
+            await super().record_alerts(records)
+
+    _use_journal(monkeypatch, SlowJournal())
+
+    async def scenario() -> None:
+        await asyncio.gather(processor.process_alert(_alert("a")), processor.process_alert(_alert("b")))
+
+    asyncio.run(scenario())
+    [group] = flushed
+    assert list(group.sensors) == ["a", "b"]
+
+
+def test_withdrawn_opener_leaves_group_to_committed_joiner(
+    monkeypatch: pytest.MonkeyPatch, flushed: list[AlertGroup]
+) -> None:
+    _use_journal(monkeypatch, FakeJournal(poisoned=("a",)))
+
+    async def scenario() -> list[Any]:
+        results = await asyncio.gather(
+            processor.process_alert(_alert("a")), processor.process_alert(_alert("b")), return_exceptions=True
+        )
+        await asyncio.sleep(0.1)
+        return results
+
+    failed, joined = asyncio.run(scenario())
+    assert isinstance(failed, HTTPException)
+    [group] = flushed
+    assert group.job_id == joined.job_id and list(group.sensors) == ["b"]
+
+
+def test_mqtt_batch_acked_in_order_after_commit(monkeypatch: pytest.MonkeyPatch, flushed: list[AlertGroup]) -> None:
+    client = FakeClient()
+    monkeypatch.setattr(processor, "_mqtt_client", client)
+    _use_journal(monkeypatch, FakeJournal())
+
+    async def scenario() -> None:
+        processor._ingest_mqtt_batch([_alert("a")], [(1, 1), (2, 1)])
+        # A batch with nothing to journal still waits for the one before it
+        processor._ingest_mqtt_batch([], [(3, 1)])
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert client.acked == [1, 2, 3]
+    assert len(processor._alert_store) == 1
+
+
+def test_mqtt_journal_failure_is_retried_before_acking(
+    monkeypatch: pytest.MonkeyPatch, flushed: list[AlertGroup]
+) -> None:
+    client = FakeClient()
+    monkeypatch.setattr(processor, "_mqtt_client", client)
+    monkeypatch.setattr(processor, "MQTT_JOURNAL_RETRIES", 2)
+    journal = FakeJournal(failures=2)
+    _use_journal(monkeypatch, journal)
+
+    async def scenario() -> None:
+        processor._ingest_mqtt_batch([_alert()], [(7, 1)])
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert client.acked == [7]
+    assert len(journal.committed) == 1 and len(flushed) == 1
+
+
+def test_mqtt_batch_left_unacked_when_retries_run_out(
+    monkeypatch: pytest.MonkeyPatch, flushed: list[AlertGroup]
+) -> None:
+    client = FakeClient()
+    monkeypatch.setattr(processor, "_mqtt_client", client)
+    monkeypatch.setattr(processor, "MQTT_JOURNAL_RETRIES", 1)
+    _use_journal(monkeypatch, FakeJournal(poisoned=("a",)))
+
+    async def scenario() -> None:
+        processor._ingest_mqtt_batch([_alert("a")], [(1, 1)])
+        processor._ingest_mqtt_batch([_alert("b", lat=-33.9)], [(2, 1)])
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    # The failed batch stays with the broker; the next one is not held up
+    assert client.acked == [2]
+    assert [list(group.sensors) for group in flushed] == [["b"]]
+    assert len(processor._alert_store) == 1
+
+
+def test_bridge_uses_a_persistent_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: dict[str, Any] = {}
+
+    class RecordingClient(processor.mqtt.Client):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            created.update(kwargs)
+            super().__init__(*args, **kwargs)
+
+        def connect_async(self, *args: Any, **kwargs: Any) -> None:
+            pass
+
+        def loop_start(self) -> Any:
+            pass
+
+    monkeypatch.setattr(processor.mqtt, "Client", RecordingClient)
+    monkeypatch.setattr(processor, "_mqtt_client", None)
+    monkeypatch.setattr(processor, "_rule_engine", None)
+    monkeypatch.setattr(processor, "MQTT_ALERT_CLIENT_ID", "alert-processor-0")
+
+    async def scenario() -> None:
+        await processor._start_mqtt_bridge()
+        processor._stop_mqtt_bridge()
+
+    asyncio.run(scenario())
+    assert created["client_id"] == "alert-processor-0"
+    assert created["clean_session"] is False
+    assert created["manual_ack"] is True
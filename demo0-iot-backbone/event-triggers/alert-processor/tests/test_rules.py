@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pytest
+
+from rules import RuleEngine, RuleError, parse_rule, parse_rules
+
+
+def test_parse_rule_defaults_to_one_of_one_and_canonical_name() -> None:
+    rule = parse_rule("seismic.magnitude > 2.5")
+    assert (rule.sensor_type, rule.field, rule.op, rule.value, rule.k, rule.n) == (
+        "seismic", "magnitude", ">", 2.5, 1, 1
+    )
+    assert rule.name == "seismic.magnitude > 2.5"
+
+
+def test_parse_rule_named_window_and_string_value() -> None:
+    rule = parse_rule('rf-burst: rf-detector.modulation == "FHSS" for 2 of 3 samples')
+    assert rule.name == "rf-burst"
+    assert (rule.value, rule.k, rule.n, rule.mask) == ("FHSS", 2, 3, 0b111)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "seismic.magnitude >> 2",
+        'rf-detector.modulation > "AM"',
+        "seismic.magnitude > 2 for 4 of 3",
+        "seismic.magnitude > 2 for 1 of 65",
+    ],
+)
+def test_parse_rule_rejects(text: str) -> None:
+    with pytest.raises(RuleError):
+        parse_rule(text)
+
+
+def test_parse_rules_skips_comments_and_rejects_duplicate_names() -> None:
+    assert len(parse_rules("# header\n\nseismic.magnitude > 2  # trailing\n")) == 1
+    with pytest.raises(RuleError, match="duplicate"):
+        parse_rules("a: seismic.magnitude > 2\na: seismic.depth_m < 1\n")
+
+
+def test_k_of_n_fires_once_then_rearms_after_it_stops_holding() -> None:
+    engine = RuleEngine(parse_rules("seismic.magnitude > 2.5 for 2 of 3"))
+    fired = [engine.evaluate("seismic", "s1", {"magnitude": m}) for m in (3.0, 0.1, 3.0, 3.0, 0.1, 0.1, 3.0, 3.0)]
+    # Holds from the 3rd sample until the window has fewer than two passes
+    assert [bool(f) for f in fired] == [False, False, True, False, False, False, False, True]
+    assert engine.fired["seismic.magnitude > 2.5 for 2 of 3"] == 2
+
+
+def test_windows_are_per_sensor() -> None:
+    engine = RuleEngine(parse_rules("seismic.magnitude > 2.5 for 2 of 2"))
+    assert engine.evaluate("seismic", "a", {"magnitude": 3.0}) is None
+    assert engine.evaluate("seismic", "b", {"magnitude": 3.0}) is None
+    assert engine.evaluate("seismic", "a", {"magnitude": 3.0})
+    assert engine.sensors == 2
+
+
+def test_rules_for_groups_by_type_and_includes_wildcards() -> None:
+    engine = RuleEngine(parse_rules("seismic.magnitude > 2\nany: *.battery_pct < 10\n"))
+    assert [rule.name for rule in engine.rules_for("seismic")] == ["seismic.magnitude > 2", "any"]
+    assert [rule.name for rule in engine.rules_for("weather-station")] == ["any"]
+
+
+def test_type_without_rules_is_not_tracked() -> None:
+    engine = RuleEngine(parse_rules("seismic.magnitude > 2"))
+    assert engine.evaluate("rf-detector", "r1", {"power_dbm": -10.0}) is None
+    assert engine.samples == 0 and engine.sensors == 0
+
+
+def test_missing_fields_and_wrong_types_never_pass() -> None:
+    engine = RuleEngine(parse_rules("seismic.magnitude > 0"))
+    assert engine.evaluate("seismic", "s1", {}) is None
+    assert engine.evaluate("seismic", "s1", {"magnitude": True}) is None
+    assert engine.evaluate("seismic", "s1", {"magnitude": "5"}) is None
+    assert engine.evaluate("seismic", "s1", {"magnitude": 1})
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+import scheduler
+from conftest import FakeClock
+from scheduler import WeightedPriorityQueue
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler, "time", fake)
+    return fake
+
+
+def _queue(maxsize: int = 100, weights: tuple[int, ...] = (8, 4, 2, 1), ageing_s: float = 0.0):
+    # Items are (level, label) pairs
+    return WeightedPriorityQueue(maxsize, weights, ageing_s=ageing_s, level_of=lambda item: item[0])
+
+
+def test_weighted_round_robin_shares_slots_by_weight(clock: FakeClock) -> None:
+    queue = _queue(maxsize=200)
+    for level in range(4):
+        for i in range(30):
+            queue.put_nowait((level, i))
+    served = Counter(queue.get_nowait()[0] for _ in range(15))
+    assert served == {0: 8, 1: 4, 2: 2, 3: 1}
+
+
+def test_fifo_within_a_level_and_lone_level_gets_every_slot(clock: FakeClock) -> None:
+    queue = _queue()
+    for i in range(5):
+        queue.put_nowait((2, i))
+    assert [queue.get_nowait()[1] for _ in range(5)] == [0, 1, 2, 3, 4]
+    with pytest.raises(asyncio.QueueEmpty):
+        queue.get_nowait()
+
+
+def test_levels_out_of_range_are_clamped(clock: FakeClock) -> None:
+    queue = _queue()
+    queue.put_nowait((-3, "a"))
+    queue.put_nowait((9, "b"))
+    assert queue.depths() == [1, 0, 0, 1]
+
+
+def test_full_queue_displaces_newest_least_urgent(clock: FakeClock) -> None:
+    queue = _queue(maxsize=3)
+    queue.put_nowait((1, "old"))
+    queue.put_nowait((3, "first"))
+    queue.put_nowait((3, "newest"))
+    assert queue.put_nowait((0, "urgent")) == (3, "newest")
+    assert queue.depths() == [1, 1, 0, 1]
+    assert queue.displaced == 1
+    assert queue.qsize() == 3
+
+
+def test_full_queue_rejects_when_nothing_less_urgent(clock: FakeClock) -> None:
+    queue = _queue(maxsize=2)
+    queue.put_nowait((1, "a"))
+    queue.put_nowait((0, "b"))
+    assert not queue.admits(1)
+    with pytest.raises(asyncio.QueueFull):
+        queue.put_nowait((1, "c"))
+    assert queue.qsize() == 2
+    # A more urgent job may still displace the level-1 one
+    assert queue.admits(0)
+
+
+def test_ageing_promotes_one_level_per_period(clock: FakeClock) -> None:
+    queue = _queue(ageing_s=10.0)
+    queue.put_nowait((3, "waiting"))
+    clock.advance(25.0)
+    queue.put_nowait((0, "fresh"))
+    queue.put_nowait((0, "fresher"))
+    # Two full periods: level 3 -> 1, which is then picked by weight alongside level 0
+    assert queue.get_nowait() == (0, "fresh")
+    assert queue.depths() == [1, 1, 0, 0]
+    assert queue.aged == 1
+
+
+def test_ageing_stops_at_the_top_level(clock: FakeClock) -> None:
+    queue = _queue(ageing_s=1.0)
+    queue.put_nowait((2, "slow"))
+    clock.advance(100.0)
+    queue.put_nowait((1, "other"))
+    assert queue.get_nowait() == (2, "slow")
+
+
+def test_get_waits_for_put() -> None:
+    async def scenario() -> tuple[int, str]:
+        queue = _queue()
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        queue.put_nowait((1, "job"))
+        return await asyncio.wait_for(getter, 1.0)
+
+    assert asyncio.run(scenario()) == (1, "job")
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from typing import Any
+
+import pytest
+
+import processor
+from rules import RuleEngine, parse_rules
+from sharding import HashRing, ordinal_from_hostname
+
+KEYS = [f"{zone}{band} {easting:05d} {northing:05d}" for zone, band in (("33", "U"), ("34", "T")) for easting in
+        range(0, 100_000, 2_000) for northing in range(0, 100_000, 2_500)]
+TOPIC = "geoint/sensors/{sensor_type}/{sensor_id}/telemetry"
+
+
+def test_owner_is_stable_across_instances() -> None:
+    a, b = HashRing(4), HashRing(4)
+    assert [a.owner(key) for key in KEYS] == [b.owner(key) for key in KEYS]
+    # Cached and uncached lookups agree
+    assert [a.owner(key) for key in KEYS] == [b.owner(key) for key in KEYS]
+
+
+def test_single_shard_owns_everything() -> None:
+    ring = HashRing(1)
+    assert {ring.owner(key) for key in KEYS} == {0}
+
+
+def test_keys_spread_over_every_shard() -> None:
+    counts = Counter(HashRing(4).owner(key) for key in KEYS)
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > len(KEYS) / 4 * 0.6
+
+
+def test_adding_a_shard_moves_only_its_share() -> None:
+    before, after = HashRing(4), HashRing(5)
+    moved = [key for key in KEYS if before.owner(key) != after.owner(key)]
+    # Every moved key goes to the new shard, and about 1/5 of keys move
+    assert {after.owner(key) for key in moved} == {4}
+    assert len(moved) < len(KEYS) * 0.3
+
+
+def test_rejects_zero_shards() -> None:
+    with pytest.raises(ValueError):
+        HashRing(0)
+
+
+@pytest.mark.parametrize(
+    "hostname, ordinal",
+    [("alert-processor-2", 2), ("alert-processor-10", 10), ("alert-processor", None), ("", None)],
+)
+def test_ordinal_from_hostname(hostname: str, ordinal: int | None) -> None:
+    assert ordinal_from_hostname(hostname) == ordinal
+
+
+# ---------------------------------------------------------------------------
+# Telemetry routing between shards
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def engine() -> RuleEngine:
+    return RuleEngine(parse_rules("quake: seismic.magnitude > 2.5"))
+
+
+@pytest.fixture
+def forwarded(monkeypatch: pytest.MonkeyPatch) -> list[tuple[int, str, Any]]:
+    sent: list[tuple[int, str, Any]] = []
+    monkeypatch.setattr(processor, "_forward_to_shard", lambda shard, kind, body, qos: sent.append((shard, kind, body)))
+    return sent
+
+
+@pytest.fixture
+def sharded(monkeypatch: pytest.MonkeyPatch) -> HashRing:
+    ring = HashRing(2)
+    monkeypatch.setattr(processor, "_ring", ring)
+    monkeypatch.setattr(processor, "SHARD_ID", 0)
+    return ring
+
+
+def _reading(sensor_id: str, grid_ref: str, magnitude: float) -> dict[str, Any]:
+    return {
+        "sensor_id": sensor_id,
+        "sensor_type": "seismic",
+        "grid_ref": grid_ref,
+        "lat": 51.5,
+        "lon": -0.1,
+        "timestamp": "2026-01-01T00:00:00Z",
+        "reading": {"magnitude": magnitude, "depth_m": 10.0},
+        "alert": False,
+    }
+
+
+def _envelope(readings: list[dict[str, Any]]) -> bytes:
+    return json.dumps(
+        {
+            "schema": processor.ENVELOPE_SCHEMA,
+            "sensor_type": "seismic",
+            "timestamp": "2026-01-01T00:00:00Z",
+            "count": len(readings),
+            **{name: [r[name] for r in readings] for name in ("sensor_id", "grid_ref", "lat", "lon", "alert")},
+            "reading": {name: [r["reading"][name] for r in readings] for name in ("magnitude", "depth_m")},
+        }
+    ).encode()
+
+
+def _grid_refs(ring: HashRing) -> tuple[str, str]:
+    """One grid_ref this shard (0) owns and one shard 1 owns."""
+    refs = [f"33U {n:05d} 00000" for n in range(100)]
+    return next(r for r in refs if ring.owner(r) == 0), next(r for r in refs if ring.owner(r) == 1)
+
+
+def test_sharded_reading_owned_elsewhere_is_forwarded(
+    engine: RuleEngine, sharded: HashRing, forwarded: list[tuple[int, str, Any]]
+) -> None:
+    ours, theirs = _grid_refs(sharded)
+    topic = TOPIC.format(sensor_type="seismic", sensor_id="s-1")
+    body = json.dumps(_reading("s-1", theirs, 3.0)).encode()
+    assert processor._evaluate_telemetry(engine, topic, body) == []
+    assert forwarded == [(1, "telemetry", body)]
+    assert processor._evaluate_telemetry(engine, topic, json.dumps(_reading("s-2", ours, 3.0)).encode())
+
+
+def test_sharded_envelope_is_split_by_owner(
+    engine: RuleEngine, sharded: HashRing, forwarded: list[tuple[int, str, Any]]
+) -> None:
+    ours, theirs = _grid_refs(sharded)
+    body = _envelope([_reading("s-1", ours, 3.0), _reading("s-2", theirs, 3.0)])
+    alerts = processor._evaluate_telemetry(engine, "geoint/sensors/seismic/envelope", body)
+    assert [alert.sensor_id for alert in alerts] == ["s-1"]
+    [(shard, kind, sub)] = forwarded
+    assert (shard, kind) == (1, "telemetry")
+    assert json.loads(sub)["sensor_id"] == ["s-2"]
+
+
+def test_forwarded_telemetry_is_evaluated_not_reforwarded(
+    engine: RuleEngine, sharded: HashRing, forwarded: list[tuple[int, str, Any]]
+) -> None:
+    # Whatever arrives on a shard topic was routed here by its owner lookup
+    _, theirs = _grid_refs(sharded)
+    topic = processor._SHARD_TOPIC_ROOT + "0/telemetry"
+    [alert] = processor._evaluate_telemetry(engine, topic, json.dumps(_reading("s-1", theirs, 3.0)).encode())
+    assert alert.sensor_id == "s-1"
+    assert forwarded == []
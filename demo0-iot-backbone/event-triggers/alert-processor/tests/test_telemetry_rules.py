@@ -0,0 +1,64 @@
+"""Rule evaluation of MQTT telemetry: single readings, envelopes and the per-type prefilter."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import pytest
+
+import processor
+from rules import RuleEngine, parse_rules
+
+TOPIC = "geoint/sensors/{sensor_type}/{sensor_id}/telemetry"
+
+
+@pytest.fixture
+def engine() -> RuleEngine:
+    return RuleEngine(parse_rules("quake: seismic.magnitude > 2.5"))
+
+
+def _reading(sensor_id: str, grid_ref: str, magnitude: float) -> dict[str, Any]:
+    return {
+        "sensor_id": sensor_id,
+        "sensor_type": "seismic",
+        "grid_ref": grid_ref,
+        "lat": 51.5,
+        "lon": -0.1,
+        "timestamp": "2026-01-01T00:00:00Z",
+        "reading": {"magnitude": magnitude, "depth_m": 10.0},
+        "alert": False,
+    }
+
+
+def _envelope(readings: list[dict[str, Any]]) -> bytes:
+    return json.dumps(
+        {
+            "schema": processor.ENVELOPE_SCHEMA,
+            "sensor_type": "seismic",
+            "timestamp": "2026-01-01T00:00:00Z",
+            "count": len(readings),
+            **{name: [r[name] for r in readings] for name in ("sensor_id", "grid_ref", "lat", "lon", "alert")},
+            "reading": {name: [r["reading"][name] for r in readings] for name in ("magnitude", "depth_m")},
+        }
+    ).encode()
+
+
+def test_types_without_rules_are_skipped_unparsed(engine: RuleEngine) -> None:
+    topic = TOPIC.format(sensor_type="rf-detector", sensor_id="rf-1")
+    assert processor._evaluate_telemetry(engine, topic, b"not json") == []
+    assert engine.samples == 0
+
+
+def test_rule_alert_carries_the_sample(engine: RuleEngine) -> None:
+    topic = TOPIC.format(sensor_type="seismic", sensor_id="s-1")
+    assert processor._evaluate_telemetry(engine, topic, json.dumps(_reading("s-1", "33U 1 1", 0.2)).encode()) == []
+    [alert] = processor._evaluate_telemetry(engine, topic, json.dumps(_reading("s-1", "33U 1 1", 3.1)).encode())
+    assert alert.sensor_id == "s-1" and alert.alert and alert.matched_rules == ["quake"]
+
+
+def test_envelope_evaluates_each_reading(engine: RuleEngine) -> None:
+    body = _envelope([_reading("s-1", "33U 1 1", 3.0), _reading("s-2", "33U 1 2", 0.1)])
+    alerts = processor._evaluate_telemetry(engine, "geoint/sensors/seismic/envelope", body)
+    assert [alert.sensor_id for alert in alerts] == ["s-1"]
+    assert alerts[0].reading == {"magnitude": 3.0, "depth_m": 10.0}
@@ -320,6 +320,7 @@ function Deploy-IotManifests {
         (Join-Path $Demo0Root "iot-operations\asset-definitions\seismic-sensor.yaml"),
         (Join-Path $Demo0Root "iot-operations\asset-definitions\rf-detector.yaml"),
         (Join-Path $Demo0Root "iot-operations\data-pipelines\pipeline-sensors.yaml"),
+        (Join-Path $Demo0Root "iot-operations\data-pipelines\pipeline-envelopes.yaml"),
         (Join-Path $Demo0Root "iot-operations\data-pipelines\pipeline-alerts.yaml")
     )
 
@@ -357,12 +358,12 @@ function Deploy-ContainerImages {
     $images = @(
         @{
             Name       = "geoint/sensor-simulator"
-            Context    = (Join-Path $Demo0Root "sensor-simulator")
+            Context    = $Demo0Root
             Dockerfile = (Join-Path $Demo0Root "sensor-simulator\Dockerfile")
         },
         @{
             Name       = "geoint/alert-processor"
-            Context    = (Join-Path $Demo0Root "event-triggers\alert-processor")
+            Context    = $Demo0Root
             Dockerfile = (Join-Path $Demo0Root "event-triggers\alert-processor\Dockerfile")
         }
     )
@@ -432,6 +433,7 @@ function Remove-Deployment {
         (Join-Path $Demo0Root "sensor-simulator\k8s\deployment.yaml"),
         (Join-Path $Demo0Root "sensor-simulator\k8s\configmap.yaml"),
         (Join-Path $Demo0Root "iot-operations\data-pipelines\pipeline-alerts.yaml"),
+        (Join-Path $Demo0Root "iot-operations\data-pipelines\pipeline-envelopes.yaml"),
         (Join-Path $Demo0Root "iot-operations\data-pipelines\pipeline-sensors.yaml"),
         (Join-Path $Demo0Root "iot-operations\asset-definitions\rf-detector.yaml"),
         (Join-Path $Demo0Root "iot-operations\asset-definitions\seismic-sensor.yaml"),
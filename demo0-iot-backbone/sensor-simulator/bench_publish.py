@@ -0,0 +1,154 @@
+"""
+GEOINT Demo — IoT Backbone: Publish Hot-Path Microbenchmark
+============================================================
+Measures simulator messages/sec with the MQTT client replaced by a no-op, so
+only payload building, serialisation and topic handling are timed.
+
+    legacy    the original per-message loop: one ``random`` draw per field
+              (``_build_reading``), a fresh payload dict and timestamp, then
+              TOPIC_TELEMETRY.format(...) + json.dumps(full dict)
+    compiled  batch-generated NumPy readings, pre-built topics and JSON
+              prefix; only timestamp/reading/alert are serialised per tick
+              (orjson when installed)
+
+Usage:
+    python bench_publish.py [--sensors 20000] [--rounds 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+import simulator
+
+
+class _NullResult:
+    rc = 0
+
+
+class _NullClient:
+    """Stands in for paho.mqtt.client.Client; discards every publish."""
+
+    _result = _NullResult()
+
+    def publish(self, _topic: str, _payload: Any = None, qos: int = 0) -> _NullResult:
+        return self._result
+
+
+# ---------------------------------------------------------------------------
+# Legacy hot path, as the simulator shipped it before batch generation
+# ---------------------------------------------------------------------------
+
+def _build_reading(sensor_type: str, anomaly: bool) -> dict[str, Any]:
+    if sensor_type == "weather-station":
+        base_temp = 22.0 if not anomaly else random.uniform(35.0, 45.0)
+        return {
+            "temperature_c": round(base_temp + random.uniform(-0.5, 0.5), 2),
+            "humidity_pct": round(random.uniform(30, 90), 1),
+            "wind_speed_kph": round(random.uniform(0, 60 if anomaly else 30), 1),
+            "pressure_hpa": round(random.uniform(995, 1025), 1),
+        }
+    elif sensor_type == "seismic":
+        mag = random.uniform(2.5, 5.5) if anomaly else random.uniform(0.0, 0.8)
+        return {
+            "magnitude": round(mag, 2),
+            "depth_m": round(random.uniform(5, 35), 1),
+            "frequency_hz": round(random.uniform(1.0, 20.0), 2),
+        }
+    elif sensor_type == "rf-detector":
+        power = random.uniform(-40, -10) if anomaly else random.uniform(-90, -60)
+        return {
+            "frequency_mhz": round(random.uniform(300, 3000), 1),
+            "power_dbm": round(power, 1),
+            "bandwidth_khz": round(random.uniform(10, 200), 1),
+            "modulation": random.choice(["AM", "FM", "BPSK", "QPSK"]),
+        }
+    return {}
+
+
+def _build_payload(sensor: dict[str, Any], anomaly: bool) -> dict[str, Any]:
+    return {
+        "sensor_id": sensor["sensor_id"],
+        "sensor_type": sensor["sensor_type"],
+        "grid_ref": sensor["grid_ref"],
+        "lat": sensor["lat"],
+        "lon": sensor["lon"],
+        "timestamp": simulator._now_iso(),
+        "reading": _build_reading(sensor["sensor_type"], anomaly),
+        "alert": anomaly,
+    }
+
+
+def _legacy_tick(client: _NullClient, sensors: list[dict[str, Any]]) -> int:
+    sent = 0
+    for sensor in sensors:
+        anomaly = random.random() < 0.05
+        payload = _build_payload(sensor, anomaly)
+        topic = simulator.TOPIC_TELEMETRY.format(
+            sensor_type=sensor["sensor_type"], sensor_id=sensor["sensor_id"]
+        )
+        client.publish(topic, json.dumps(payload), qos=1)
+        sent += 1
+    return sent
+
+
+# ---------------------------------------------------------------------------
+# Current hot path
+# ---------------------------------------------------------------------------
+
+
+def _compiled_tick(
+    client: _NullClient,
+    groups: dict[str, list[simulator.CompiledSensor]],
+    rng: np.random.Generator,
+) -> int:
+    sent = 0
+    for group in groups.values():
+        anomaly = rng.random(len(group)) < 0.05
+        columns = simulator._build_readings_batch(group[0].sensor_type, anomaly, rng)
+        bodies = simulator._encode_payloads_batch(group, columns, anomaly)
+        for sensor, body in zip(group, bodies):
+            client.publish(sensor.topic, body, qos=1)
+            sent += 1
+    return sent
+
+
+def _measure(name: str, tick: Callable[[], int], rounds: int) -> float:
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        sent = tick()
+        rate = sent / (time.perf_counter() - start)
+        best = max(best, rate)
+    print(f"{name:<10} {best:>12,.0f} msgs/sec")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sensors", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--scenario", default="scenarios/base_scenario.json")
+    args = parser.parse_args()
+
+    scenario = simulator._load_scenario(args.scenario)
+    sensors = simulator._expand_sensors(scenario, args.sensors)
+    groups = simulator._group_by_type(simulator._compile_sensors(sensors))
+    client = _NullClient()
+    rng = np.random.default_rng(0)
+    random.seed(0)
+
+    print(f"sensors={len(sensors)} serializer={'orjson' if simulator.orjson else 'json'}")
+    before = _measure("legacy", lambda: _legacy_tick(client, sensors), args.rounds)
+    after = _measure("compiled", lambda: _compiled_tick(client, groups, rng), args.rounds)
+    print(f"speed-up   {after / before:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
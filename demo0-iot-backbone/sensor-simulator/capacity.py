@@ -0,0 +1,413 @@
+"""
+GEOINT Demo — IoT Backbone: Capacity Finder
+============================================
+Closed-loop load test for the whole telemetry path (simulator → MQTT broker
+→ IoT Operations dataflow → ``geoint/pipelines/sensor-telemetry``).
+
+The offered telemetry rate is ramped in steps. Every message carries a probe
+(``reading.capacity_probe = [run_id, step, sent_unix_time]``) that survives
+the dataflow's flattening, and this process subscribes to the pipeline
+output itself. For each step it measures:
+
+    achieved   accepted publishes per second vs. the offered rate
+    puback     QoS 1 PUBACK latency percentiles (broker acceptance)
+    e2e        publish → arrival latency percentiles on the output topic
+    loss       acknowledged publishes that never arrived on the output topic
+
+The ramp stops at the first step that breaks an SLO; the last passing step's
+achieved rate is reported as the sustainable throughput. Alerts are never
+raised during a run, so the vision pipeline is not flooded.
+
+Usage:
+    python capacity.py [--start-rate 500] [--step-factor 1.5] [--step-s 20]
+                       [--slo-e2e-p99-ms 1000] [--report capacity.json]
+
+    # Without the dataflow (e.g. a local broker) measure against the raw topic:
+    python capacity.py --arrival-topic "geoint/sensors/+/+/telemetry"
+
+Also available as the simulator pod's main mode: SIMULATOR_MODE=capacity.
+
+Environment Variables (defaults for the CLI flags):
+    CAPACITY_START_RATE         First step's offered msgs/sec      (default: 500)
+    CAPACITY_STEP_FACTOR        Rate multiplier between steps      (default: 1.5)
+    CAPACITY_MAX_RATE           Stop ramping at this rate          (default: 200000)
+    CAPACITY_STEP_S             Seconds of load per step           (default: 20)
+    CAPACITY_SETTLE_S           Seconds to wait for stragglers after each step (default: 3)
+    CAPACITY_ARRIVAL_TOPIC      Topic the probes are expected on
+                                (default: geoint/pipelines/sensor-telemetry)
+    CAPACITY_SLO_PUBACK_P99_MS  PUBACK p99 limit                   (default: 250)
+    CAPACITY_SLO_E2E_P99_MS     End-to-end p99 limit               (default: 1000)
+    CAPACITY_SLO_LOSS_PCT       Lost-message limit, percent        (default: 0.1)
+    CAPACITY_REPORT_FILE        Also write the report as JSON here (default: none)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+from simulator import (
+    INFLIGHT_TIMEOUT_S,
+    MAX_INFLIGHT,
+    MQTT_HOST,
+    MQTT_PORT,
+    MQTT_TRANSPORT,
+    SCENARIO_FILE,
+    SCHEDULER_RESOLUTION_S,
+    SENSOR_COUNT_OVERRIDE,
+    SIMULATOR_SEED,
+    CompiledSensor,
+    InflightWindow,
+    _ALERT_FALSE,
+    _build_readings_batch,
+    _compile_sensors,
+    _create_client,
+    _dumps,
+    _expand_sensors,
+    _group_by_type,
+    _load_scenario,
+    _log,
+    _now_iso,
+    _readings_to_dicts,
+)
+from scheduler import TokenBucket
+from transport import create_transport
+
+CAPACITY_START_RATE: float = float(os.environ.get("CAPACITY_START_RATE", "") or "500")
+CAPACITY_STEP_FACTOR: float = float(os.environ.get("CAPACITY_STEP_FACTOR", "") or "1.5")
+CAPACITY_MAX_RATE: float = float(os.environ.get("CAPACITY_MAX_RATE", "") or "200000")
+CAPACITY_STEP_S: float = float(os.environ.get("CAPACITY_STEP_S", "") or "20")
+CAPACITY_SETTLE_S: float = float(os.environ.get("CAPACITY_SETTLE_S", "") or "3")
+CAPACITY_ARRIVAL_TOPIC: str = os.environ.get("CAPACITY_ARRIVAL_TOPIC", "") or "geoint/pipelines/sensor-telemetry"
+CAPACITY_SLO_PUBACK_P99_MS: float = float(os.environ.get("CAPACITY_SLO_PUBACK_P99_MS", "") or "250")
+CAPACITY_SLO_E2E_P99_MS: float = float(os.environ.get("CAPACITY_SLO_E2E_P99_MS", "") or "1000")
+CAPACITY_SLO_LOSS_PCT: float = float(os.environ.get("CAPACITY_SLO_LOSS_PCT", "") or "0.1")
+CAPACITY_REPORT_FILE: str = os.environ.get("CAPACITY_REPORT_FILE", "")
+
+PROBE_KEY = "capacity_probe"
+
+# A step must reach this fraction of its offered rate to count as sustained
+_ACHIEVED_FRACTION = 0.95
+
+
+@dataclass(frozen=True)
+class SLOs:
+    puback_p99_ms: float = CAPACITY_SLO_PUBACK_P99_MS
+    e2e_p99_ms: float = CAPACITY_SLO_E2E_P99_MS
+    loss_pct: float = CAPACITY_SLO_LOSS_PCT
+
+
+@dataclass
+class StepResult:
+    step: int
+    offered_rate: float
+    achieved_rate: float
+    sent: int
+    errors: int
+    arrived: int
+    loss_pct: float
+    puback: dict[str, Any]
+    e2e: dict[str, Any]
+    breaches: list[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.breaches
+
+
+def _percentiles(samples: list[float]) -> dict[str, Any]:
+    if not samples:
+        return {"samples": 0}
+    p50, p90, p99 = np.percentile(samples, (50, 90, 99)) * 1000.0
+    return {
+        "samples": len(samples),
+        "p50_ms": round(float(p50), 2),
+        "p90_ms": round(float(p90), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(max(samples) * 1000.0, 2),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Arrival side
+# ---------------------------------------------------------------------------
+
+class ArrivalProbe:
+    """Subscribes to the pipeline output and collects this run's probes per step."""
+
+    def __init__(self, run_id: str, topic: str) -> None:
+        self.run_id = run_id
+        self.topic = topic
+        self.subscribed = threading.Event()
+        self._marker = run_id.encode()
+        self._lock = threading.Lock()
+        self._arrived: dict[int, int] = {}
+        self._latencies: dict[int, list[float]] = {}
+        self._client = _create_client()
+        self._client.on_connect = self._on_connect
+        self._client.on_subscribe = self._on_subscribe
+        self._client.on_message = self._on_message
+
+    def start(self) -> None:
+        self._client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
+        self._client.loop_start()
+
+    def stop(self) -> None:
+        self._client.loop_stop()
+        self._client.disconnect()
+
+    def _on_connect(self, client: mqtt.Client, _userdata: Any, _flags: Any, rc: int) -> None:
+        if rc == 0:
+            client.subscribe(self.topic, qos=1)
+
+    def _on_subscribe(self, *_args: Any) -> None:
+        self.subscribed.set()
+
+    def _on_message(self, _client: mqtt.Client, _userdata: Any, msg: mqtt.MQTTMessage) -> None:
+        received = time.time()
+        # Cheap byte scan first: other traffic on the topic is skipped unparsed
+        if self._marker not in msg.payload:
+            return
+        try:
+            data = json.loads(msg.payload)
+            # The dataflow renames ``reading`` to ``reading_json``; raw telemetry keeps it
+            reading = data.get("reading_json", data.get("reading"))
+            if isinstance(reading, str):
+                reading = json.loads(reading)
+            run_id, step, sent = reading[PROBE_KEY]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return
+        if run_id != self.run_id:
+            return
+        with self._lock:
+            self._arrived[step] = self._arrived.get(step, 0) + 1
+            self._latencies.setdefault(step, []).append(received - sent)
+
+    def take(self, step: int) -> tuple[int, list[float]]:
+        """Arrival count and latencies (s) for ``step``; later stragglers are ignored."""
+        with self._lock:
+            return self._arrived.pop(step, 0), self._latencies.pop(step, [])
+
+
+# ---------------------------------------------------------------------------
+# Publish side
+# ---------------------------------------------------------------------------
+
+class ProbeSource:
+    """Cycles through the scenario's sensors, encoding probe-tagged telemetry."""
+
+    def __init__(self, sensors: list[CompiledSensor], run_id: str, rng: np.random.Generator) -> None:
+        self._sensors = sensors
+        self._next = 0
+        self._run_id = run_id
+        self._rng = rng
+
+    def batch(self, count: int, step: int) -> list[tuple[str, bytes]]:
+        picked = [self._sensors[(self._next + i) % len(self._sensors)] for i in range(count)]
+        self._next = (self._next + count) % len(self._sensors)
+        stamp = b'"timestamp":"' + _now_iso().encode() + b'","reading":'
+        out: list[tuple[str, bytes]] = []
+        for sensor_type, group in _group_by_type(picked).items():
+            columns = _build_readings_batch(sensor_type, np.zeros(len(group), dtype=bool), self._rng)
+            probe = [self._run_id, step, time.time()]
+            for sensor, reading in zip(group, _readings_to_dicts(columns, len(group))):
+                reading[PROBE_KEY] = probe
+                out.append((sensor.topic, b"".join((sensor.prefix, stamp, _dumps(reading), _ALERT_FALSE))))
+        return out
+
+
+async def _offer_load(
+    client: mqtt.Client,
+    window: InflightWindow,
+    source: ProbeSource,
+    rate: float,
+    duration_s: float,
+    step: int,
+) -> tuple[int, int, float]:
+    """Publish at ``rate`` for ``duration_s``. Returns (sent, errors, elapsed_s)."""
+    start = time.monotonic()
+    bucket = TokenBucket(rate, now=start)
+    sent = errors = 0
+    while True:
+        now = time.monotonic()
+        if now - start >= duration_s:
+            break
+        count = min(bucket.available(now), window.available())
+        if count:
+            bucket.consume(count)
+            for topic, body in source.batch(count, step):
+                if window.publish(client, topic, body).rc == mqtt.MQTT_ERR_SUCCESS:
+                    sent += 1
+                else:
+                    errors += 1
+        await asyncio.sleep(SCHEDULER_RESOLUTION_S)
+    return sent, errors, time.monotonic() - start
+
+
+def _evaluate(result: StepResult, slos: SLOs) -> None:
+    if result.achieved_rate < result.offered_rate * _ACHIEVED_FRACTION:
+        result.breaches.append("offered_rate_not_reached")
+    if result.puback.get("p99_ms", 0.0) > slos.puback_p99_ms:
+        result.breaches.append("puback_p99")
+    if result.e2e.get("p99_ms", 0.0) > slos.e2e_p99_ms:
+        result.breaches.append("e2e_p99")
+    if result.loss_pct > slos.loss_pct:
+        result.breaches.append("loss")
+
+
+async def find_capacity(
+    scenario: dict[str, Any],
+    sensors: list[dict[str, Any]],
+    *,
+    start_rate: float = CAPACITY_START_RATE,
+    step_factor: float = CAPACITY_STEP_FACTOR,
+    max_rate: float = CAPACITY_MAX_RATE,
+    step_s: float = CAPACITY_STEP_S,
+    settle_s: float = CAPACITY_SETTLE_S,
+    arrival_topic: str = CAPACITY_ARRIVAL_TOPIC,
+    slos: SLOs = SLOs(),
+) -> dict[str, Any]:
+    """Ramp the offered rate until an SLO breaks; return the capacity report."""
+    if step_factor <= 1.0:
+        raise ValueError("Step factor must be greater than 1")
+    run_id = f"cap-{uuid.uuid4().hex[:10]}"
+    probe = ArrivalProbe(run_id, arrival_topic)
+    probe.start()
+
+    window = InflightWindow(MAX_INFLIGHT, INFLIGHT_TIMEOUT_S)
+    client = _create_client()
+    client.max_inflight_messages_set(MAX_INFLIGHT)
+    client.on_publish = window.on_publish
+    transport = create_transport(MQTT_TRANSPORT, client)
+    client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
+    transport.start()
+
+    results: list[StepResult] = []
+    try:
+        for _ in range(20):
+            if client.is_connected() and probe.subscribed.is_set():
+                break
+            await asyncio.sleep(0.5)
+        else:
+            raise RuntimeError("Could not connect and subscribe to the MQTT broker")
+
+        _log(
+            "info",
+            "Capacity run started",
+            run_id=run_id,
+            arrival_topic=arrival_topic,
+            start_rate=start_rate,
+            step_factor=step_factor,
+            step_s=step_s,
+            slos=asdict(slos),
+        )
+        source = ProbeSource(_compile_sensors(sensors), run_id, np.random.default_rng(SIMULATOR_SEED))
+        rate = start_rate
+        step = 0
+        while rate <= max_rate:
+            window.drain_latencies()
+            sent, errors, elapsed = await _offer_load(client, window, source, rate, step_s, step)
+            await asyncio.sleep(settle_s)
+            window.expire()
+            arrived, latencies = probe.take(step)
+            result = StepResult(
+                step=step,
+                offered_rate=round(rate, 1),
+                achieved_rate=round(sent / max(elapsed, 1e-9), 1),
+                sent=sent,
+                errors=errors,
+                arrived=arrived,
+                loss_pct=round(max(0, sent - arrived) * 100.0 / max(sent, 1), 3),
+                puback=window.drain_latencies(),
+                e2e=_percentiles(latencies),
+            )
+            _evaluate(result, slos)
+            results.append(result)
+            _log("info" if result.passed else "warning", "Capacity step", **asdict(result))
+            if not result.passed:
+                break
+            rate *= step_factor
+            step += 1
+    finally:
+        await transport.stop()
+        probe.stop()
+
+    passing = [r for r in results if r.passed]
+    failed = next((r for r in results if not r.passed), None)
+    report = {
+        "run_id": run_id,
+        "arrival_topic": arrival_topic,
+        "slos": asdict(slos),
+        "sustainable_msgs_s": passing[-1].achieved_rate if passing else 0.0,
+        "limited_by": failed.breaches if failed else ["max_rate"],
+        "steps": [asdict(r) | {"passed": r.passed} for r in results],
+    }
+    _log(
+        "info",
+        "Capacity result",
+        run_id=run_id,
+        sustainable_msgs_s=report["sustainable_msgs_s"],
+        limited_by=report["limited_by"],
+        steps=len(results),
+    )
+    return report
+
+
+def _write_report(report: dict[str, Any], path: str) -> None:
+    if path:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+def run_from_env() -> None:
+    """``SIMULATOR_MODE=capacity`` entry point, configured by ``CAPACITY_*`` env vars."""
+    scenario = _load_scenario(SCENARIO_FILE)
+    report = asyncio.run(find_capacity(scenario, _expand_sensors(scenario, SENSOR_COUNT_OVERRIDE)))
+    _write_report(report, CAPACITY_REPORT_FILE)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find the sustainable telemetry rate of the IoT backbone")
+    parser.add_argument("--scenario", default=SCENARIO_FILE)
+    parser.add_argument("--sensors", type=int, default=SENSOR_COUNT_OVERRIDE, help="Override sensor count")
+    parser.add_argument("--start-rate", type=float, default=CAPACITY_START_RATE)
+    parser.add_argument("--step-factor", type=float, default=CAPACITY_STEP_FACTOR)
+    parser.add_argument("--max-rate", type=float, default=CAPACITY_MAX_RATE)
+    parser.add_argument("--step-s", type=float, default=CAPACITY_STEP_S)
+    parser.add_argument("--settle-s", type=float, default=CAPACITY_SETTLE_S)
+    parser.add_argument("--arrival-topic", default=CAPACITY_ARRIVAL_TOPIC)
+    parser.add_argument("--slo-puback-p99-ms", type=float, default=CAPACITY_SLO_PUBACK_P99_MS)
+    parser.add_argument("--slo-e2e-p99-ms", type=float, default=CAPACITY_SLO_E2E_P99_MS)
+    parser.add_argument("--slo-loss-pct", type=float, default=CAPACITY_SLO_LOSS_PCT)
+    parser.add_argument("--report", default=CAPACITY_REPORT_FILE, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    scenario = _load_scenario(args.scenario)
+    report = asyncio.run(
+        find_capacity(
+            scenario,
+            _expand_sensors(scenario, args.sensors),
+            start_rate=args.start_rate,
+            step_factor=args.step_factor,
+            max_rate=args.max_rate,
+            step_s=args.step_s,
+            settle_s=args.settle_s,
+            arrival_topic=args.arrival_topic,
+            slos=SLOs(args.slo_puback_p99_ms, args.slo_e2e_p99_ms, args.slo_loss_pct),
+        )
+    )
+    _write_report(report, args.report)
+
+
+if __name__ == "__main__":
+    main()
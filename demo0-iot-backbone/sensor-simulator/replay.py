@@ -0,0 +1,307 @@
+"""
+GEOINT Demo — IoT Backbone: Telemetry Record & Replay
+======================================================
+Captures live MQTT sensor traffic to disk and re-publishes it later with the
+original inter-message timing, optionally time-compressed.
+
+Capture format (gzip-compressed stream, readable/writable incrementally):
+
+    b"GEOREC1\\n"                                   file magic, once
+    <d B H I>  recv_time  qos  topic_len  payload_len   per record, little-endian
+    topic bytes, payload bytes
+
+Both sides stream: the recorder appends as messages arrive and the replayer
+reads one record at a time, so captures never need to fit in memory. The
+replayer also never runs ahead of the broker: at most ``MAX_INFLIGHT`` QoS 1
+publishes wait for a PUBACK, and as many QoS 0 ones for the socket, before it
+blocks.
+
+Usage:
+    python replay.py record  --out capture.georec [--topic "geoint/sensors/#"]
+    python replay.py replay  --in  capture.georec [--speed 10 | --speed max] [--loop]
+
+Replay can also run as the simulator pod's main mode:
+    SIMULATOR_MODE=replay REPLAY_FILE=capture.georec REPLAY_SPEED=10 python simulator.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import signal
+import struct
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, NamedTuple
+
+import paho.mqtt.client as mqtt
+
+from simulator import (
+    INFLIGHT_TIMEOUT_S,
+    MAX_INFLIGHT,
+    MQTT_HOST,
+    MQTT_PORT,
+    InflightWindow,
+    _create_client,
+    _log,
+)
+
+MAGIC = b"GEOREC1\n"
+_HEADER = struct.Struct("<dBHI")
+
+# Recorder flushes the compressed stream at least this often (seconds)
+FLUSH_INTERVAL_S = 2.0
+# Replayer logs progress at this interval (seconds)
+PROGRESS_INTERVAL_S = 10.0
+# Replayer polls a full in-flight window at this interval (seconds)
+WINDOW_POLL_S = 0.005
+
+
+class Record(NamedTuple):
+    recv_time: float
+    qos: int
+    topic: str
+    payload: bytes
+
+
+# ---------------------------------------------------------------------------
+# Log file I/O
+# ---------------------------------------------------------------------------
+
+class CaptureWriter:
+    """Append-only writer for the length-prefixed capture format."""
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        is_new = not path.exists() or path.stat().st_size == 0
+        # Appending opens a new gzip member; concatenated members are valid gzip
+        self._fh: BinaryIO = gzip.open(path, "ab", compresslevel=6)  # type: ignore[assignment]
+        if is_new:
+            self._fh.write(MAGIC)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.count = 0
+
+    def write(self, record: Record) -> None:
+        topic = record.topic.encode("utf-8")
+        with self._lock:
+            self._fh.write(_HEADER.pack(record.recv_time, record.qos, len(topic), len(record.payload)))
+            self._fh.write(topic)
+            self._fh.write(record.payload)
+            self.count += 1
+            now = time.monotonic()
+            if now - self._last_flush >= FLUSH_INTERVAL_S:
+                self._fh.flush()
+                self._last_flush = now
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+
+def read_capture(path: str | Path) -> Iterator[Record]:
+    """Stream records from a capture file one at a time."""
+    with gzip.open(path, "rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a telemetry capture (bad magic)")
+        while True:
+            header = fh.read(_HEADER.size)
+            if not header:
+                return
+            if len(header) < _HEADER.size:
+                _log("warning", "Truncated record at end of capture", file=str(path))
+                return
+            recv_time, qos, topic_len, payload_len = _HEADER.unpack(header)
+            body = fh.read(topic_len + payload_len)
+            if len(body) < topic_len + payload_len:
+                _log("warning", "Truncated record at end of capture", file=str(path))
+                return
+            yield Record(recv_time, qos, body[:topic_len].decode("utf-8"), body[topic_len:])
+
+
+# ---------------------------------------------------------------------------
+# Recorder
+# ---------------------------------------------------------------------------
+
+def record(out_path: str, topic: str, duration_s: float | None = None) -> int:
+    """Subscribe to ``topic`` and append every message to ``out_path``.
+
+    Runs until SIGINT/SIGTERM (or ``duration_s`` elapses). Returns the number
+    of records written.
+    """
+    writer = CaptureWriter(out_path)
+    client = _create_client()
+    stop = threading.Event()
+
+    def _on_connect(c: mqtt.Client, _userdata: Any, _flags: Any, rc: int) -> None:
+        if rc == 0:
+            c.subscribe(topic, qos=1)
+            _log("info", "Recorder subscribed", topic=topic, out=out_path)
+        else:
+            _log("error", "MQTT connection failed", rc=rc)
+
+    def _on_message(_c: mqtt.Client, _userdata: Any, msg: mqtt.MQTTMessage) -> None:
+        writer.write(Record(time.time(), msg.qos, msg.topic, msg.payload))
+
+    client.on_connect = _on_connect
+    client.on_message = _on_message
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
+    client.loop_start()
+    deadline = None if duration_s is None else time.monotonic() + duration_s
+    last_progress = time.monotonic()
+    try:
+        while not stop.wait(1.0):
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            if now - last_progress >= PROGRESS_INTERVAL_S:
+                _log("info", "Recording", records=writer.count)
+                last_progress = now
+    finally:
+        client.loop_stop()
+        client.disconnect()
+        writer.close()
+        _log("info", "Recorder stopped", records=writer.count, out=out_path)
+    return writer.count
+
+
+# ---------------------------------------------------------------------------
+# Replayer
+# ---------------------------------------------------------------------------
+
+def _drain(window: InflightWindow, written: deque[mqtt.MQTTMessageInfo]) -> int:
+    """Wait up to ``INFLIGHT_TIMEOUT_S`` for everything outstanding to be
+    acknowledged (QoS 1) or written (QoS 0); returns how many never were."""
+    deadline = time.monotonic() + window.timeout_s
+    while len(window) and time.monotonic() < deadline:
+        time.sleep(WINDOW_POLL_S)
+    lost = len(window)
+    for info in written:
+        info.wait_for_publish(max(0.0, deadline - time.monotonic()))
+        lost += not info.is_published()
+    return lost
+
+
+def replay(path: str, speed: float | None, loop: bool = False) -> int:
+    """Re-publish a capture with its original timing divided by ``speed``.
+
+    ``speed=None`` publishes as fast as the broker acknowledges. Returns the
+    number of messages the broker acknowledged (QoS 1) or that were written
+    to the socket (QoS 0).
+    """
+    window = InflightWindow(MAX_INFLIGHT, INFLIGHT_TIMEOUT_S)
+    # QoS 0 publishes paho has queued but not yet written, oldest first
+    written: deque[mqtt.MQTTMessageInfo] = deque()
+    lost = 0
+    client = _create_client()
+    # Let paho send up to the full window instead of queueing past its default of 20
+    client.max_inflight_messages_set(MAX_INFLIGHT)
+    client.on_publish = window.on_publish
+    client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
+    client.loop_start()
+    for _ in range(20):
+        if client.is_connected():
+            break
+        time.sleep(0.5)
+    else:
+        _log("error", "Could not connect to MQTT broker — exiting")
+        client.loop_stop()
+        return 0
+
+    published = 0
+    errors = 0
+    try:
+        while True:
+            _log("info", "Replay started", file=path, speed=speed or "max")
+            wall_start = time.monotonic()
+            first_recv: float | None = None
+            last_progress = wall_start
+            for rec in read_capture(path):
+                if speed is not None:
+                    if first_recv is None:
+                        first_recv = rec.recv_time
+                    due = wall_start + (rec.recv_time - first_recv) / speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                if rec.qos:
+                    while not window.available():
+                        # A lost PUBACK must not stall the replay forever
+                        lost += window.expire()
+                        time.sleep(WINDOW_POLL_S)
+                    result = window.publish(client, rec.topic, rec.payload)
+                else:
+                    if len(written) >= window.limit:
+                        oldest = written.popleft()
+                        oldest.wait_for_publish(window.timeout_s)
+                        lost += not oldest.is_published()
+                    result = client.publish(rec.topic, rec.payload, qos=0)
+                    if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                        written.append(result)
+                if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                    published += 1
+                else:
+                    errors += 1
+
+                now = time.monotonic()
+                if now - last_progress >= PROGRESS_INTERVAL_S:
+                    lag = None
+                    if speed is not None and first_recv is not None:
+                        lag = round(now - (wall_start + (rec.recv_time - first_recv) / speed), 3)
+                    _log("info", "Replay progress", published=published, errors=errors, lag_s=lag)
+                    last_progress = now
+            _log(
+                "info",
+                "Replay pass complete",
+                published=published,
+                errors=errors,
+                elapsed_s=round(time.monotonic() - wall_start, 2),
+            )
+            if not loop:
+                break
+    finally:
+        lost += _drain(window, written)
+        client.disconnect()
+        client.loop_stop()
+        _log("info", "Replay finished", published=published - lost, unconfirmed=lost, errors=errors)
+    return published - lost
+
+
+def parse_speed(raw: str | None) -> float | None:
+    """``"max"``/``"0"`` → None (unthrottled); otherwise a positive multiplier."""
+    if raw is None or raw.strip().lower() in ("", "max", "0"):
+        return None
+    speed = float(raw.rstrip("xX"))
+    if speed <= 0:
+        raise ValueError("Replay speed must be positive")
+    return speed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay MQTT sensor telemetry")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Capture live MQTT traffic to a file")
+    rec.add_argument("--out", required=True, help="Capture file (appended if it exists)")
+    rec.add_argument("--topic", default="geoint/sensors/#")
+    rec.add_argument("--duration", type=float, default=None, help="Stop after N seconds")
+
+    rep = sub.add_parser("replay", help="Re-publish a capture file")
+    rep.add_argument("--in", dest="path", required=True, help="Capture file to replay")
+    rep.add_argument("--speed", default="1", help="Time multiplier, e.g. 1, 10, or 'max'")
+    rep.add_argument("--loop", action="store_true", help="Replay forever")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.out, args.topic, args.duration)
+    else:
+        replay(args.path, parse_speed(args.speed), args.loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+GEOINT Demo — IoT Backbone: Publish Scheduler
+==============================================
+Per-sensor publish scheduling for the sensor simulator.
+
+Instead of firing every sensor on one global tick, each sensor has its own
+next-fire time in a min-heap. Initial fire times are staggered across each
+sensor's interval and every reschedule applies random jitter, so load on the
+broker is smooth rather than a burst every ``publish_interval_s``. An
+optional token bucket caps the aggregate publish rate.
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Any
+
+import numpy as np
+
+
+def resolve_intervals(scenario: dict[str, Any], sensors: list[dict[str, Any]]) -> np.ndarray:
+    """Return the publish interval for each sensor, in seconds.
+
+    Precedence: the sensor's own ``publish_interval_s``, then the scenario's
+    ``type_intervals_s[sensor_type]``, then the scenario-wide
+    ``publish_interval_s``.
+    """
+    default: float = scenario.get("publish_interval_s", 2.0)
+    by_type: dict[str, float] = scenario.get("type_intervals_s", {})
+    intervals = np.array(
+        [
+            sensor.get("publish_interval_s", by_type.get(sensor["sensor_type"], default))
+            for sensor in sensors
+        ],
+        dtype=np.float64,
+    )
+    if np.any(intervals <= 0):
+        raise ValueError("Publish intervals must be positive")
+    return intervals
+
+
+class TokenBucket:
+    """Token bucket limiting the aggregate publish rate (messages/second)."""
+
+    def __init__(self, rate: float, burst: float | None = None, now: float = 0.0) -> None:
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate * 0.1, 1.0)
+        self._tokens = self.capacity
+        self._updated = now
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, now: float) -> int:
+        """Whole tokens that can be spent right now."""
+        self._refill(now)
+        return int(self._tokens)
+
+    def consume(self, count: int) -> None:
+        self._tokens -= count
+
+    def time_until(self, count: int, now: float) -> float:
+        """Seconds until ``count`` tokens are available."""
+        self._refill(now)
+        return max(0.0, (count - self._tokens) / self.rate)
+
+
+class PublishScheduler:
+    """Min-heap of ``(next_fire, sensor_index)`` entries.
+
+    ``pop_due`` hands back every sensor whose fire time has passed (up to an
+    optional limit) and ``reschedule`` puts them back one jittered interval
+    later. With ``repeat=False`` each sensor fires exactly once.
+    """
+
+    def __init__(
+        self,
+        intervals: np.ndarray,
+        rng: np.random.Generator,
+        *,
+        start: float,
+        jitter_pct: float = 0.0,
+        repeat: bool = True,
+    ) -> None:
+        self._intervals = intervals
+        self._rng = rng
+        self._jitter = max(0.0, min(jitter_pct, 100.0)) / 100.0
+        self._repeat = repeat
+        # Stagger the first fire of each sensor uniformly across its interval
+        first = start + rng.uniform(0.0, 1.0, len(intervals)) * intervals
+        self._heap: list[tuple[float, int]] = list(zip(first.tolist(), range(len(intervals))))
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_fire(self) -> float | None:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: int | None = None) -> list[tuple[float, int]]:
+        """Pop ``(scheduled_at, sensor_index)`` for sensors due at ``now``."""
+        due: list[tuple[float, int]] = []
+        heap = self._heap
+        while heap and heap[0][0] <= now and (limit is None or len(due) < limit):
+            due.append(heapq.heappop(heap))
+        return due
+
+    def reschedule(self, fired: list[tuple[float, int]], now: float) -> None:
+        """Push fired sensors back one (jittered) interval after their scheduled time.
+
+        Sensors that have fallen more than an interval behind (e.g. while the
+        rate cap was throttling) are re-based on ``now`` instead of catching
+        up in a burst.
+        """
+        if not self._repeat or not fired:
+            return
+        scheduled = np.fromiter((t for t, _ in fired), dtype=np.float64, count=len(fired))
+        indices = np.fromiter((i for _, i in fired), dtype=np.int64, count=len(fired))
+        step = self._intervals[indices]
+        if self._jitter:
+            step = step * (1.0 + self._jitter * self._rng.uniform(-1.0, 1.0, len(fired)))
+        next_fire = scheduled + step
+        next_fire = np.where(next_fire <= now, now + step, next_fire)
+        for entry in zip(next_fire.tolist(), indices.tolist()):
+            heapq.heappush(self._heap, entry)
@@ -3,6 +3,9 @@ GEOINT Demo — IoT Backbone: Sensor Simulator
 =============================================
 Asyncio-based MQTT publisher that reads a scenario JSON file and continuously
 publishes synthetic sensor telemetry to an Azure IoT Operations MQTT Broker.
+Each sensor publishes on its own (jittered) schedule; see scheduler.py.
+Scenarios with ``entities`` derive seismic/RF readings from moving
+entities; see kinematics.py.
 
 Supported sensor types: weather-station, seismic, rf-detector.
 
@@ -14,6 +17,31 @@ Environment Variables:
     SCENARIO_FILE      Path to scenario JSON       (default: scenarios/base_scenario.json)
     SENSOR_COUNT       Override sensor count       (default: from scenario file)
     LOOP               Repeat scenario forever     (default: true)
+    SIMULATOR_SEED     Seed for the reading RNG    (default: random)
+    SHARDS             Worker processes to split sensors across (default: 1)
+    SHARD_STATS_INTERVAL_S  Seconds between per-shard stats reports (default: 10)
+    SIMULATOR_MODE     publish | replay | generate | capacity (default: publish)
+    GENERATE_*         Historical dataset options in generate mode (see generate.py)
+    CAPACITY_*         Ramp and SLO options in capacity mode (see capacity.py)
+    REPLAY_FILE        Capture to replay in replay mode (see replay.py)
+    REPLAY_SPEED       Replay time multiplier or "max" (default: 1)
+    MAX_PUBLISH_RATE   Global telemetry msgs/sec cap (default: scenario max_rate_msgs_s)
+    MAX_INFLIGHT       Unacknowledged QoS 1 publishes before the scheduler pauses
+                       (default: 1000)
+    INFLIGHT_TIMEOUT_S Seconds before an unacknowledged publish is written off
+                       (default: 30)
+    TELEMETRY_ENVELOPE Publish one columnar envelope per sensor type per flush
+                       window instead of one message per reading
+                       (default: false)
+    ENVELOPE_FLUSH_S   Seconds readings are collected before each envelope
+                       flush (default: the shortest sensor publish interval)
+    ENVELOPE_MAX_READINGS  Readings per envelope message (default: 5000)
+    MQTT_TRANSPORT     thread | asyncio — paho background thread or driven
+                       from the asyncio loop (default: thread)
+    SCHEDULER_RESOLUTION_S  Minimum scheduler sleep; due sensors within it are batched
+                       (default: 0.02)
+    LOG_LEVEL, LOG_SAMPLE_EVERY, LOG_FLUSH_INTERVAL_S, LOG_BUFFER_RECORDS
+                       Logging controls; see common/structured_log.py
 """
 
 from __future__ import annotations
@@ -21,17 +49,31 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import multiprocessing as mp
 import os
-import random
+import queue
 import sys
+import threading
 import time
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import paho.mqtt.client as mqtt
 
+try:
+    import orjson
+except ImportError:  # optional fast serializer; stdlib json is used otherwise
+    orjson = None
+
+from kinematics import MODELLED_TYPES, EntityField
+from scheduler import PublishScheduler, TokenBucket, resolve_intervals
+from structured_log import StructuredLogger
+from transport import create_transport
+
 # ---------------------------------------------------------------------------
 # Logging (structured JSON)
 # ---------------------------------------------------------------------------
@@ -43,14 +85,8 @@ logging.basicConfig(
 logger = logging.getLogger("sensor-simulator")
 
 
-def _log(level: str, msg: str, **kwargs: Any) -> None:
-    record: dict[str, Any] = {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "level": level.upper(),
-        "message": msg,
-        **kwargs,
-    }
-    print(json.dumps(record), flush=True)
+# Buffered + level-filtered; per-publish events go through _log.sampled()
+_log = StructuredLogger()
 
 
 # ---------------------------------------------------------------------------
@@ -65,69 +101,162 @@ SENSOR_COUNT_OVERRIDE: int | None = (
     int(os.environ["SENSOR_COUNT"]) if "SENSOR_COUNT" in os.environ else None
 )
 LOOP: bool = os.environ.get("LOOP", "true").lower() not in ("false", "0", "no")
+SIMULATOR_SEED: int | None = (
+    int(os.environ["SIMULATOR_SEED"]) if os.environ.get("SIMULATOR_SEED") else None
+)
+SIMULATOR_MODE: str = os.environ.get("SIMULATOR_MODE", "publish").strip().lower()
+REPLAY_FILE: str = os.environ.get("REPLAY_FILE", "")
+REPLAY_SPEED: str = os.environ.get("REPLAY_SPEED", "1")
+SHARDS: int = max(1, int(os.environ.get("SHARDS", "") or "1"))
+SHARD_STATS_INTERVAL_S: float = float(os.environ.get("SHARD_STATS_INTERVAL_S", "") or "10")
+MAX_PUBLISH_RATE: float | None = (
+    float(os.environ["MAX_PUBLISH_RATE"]) if os.environ.get("MAX_PUBLISH_RATE") else None
+)
+MAX_INFLIGHT: int = min(65000, max(1, int(os.environ.get("MAX_INFLIGHT", "") or "1000")))
+INFLIGHT_TIMEOUT_S: float = float(os.environ.get("INFLIGHT_TIMEOUT_S", "") or "30")
+TELEMETRY_ENVELOPE: bool = os.environ.get("TELEMETRY_ENVELOPE", "false").lower() in ("true", "1", "yes")
+ENVELOPE_MAX_READINGS: int = max(1, int(os.environ.get("ENVELOPE_MAX_READINGS", "") or "5000"))
+ENVELOPE_FLUSH_S: float | None = (
+    float(os.environ["ENVELOPE_FLUSH_S"]) if os.environ.get("ENVELOPE_FLUSH_S") else None
+)
+MQTT_TRANSPORT: str = os.environ.get("MQTT_TRANSPORT", "thread").strip().lower()
+SCHEDULER_RESOLUTION_S: float = float(os.environ.get("SCHEDULER_RESOLUTION_S", "") or "0.02")
 
 # MQTT topic templates
 TOPIC_TELEMETRY = "geoint/sensors/{sensor_type}/{sensor_id}/telemetry"
 TOPIC_ALERT = "geoint/sensors/{sensor_type}/{sensor_id}/alert"
 TOPIC_STATUS = "geoint/sensors/status"
+TOPIC_ENVELOPE = "geoint/sensors/{sensor_type}/envelope"
+
+# Columnar multi-reading payload published in envelope mode
+ENVELOPE_SCHEMA = "geoint.telemetry.envelope/v1"
 
 
 # ---------------------------------------------------------------------------
 # Payload generators
 # ---------------------------------------------------------------------------
 
+if orjson is not None:
+    _dumps = orjson.dumps
+else:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+_ALERT_TRUE = b',"alert":true}'
+_ALERT_FALSE = b',"alert":false}'
+
+
 def _now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-def _build_reading(sensor_type: str, anomaly: bool) -> dict[str, Any]:
-    """Return a realistic reading dict for the given sensor type."""
+# Modulation schemes reported by rf-detector sensors
+RF_MODULATIONS: tuple[str, ...] = ("AM", "FM", "BPSK", "QPSK")
+
+
+def _build_readings_batch(
+    sensor_type: str,
+    anomaly: np.ndarray,
+    rng: np.random.Generator,
+) -> dict[str, np.ndarray]:
+    """Return one column array per reading field for a batch of sensors.
+
+    ``anomaly`` is a boolean mask with one entry per sensor; the returned
+    arrays are aligned with it.
+    """
+    n = anomaly.shape[0]
     if sensor_type == "weather-station":
-        base_temp = 22.0 if not anomaly else random.uniform(35.0, 45.0)
+        base_temp = np.where(anomaly, rng.uniform(35.0, 45.0, n), 22.0)
         return {
-            "temperature_c": round(base_temp + random.uniform(-0.5, 0.5), 2),
-            "humidity_pct": round(random.uniform(30, 90), 1),
-            "wind_speed_kph": round(random.uniform(0, 60 if anomaly else 30), 1),
-            "pressure_hpa": round(random.uniform(995, 1025), 1),
+            "temperature_c": np.round(base_temp + rng.uniform(-0.5, 0.5, n), 2),
+            "humidity_pct": np.round(rng.uniform(30, 90, n), 1),
+            "wind_speed_kph": np.round(rng.uniform(0, np.where(anomaly, 60.0, 30.0)), 1),
+            "pressure_hpa": np.round(rng.uniform(995, 1025, n), 1),
         }
     elif sensor_type == "seismic":
-        mag = random.uniform(2.5, 5.5) if anomaly else random.uniform(0.0, 0.8)
+        mag = np.where(anomaly, rng.uniform(2.5, 5.5, n), rng.uniform(0.0, 0.8, n))
         return {
-            "magnitude": round(mag, 2),
-            "depth_m": round(random.uniform(5, 35), 1),
-            "frequency_hz": round(random.uniform(1.0, 20.0), 2),
+            "magnitude": np.round(mag, 2),
+            "depth_m": np.round(rng.uniform(5, 35, n), 1),
+            "frequency_hz": np.round(rng.uniform(1.0, 20.0, n), 2),
         }
     elif sensor_type == "rf-detector":
-        power = random.uniform(-40, -10) if anomaly else random.uniform(-90, -60)
+        power = np.where(anomaly, rng.uniform(-40, -10, n), rng.uniform(-90, -60, n))
+        modulation = np.asarray(RF_MODULATIONS)[rng.integers(0, len(RF_MODULATIONS), n)]
         return {
-            "frequency_mhz": round(random.uniform(300, 3000), 1),
-            "power_dbm": round(power, 1),
-            "bandwidth_khz": round(random.uniform(10, 200), 1),
-            "modulation": random.choice(["AM", "FM", "BPSK", "QPSK"]),
+            "frequency_mhz": np.round(rng.uniform(300, 3000, n), 1),
+            "power_dbm": np.round(power, 1),
+            "bandwidth_khz": np.round(rng.uniform(10, 200, n), 1),
+            "modulation": modulation,
         }
     return {}
 
 
-def _build_payload(sensor: dict[str, Any], anomaly: bool) -> dict[str, Any]:
-    """Construct the canonical sensor telemetry payload."""
-    return {
-        "sensor_id": sensor["sensor_id"],
-        "sensor_type": sensor["sensor_type"],
-        "grid_ref": sensor["grid_ref"],
-        "lat": sensor["lat"],
-        "lon": sensor["lon"],
-        "timestamp": _now_iso(),
-        "reading": _build_reading(sensor["sensor_type"], anomaly),
-        "alert": anomaly,
-    }
+def _readings_to_dicts(columns: dict[str, np.ndarray], n: int) -> list[dict[str, Any]]:
+    """Transpose reading columns into one plain-Python dict per sensor."""
+    if not columns:
+        return [{} for _ in range(n)]
+    keys = tuple(columns)
+    values = [columns[k].tolist() for k in keys]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def _encode_payloads_batch(
+    sensors: list[CompiledSensor],
+    columns: dict[str, np.ndarray],
+    anomaly: np.ndarray,
+) -> list[bytes]:
+    """Encode canonical telemetry payloads for compiled sensors of a single type.
+
+    Only the timestamp, reading and alert fields are serialised per tick; the
+    rest of each payload comes from the sensor's pre-built JSON prefix.
+    """
+    if not sensors:
+        return []
+    stamp = b'"timestamp":"' + _now_iso().encode() + b'","reading":'
+    readings = _readings_to_dicts(columns, len(sensors))
+    return [
+        b"".join((sensor.prefix, stamp, _dumps(reading), _ALERT_TRUE if alert else _ALERT_FALSE))
+        for sensor, reading, alert in zip(sensors, readings, anomaly.tolist())
+    ]
+
+
+def _encode_envelope(
+    sensor_type: str,
+    sensors: list[CompiledSensor],
+    columns: dict[str, np.ndarray],
+    anomaly: np.ndarray,
+) -> bytes:
+    """Encode readings for many same-type sensors as one columnar envelope.
+
+    Every list in the envelope is aligned by index; ``reading`` holds one
+    list per reading field.
+    """
+    return _dumps(
+        {
+            "schema": ENVELOPE_SCHEMA,
+            "sensor_type": sensor_type,
+            "timestamp": _now_iso(),
+            "count": len(sensors),
+            "sensor_id": [s.sensor_id for s in sensors],
+            "grid_ref": [s.grid_ref for s in sensors],
+            "lat": [s.lat for s in sensors],
+            "lon": [s.lon for s in sensors],
+            "reading": {k: v.tolist() for k, v in columns.items()},
+            "alert": anomaly.tolist(),
+        }
+    )
 
 
 # ---------------------------------------------------------------------------
 # MQTT client helpers
 # ---------------------------------------------------------------------------
 
-def _create_client() -> mqtt.Client:
-    client = mqtt.Client(client_id=f"simulator-{uuid.uuid4().hex[:8]}", protocol=mqtt.MQTTv311)
+def _create_client(shard: int | None = None) -> mqtt.Client:
+    client_id = f"simulator-{uuid.uuid4().hex[:8]}"
+    if shard is not None:
+        client_id = f"{client_id}-shard{shard}"
+    client = mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv311)
     if MQTT_USERNAME:
         client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
 
@@ -178,51 +307,410 @@ def _expand_sensors(scenario: dict[str, Any], count_override: int | None) -> lis
     return sensors
 
 
+@dataclass(frozen=True, slots=True)
+class CompiledSensor:
+    """Per-sensor values that never change between publishes, built once."""
+
+    sensor_id: str
+    sensor_type: str
+    grid_ref: str
+    lat: float
+    lon: float
+    topic: str
+    alert_topic: str
+    prefix: bytes  # '{"sensor_id":...,"lon":...,' — payload up to the timestamp
+
+
+def _compile_sensors(sensors: list[dict[str, Any]]) -> list[CompiledSensor]:
+    """Pre-build topics and the static JSON prefix of every sensor's payload."""
+    compiled: list[CompiledSensor] = []
+    for sensor in sensors:
+        static = {
+            "sensor_id": sensor["sensor_id"],
+            "sensor_type": sensor["sensor_type"],
+            "grid_ref": sensor["grid_ref"],
+            "lat": sensor["lat"],
+            "lon": sensor["lon"],
+        }
+        fmt = {"sensor_type": sensor["sensor_type"], "sensor_id": sensor["sensor_id"]}
+        compiled.append(
+            CompiledSensor(
+                sensor_id=sensor["sensor_id"],
+                sensor_type=sensor["sensor_type"],
+                grid_ref=sensor["grid_ref"],
+                lat=sensor["lat"],
+                lon=sensor["lon"],
+                topic=TOPIC_TELEMETRY.format(**fmt),
+                alert_topic=TOPIC_ALERT.format(**fmt),
+                prefix=_dumps(static)[:-1] + b",",
+            )
+        )
+    return compiled
+
+
+def _group_by_type(sensors: list[CompiledSensor]) -> dict[str, list[CompiledSensor]]:
+    """Bucket sensors by ``sensor_type`` so each bucket can be generated as one batch."""
+    groups: dict[str, list[CompiledSensor]] = {}
+    for sensor in sensors:
+        groups.setdefault(sensor.sensor_type, []).append(sensor)
+    return groups
+
+
+def _max_publish_rate(scenario: dict[str, Any]) -> float | None:
+    """Global telemetry rate cap: ``MAX_PUBLISH_RATE`` env, else scenario ``max_rate_msgs_s``."""
+    return MAX_PUBLISH_RATE or scenario.get("max_rate_msgs_s")
+
+
 # ---------------------------------------------------------------------------
 # Main simulation loop
 # ---------------------------------------------------------------------------
 
-async def _publish_sensor(
-    client: mqtt.Client,
-    sensor: dict[str, Any],
+@dataclass
+class PublishStats:
+    """Running publish counters, reported per window by sharded workers."""
+
+    published: int = 0
+    errors: int = 0
+    window_published: int = 0
+    window_errors: int = 0
+    window_started: float = 0.0
+    backpressure_waits: int = 0
+
+    def record(self, ok: bool, readings: int = 1) -> None:
+        if ok:
+            self.published += readings
+            self.window_published += readings
+        else:
+            self.errors += readings
+            self.window_errors += readings
+
+    def drain_window(self) -> dict[str, Any]:
+        """Return counters for the window since the last drain and start a new one."""
+        now = time.monotonic()
+        elapsed = max(now - self.window_started, 1e-9)
+        report = {
+            "published": self.published,
+            "errors": self.errors,
+            "publish_rate": round(self.window_published / elapsed, 1),
+            "error_rate": round(self.window_errors / elapsed, 2),
+        }
+        self.window_published = 0
+        self.window_errors = 0
+        self.window_started = now
+        return report
+
+
+class InflightWindow:
+    """Bounded window of unacknowledged QoS 1 publishes with PUBACK latency tracking.
+
+    paho calls ``on_publish`` from its network thread while holding its own
+    message lock, so ``publish`` must not hold our lock across
+    ``client.publish``. A PUBACK that races ahead of its registration is
+    parked in ``_early`` and matched when the send is recorded. QoS 0
+    publishes (heartbeats) also land there and simply age out.
+    """
+
+    def __init__(self, limit: int, timeout_s: float) -> None:
+        self.limit = limit
+        self.timeout_s = timeout_s
+        self.timeouts = 0
+        self._pending: dict[int, float] = {}
+        self._early: dict[int, float] = {}
+        self._latencies: list[float] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def available(self) -> int:
+        return max(0, self.limit - len(self._pending))
+
+    def publish(self, client: mqtt.Client, topic: str, payload: bytes) -> mqtt.MQTTMessageInfo:
+        sent = time.perf_counter()
+        info = client.publish(topic, payload, qos=1)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            with self._lock:
+                acked = self._early.pop(info.mid, None)
+                # An ack older than this send belongs to an earlier use of the mid
+                if acked is not None and acked >= sent:
+                    self._latencies.append(acked - sent)
+                else:
+                    self._pending[info.mid] = sent
+        return info
+
+    def on_publish(self, _client: mqtt.Client, _userdata: Any, mid: int) -> None:
+        acked = time.perf_counter()
+        with self._lock:
+            sent = self._pending.pop(mid, None)
+            if sent is not None:
+                self._latencies.append(acked - sent)
+            else:
+                self._early[mid] = acked
+
+    def expire(self) -> int:
+        """Drop entries older than ``timeout_s`` so a lost PUBACK cannot pin the window."""
+        now = time.perf_counter()
+        cutoff = now - self.timeout_s
+        with self._lock:
+            stale = [mid for mid, sent in self._pending.items() if sent < cutoff]
+            for mid in stale:
+                del self._pending[mid]
+            self._early = {mid: t for mid, t in self._early.items() if t >= now - 1.0}
+        self.timeouts += len(stale)
+        return len(stale)
+
+    def drain_latencies(self) -> dict[str, Any]:
+        """Return PUBACK latency percentiles (ms) since the last drain and reset them."""
+        with self._lock:
+            samples, self._latencies = self._latencies, []
+        summary: dict[str, Any] = {
+            "acked": len(samples),
+            "inflight": len(self._pending),
+            "timeouts": self.timeouts,
+        }
+        if samples:
+            p50, p90, p99 = np.percentile(samples, (50, 90, 99)) * 1000.0
+            summary.update(
+                p50_ms=round(float(p50), 2),
+                p90_ms=round(float(p90), 2),
+                p99_ms=round(float(p99), 2),
+                max_ms=round(max(samples) * 1000.0, 2),
+            )
+        return summary
+
+
+def _readings_for_group(
+    sensor_type: str,
+    group: list[CompiledSensor],
     anomaly_probability: float,
-) -> None:
-    """Publish one telemetry (and optionally alert) message for a sensor."""
-    anomaly = random.random() < anomaly_probability
-    payload = _build_payload(sensor, anomaly)
-    topic = TOPIC_TELEMETRY.format(
-        sensor_type=sensor["sensor_type"], sensor_id=sensor["sensor_id"]
-    )
-    result = client.publish(topic, json.dumps(payload), qos=1)
-    if result.rc != mqtt.MQTT_ERR_SUCCESS:
-        _log("warning", "Publish failed", topic=topic, rc=result.rc)
+    rng: np.random.Generator,
+    field: EntityField | None = None,
+) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """Return reading columns and the alert mask for one same-type group.
+
+    Sensor types modelled by the scenario's entity field take their alerts
+    from entity proximity; everything else rolls ``anomaly_probability``.
+    """
+    if field is not None and sensor_type in MODELLED_TYPES:
+        columns = _build_readings_batch(sensor_type, np.zeros(len(group), dtype=bool), rng)
+        lat = np.fromiter((s.lat for s in group), dtype=np.float64, count=len(group))
+        lon = np.fromiter((s.lon for s in group), dtype=np.float64, count=len(group))
+        return columns, field.overlay(sensor_type, columns, lat, lon)
+    anomaly = rng.random(len(group)) < anomaly_probability
+    return _build_readings_batch(sensor_type, anomaly, rng), anomaly
+
+
+def _publish_sensor(
+    client: mqtt.Client,
+    window: InflightWindow,
+    sensor: CompiledSensor,
+    body: bytes,
+    alert: bool,
+) -> bool:
+    """Publish one telemetry (and optionally alert) message for a sensor.
+
+    Returns True when the telemetry publish was accepted by the client.
+    """
+    result = window.publish(client, sensor.topic, body)
+    ok = result.rc == mqtt.MQTT_ERR_SUCCESS
+    if not ok:
+        _log.sampled("warning", "Publish failed", topic=sensor.topic, rc=result.rc)
     else:
-        _log("debug", "Published telemetry", topic=topic, alert=anomaly)
+        _log.sampled("debug", "Published telemetry", topic=sensor.topic, alert=alert)
+
+    if alert:
+        window.publish(client, sensor.alert_topic, body)
+        _log.sampled("info", "Alert published", topic=sensor.alert_topic, sensor_id=sensor.sensor_id)
+    return ok
 
-    if anomaly:
-        alert_topic = TOPIC_ALERT.format(
-            sensor_type=sensor["sensor_type"], sensor_id=sensor["sensor_id"]
+
+def _publish_tick(
+    client: mqtt.Client,
+    window: InflightWindow,
+    groups: dict[str, list[CompiledSensor]],
+    anomaly_probability: float,
+    rng: np.random.Generator,
+    stats: PublishStats,
+    field: EntityField | None = None,
+    envelopes: EnvelopeBuffer | None = None,
+    now: float = 0.0,
+) -> None:
+    """Generate and publish one tick of telemetry, one batch per sensor type.
+
+    With ``envelopes`` the readings are buffered for the next envelope flush;
+    only their alerts go out straight away.
+    """
+    for sensor_type, group in groups.items():
+        columns, anomaly = _readings_for_group(sensor_type, group, anomaly_probability, rng, field)
+        if envelopes is not None:
+            _publish_alerts(client, window, group, columns, anomaly)
+            envelopes.add(sensor_type, group, columns, anomaly, now)
+            continue
+        bodies = _encode_payloads_batch(group, columns, anomaly)
+        for sensor, body, alert in zip(group, bodies, anomaly.tolist()):
+            stats.record(_publish_sensor(client, window, sensor, body, alert))
+
+
+def _publish_envelopes(
+    client: mqtt.Client,
+    window: InflightWindow,
+    sensor_type: str,
+    group: list[CompiledSensor],
+    columns: dict[str, np.ndarray],
+    anomaly: np.ndarray,
+    stats: PublishStats,
+) -> None:
+    """Publish a group's readings as envelopes of up to ``ENVELOPE_MAX_READINGS``."""
+    topic = TOPIC_ENVELOPE.format(sensor_type=sensor_type)
+    for start in range(0, len(group), ENVELOPE_MAX_READINGS):
+        part = slice(start, start + ENVELOPE_MAX_READINGS)
+        body = _encode_envelope(
+            sensor_type,
+            group[part],
+            {k: v[part] for k, v in columns.items()},
+            anomaly[part],
         )
-        client.publish(alert_topic, json.dumps(payload), qos=1)
-        _log("info", "Alert published", topic=alert_topic, sensor_id=sensor["sensor_id"])
+        result = window.publish(client, topic, body)
+        ok = result.rc == mqtt.MQTT_ERR_SUCCESS
+        if not ok:
+            _log.sampled("warning", "Publish failed", topic=topic, rc=result.rc)
+        stats.record(ok, len(group[part]))
+
 
+def _publish_alerts(
+    client: mqtt.Client,
+    window: InflightWindow,
+    group: list[CompiledSensor],
+    columns: dict[str, np.ndarray],
+    anomaly: np.ndarray,
+) -> None:
+    """Publish the anomalous readings of an enveloped group on their alert topics.
+
+    The alert pipeline sees the same per-sensor messages as without
+    envelopes, and without waiting for the envelope flush.
+    """
+    alerting = np.flatnonzero(anomaly)
+    if alerting.size:
+        sensors = [group[i] for i in alerting]
+        bodies = _encode_payloads_batch(
+            sensors, {k: v[alerting] for k, v in columns.items()}, anomaly[alerting]
+        )
+        for sensor, body in zip(sensors, bodies):
+            window.publish(client, sensor.alert_topic, body)
+            _log.sampled("info", "Alert published", topic=sensor.alert_topic, sensor_id=sensor.sensor_id)
+
+
+class EnvelopeBuffer:
+    """Readings held per sensor type until the next envelope flush.
+
+    Without it a flush would happen on every scheduler wake, which only
+    batches the handful of sensors due in the same few milliseconds. Holding
+    readings for a reporting interval gives one envelope per type per
+    interval. The envelope's timestamp is the flush time.
+    """
+
+    def __init__(self, flush_s: float) -> None:
+        self.flush_s = flush_s
+        self._parts: dict[str, list[tuple[list[CompiledSensor], dict[str, np.ndarray], np.ndarray]]] = {}
+        self._counts: dict[str, int] = {}
+        self._since: float | None = None
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
+
+    def add(
+        self,
+        sensor_type: str,
+        group: list[CompiledSensor],
+        columns: dict[str, np.ndarray],
+        anomaly: np.ndarray,
+        now: float,
+    ) -> None:
+        if self._since is None:
+            self._since = now
+        self._parts.setdefault(sensor_type, []).append((group, columns, anomaly))
+        self._counts[sensor_type] = self._counts.get(sensor_type, 0) + len(group)
+
+    def next_flush(self) -> float | None:
+        return None if self._since is None else self._since + self.flush_s
+
+    def due(self, now: float) -> bool:
+        if self._since is None:
+            return False
+        return now - self._since >= self.flush_s or max(self._counts.values()) >= ENVELOPE_MAX_READINGS
+
+    def flush(self, client: mqtt.Client, window: InflightWindow, stats: PublishStats) -> None:
+        """Publish everything buffered, one envelope per type (split at the size cap)."""
+        parts, self._parts, self._counts, self._since = self._parts, {}, {}, None
+        for sensor_type, chunks in parts.items():
+            group = [sensor for chunk_group, _, _ in chunks for sensor in chunk_group]
+            columns = {
+                name: np.concatenate([chunk_columns[name] for _, chunk_columns, _ in chunks])
+                for name in chunks[0][1]
+            }
+            anomaly = np.concatenate([chunk_anomaly for _, _, chunk_anomaly in chunks])
+            _publish_envelopes(client, window, sensor_type, group, columns, anomaly, stats)
+
+
+async def _heartbeat(
+    client: mqtt.Client,
+    sensors: list[dict[str, Any]],
+    shard: int | None = None,
+    stats: PublishStats | None = None,
+    window: InflightWindow | None = None,
+) -> None:
+    """Publish a heartbeat/status message for all sensors.
 
-async def _heartbeat(client: mqtt.Client, sensors: list[dict[str, Any]]) -> None:
-    """Publish a heartbeat/status message for all sensors."""
-    status = {
+    When a ``window`` is given the heartbeat also carries PUBACK latency
+    percentiles for the interval since the previous heartbeat.
+    """
+    status: dict[str, Any] = {
         "timestamp": _now_iso(),
         "active_sensors": len(sensors),
         "sensor_ids": [s["sensor_id"] for s in sensors],
     }
+    if shard is not None:
+        status["shard"] = shard
+    puback = window.drain_latencies() if window else None
+    if puback is not None:
+        status["puback"] = puback
     client.publish(TOPIC_STATUS, json.dumps(status), qos=0)
-    _log("info", "Heartbeat published", active_sensors=len(sensors))
+    _log(
+        "info",
+        "Heartbeat published",
+        active_sensors=len(sensors),
+        shard=shard,
+        published=stats.published if stats else None,
+        errors=stats.errors if stats else None,
+        backpressure_waits=stats.backpressure_waits if stats else None,
+        puback=puback,
+    )
 
 
-async def run_simulation(scenario: dict[str, Any], sensors: list[dict[str, Any]]) -> None:
-    """Run the main simulation loop."""
-    client = _create_client()
+async def run_simulation(
+    scenario: dict[str, Any],
+    sensors: list[dict[str, Any]],
+    *,
+    shard: int | None = None,
+    rng: np.random.Generator | None = None,
+    stats_queue: Any = None,
+    max_rate: float | None = None,
+) -> None:
+    """Run the main simulation loop.
+
+    Sensors are fired individually from a ``PublishScheduler`` heap and
+    generated in per-type batches for whichever sensors are due. When
+    ``stats_queue`` is given (sharded mode) the loop pushes a publish stats
+    report onto it every ``SHARD_STATS_INTERVAL_S`` seconds.
+    """
+    client = _create_client(shard)
+    window = InflightWindow(MAX_INFLIGHT, INFLIGHT_TIMEOUT_S)
+    # Let paho send up to the full window instead of queueing past its default of 20
+    client.max_inflight_messages_set(MAX_INFLIGHT)
+    client.on_publish = window.on_publish
+    transport = create_transport(MQTT_TRANSPORT, client)
     client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
-    client.loop_start()
+    transport.start()
 
     # Wait for connection
     for _ in range(20):
@@ -231,39 +719,187 @@ async def run_simulation(scenario: dict[str, Any], sensors: list[dict[str, Any]]
         await asyncio.sleep(0.5)
     else:
         _log("error", "Could not connect to MQTT broker — exiting")
-        client.loop_stop()
+        await transport.stop()
         return
 
     anomaly_probability: float = scenario.get("anomaly_probability", 0.05)
-    publish_interval: float = scenario.get("publish_interval_s", 2.0)
     heartbeat_interval: float = scenario.get("heartbeat_interval_s", 30.0)
+    jitter_pct: float = scenario.get("publish_jitter_pct", 0.0)
+    if max_rate is None:
+        max_rate = _max_publish_rate(scenario)
+    if rng is None:
+        rng = np.random.default_rng(SIMULATOR_SEED)
+    compiled = _compile_sensors(sensors)
+    field = EntityField.from_scenario(scenario)
+    start = time.monotonic()
+    last_advance = start
+    intervals = resolve_intervals(scenario, sensors)
+    envelopes: EnvelopeBuffer | None = None
+    if TELEMETRY_ENVELOPE:
+        # One envelope per type per reporting interval unless told otherwise
+        envelopes = EnvelopeBuffer(ENVELOPE_FLUSH_S or float(intervals.min()))
+    scheduler = PublishScheduler(
+        intervals,
+        rng,
+        start=start,
+        jitter_pct=jitter_pct,
+        repeat=LOOP,
+    )
+    bucket = TokenBucket(max_rate, now=start) if max_rate else None
+    stats = PublishStats(window_started=start)
     last_heartbeat: float = 0.0
+    last_report: float = start
+    _log(
+        "info",
+        "Publish scheduler started",
+        sensors=len(sensors),
+        jitter_pct=jitter_pct,
+        max_rate_msgs_s=max_rate,
+        entities=len(field) if field else 0,
+        envelope_flush_s=envelopes.flush_s if envelopes else None,
+        shard=shard,
+    )
 
-    iteration = 0
     try:
         while True:
-            iteration += 1
-            _log("info", "Simulation tick", iteration=iteration, sensors=len(sensors))
-
-            tasks = [
-                _publish_sensor(client, sensor, anomaly_probability) for sensor in sensors
-            ]
-            await asyncio.gather(*tasks)
-
             now = time.monotonic()
+            limit = window.available()
+            if bucket:
+                limit = min(limit, bucket.available(now))
+            due = scheduler.pop_due(now, limit)
+            if due:
+                if bucket:
+                    bucket.consume(len(due))
+                if field is not None:
+                    field.advance(now - last_advance)
+                    last_advance = now
+                fired = _group_by_type([compiled[idx] for _, idx in due])
+                _publish_tick(client, window, fired, anomaly_probability, rng, stats, field, envelopes, now)
+                scheduler.reschedule(due, now)
+            if envelopes is not None and envelopes.due(now):
+                envelopes.flush(client, window, stats)
+
             if now - last_heartbeat >= heartbeat_interval:
-                await _heartbeat(client, sensors)
+                window.expire()
+                await _heartbeat(client, sensors, shard, stats, window)
                 last_heartbeat = now
+            if stats_queue is not None and now - last_report >= SHARD_STATS_INTERVAL_S:
+                stats_queue.put({"shard": shard, "inflight": len(window), **stats.drain_window()})
+                last_report = now
 
-            await asyncio.sleep(publish_interval)
-
-            if not LOOP:
-                _log("info", "LOOP=false — exiting after one pass")
+            next_fire = scheduler.next_fire()
+            if next_fire is None:
+                _log("info", "LOOP=false — every sensor published once, exiting")
                 break
+            wake = next_fire
+            if envelopes is not None and (flush_at := envelopes.next_flush()) is not None:
+                wake = min(wake, flush_at)
+            if next_fire <= now:
+                # Still due: throttled by the rate cap or the in-flight window
+                if window.available() == 0:
+                    stats.backpressure_waits += 1
+                wake = now + (bucket.time_until(1, now) if bucket else 0.0)
+            await asyncio.sleep(max(wake - time.monotonic(), SCHEDULER_RESOLUTION_S))
+    finally:
+        if envelopes is not None and len(envelopes) and client.is_connected():
+            envelopes.flush(client, window, stats)
+        if stats_queue is not None:
+            stats_queue.put({"shard": shard, "done": True, **stats.drain_window()})
+        await transport.stop()
+        _log("info", "Simulator stopped", shard=shard)
+
+
+# ---------------------------------------------------------------------------
+# Sharded mode
+# ---------------------------------------------------------------------------
+
+def _shard_main(
+    shard: int,
+    scenario: dict[str, Any],
+    sensors: list[dict[str, Any]],
+    seed: np.random.SeedSequence,
+    stats_queue: Any,
+    max_rate: float | None,
+) -> None:
+    """Worker-process entry point: run the simulation for one slice of sensors."""
+    try:
+        asyncio.run(
+            run_simulation(
+                scenario,
+                sensors,
+                shard=shard,
+                rng=np.random.default_rng(seed),
+                stats_queue=stats_queue,
+                max_rate=max_rate,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+def run_sharded(scenario: dict[str, Any], sensors: list[dict[str, Any]], shard_count: int) -> None:
+    """Split ``sensors`` across ``shard_count`` worker processes and aggregate their stats.
+
+    Each worker owns its own MQTT client ID and connection. Sensors are dealt
+    round-robin so every shard gets a similar mix of sensor types, and the
+    global publish rate cap is split evenly between them.
+    """
+    ctx = mp.get_context("spawn")
+    stats_queue = ctx.Queue()
+    seeds = np.random.SeedSequence(SIMULATOR_SEED).spawn(shard_count)
+    max_rate = _max_publish_rate(scenario)
+    shard_rate = max_rate / shard_count if max_rate else 0.0
+    procs = [
+        ctx.Process(
+            target=_shard_main,
+            args=(idx, scenario, sensors[idx::shard_count], seeds[idx], stats_queue, shard_rate),
+            name=f"simulator-shard-{idx}",
+            daemon=True,
+        )
+        for idx in range(shard_count)
+    ]
+    for proc in procs:
+        proc.start()
+    _log("info", "Sharded simulator started", shards=shard_count, sensor_count=len(sensors))
+
+    latest: dict[int, dict[str, Any]] = {}
+    last_summary = time.monotonic()
+    try:
+        while any(proc.is_alive() for proc in procs) or not stats_queue.empty():
+            try:
+                report = stats_queue.get(timeout=1.0)
+            except queue.Empty:
+                report = None
+            if report is not None:
+                latest[report["shard"]] = report
+                if report.get("error_rate"):
+                    _log("warning", "Shard publish errors", **report)
+
+            now = time.monotonic()
+            if latest and now - last_summary >= SHARD_STATS_INTERVAL_S:
+                _log(
+                    "info",
+                    "Shard stats",
+                    shards=len(latest),
+                    publish_rate=round(sum(r["publish_rate"] for r in latest.values()), 1),
+                    published=sum(r["published"] for r in latest.values()),
+                    errors=sum(r["errors"] for r in latest.values()),
+                    per_shard={
+                        str(idx): {k: r[k] for k in ("publish_rate", "published", "errors")}
+                        for idx, r in sorted(latest.items())
+                    },
+                )
+                last_summary = now
+    except KeyboardInterrupt:
+        _log("info", "Interrupted — stopping shards")
     finally:
-        client.loop_stop()
-        client.disconnect()
-        _log("info", "Simulator stopped")
+        for proc in procs:
+            proc.join(timeout=5.0)
+            if proc.is_alive():
+                proc.terminate()
+            if proc.exitcode not in (0, None):
+                _log("warning", "Shard exited abnormally", shard=proc.name, exitcode=proc.exitcode)
+        _log("info", "Sharded simulator stopped", shards=shard_count)
 
 
 # ---------------------------------------------------------------------------
@@ -272,6 +908,25 @@ async def run_simulation(scenario: dict[str, Any], sensors: list[dict[str, Any]]
 
 def main() -> None:
     """Load scenario and start the simulation."""
+    if SIMULATOR_MODE == "capacity":
+        from capacity import run_from_env as run_capacity
+
+        run_capacity()
+        return
+
+    if SIMULATOR_MODE == "generate":
+        from generate import run_from_env
+
+        run_from_env()
+        return
+
+    if SIMULATOR_MODE == "replay":
+        from replay import parse_speed, replay
+
+        _log("info", "Starting telemetry replay", file=REPLAY_FILE, speed=REPLAY_SPEED, loop=LOOP)
+        replay(REPLAY_FILE, parse_speed(REPLAY_SPEED), loop=LOOP)
+        return
+
     scenario = _load_scenario(SCENARIO_FILE)
     sensors = _expand_sensors(scenario, SENSOR_COUNT_OVERRIDE)
     _log(
@@ -282,8 +937,15 @@ def main() -> None:
         scenario=SCENARIO_FILE,
         sensor_count=len(sensors),
         loop=LOOP,
+        seed=SIMULATOR_SEED,
+        shards=SHARDS,
+        transport=MQTT_TRANSPORT,
+        envelope=TELEMETRY_ENVELOPE,
     )
-    asyncio.run(run_simulation(scenario, sensors))
+    if SHARDS > 1:
+        run_sharded(scenario, sensors, SHARDS)
+    else:
+        asyncio.run(run_simulation(scenario, sensors))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+"""Make the simulator modules and the shared ``common`` modules importable,
+as the Docker image does by copying them side by side."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent
+sys.path[:0] = [str(_HERE.parent), str(_HERE.parents[1] / "common")]
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import gzip
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import paho.mqtt.client as mqtt
+import pytest
+
+import replay
+from replay import CaptureWriter, Record, parse_speed, read_capture
+
+
+class FakeBroker:
+    """Stands in for a paho client: QoS 1 publishes are acked by a background
+    thread after ``ack_delay_s``; mids in ``drop`` are never acked."""
+
+    def __init__(self, ack_delay_s: float = 0.001, drop: frozenset[int] = frozenset()) -> None:
+        self.ack_delay_s = ack_delay_s
+        self.drop = drop
+        self.on_publish: Optional[Callable[[Any, Any, int], None]] = None
+        self.published: list[tuple[str, int]] = []
+        self.unacked = 0
+        self.peak_unacked = 0
+        self.unacked_at_disconnect: Optional[int] = None
+        self._lock = threading.Lock()
+        self._mid = 0
+
+    # -- the parts of paho.mqtt.client.Client that replay() uses -------------
+
+    def max_inflight_messages_set(self, _limit: int) -> None:
+        pass
+
+    def connect(self, *_args: Any, **_kwargs: Any) -> None:
+        pass
+
+    def loop_start(self) -> None:
+        pass
+
+    def loop_stop(self) -> None:
+        pass
+
+    def is_connected(self) -> bool:
+        return True
+
+    def disconnect(self) -> None:
+        self.unacked_at_disconnect = self.unacked
+
+    def publish(self, topic: str, payload: bytes, qos: int = 0) -> mqtt.MQTTMessageInfo:
+        with self._lock:
+            self._mid += 1
+            mid = self._mid
+            self.published.append((topic, qos))
+        info = mqtt.MQTTMessageInfo(mid)
+        info.rc = mqtt.MQTT_ERR_SUCCESS
+        if qos == 0:
+            info._set_as_published()
+            return info
+        with self._lock:
+            self.unacked += 1
+            self.peak_unacked = max(self.peak_unacked, self.unacked)
+        if mid not in self.drop:
+            threading.Timer(self.ack_delay_s, self._ack, (mid,)).start()
+        return info
+
+    def _ack(self, mid: int) -> None:
+        with self._lock:
+            self.unacked -= 1
+        assert self.on_publish is not None
+        self.on_publish(self, None, mid)
+
+
+def _capture(path: Path, count: int, qos: Callable[[int], int] = lambda i: 1) -> Path:
+    writer = CaptureWriter(path)
+    for i in range(count):
+        writer.write(Record(1000.0 + i * 0.01, qos(i), f"geoint/sensors/seismic/s-{i}/telemetry", b"{}"))
+    writer.close()
+    return path
+
+
+@pytest.fixture
+def broker(monkeypatch: pytest.MonkeyPatch) -> FakeBroker:
+    fake = FakeBroker()
+    monkeypatch.setattr(replay, "_create_client", lambda: fake)
+    monkeypatch.setattr(replay, "MAX_INFLIGHT", 8)
+    return fake
+
+
+def test_capture_round_trip_appends_as_new_gzip_member(tmp_path: Path) -> None:
+    path = tmp_path / "capture.georec"
+    first = Record(1.5, 1, "geoint/sensors/seismic/s-1/telemetry", b'{"a":1}')
+    second = Record(2.5, 0, "geoint/sensors/status", b"")
+    for record in (first, second):
+        writer = CaptureWriter(path)
+        writer.write(record)
+        writer.close()
+    assert list(read_capture(path)) == [first, second]
+
+
+def test_truncated_tail_is_skipped(tmp_path: Path) -> None:
+    path = _capture(tmp_path / "capture.georec", 3)
+    data = gzip.decompress(path.read_bytes())
+    path.write_bytes(gzip.compress(data[:-1]))
+    assert len(list(read_capture(path))) == 2
+
+
+def test_bad_magic_is_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "other.gz"
+    path.write_bytes(gzip.compress(b"NOTREC1\n" + b"x" * 20))
+    with pytest.raises(ValueError, match="bad magic"):
+        list(read_capture(path))
+
+
+def test_unthrottled_replay_is_bounded_by_the_inflight_window(tmp_path: Path, broker: FakeBroker) -> None:
+    path = _capture(tmp_path / "capture.georec", 200)
+    assert replay.replay(str(path), None) == 200
+    assert len(broker.published) == 200
+    assert broker.peak_unacked <= 8
+
+
+def test_every_publish_is_acknowledged_before_disconnect(tmp_path: Path, broker: FakeBroker) -> None:
+    broker.ack_delay_s = 0.05
+    path = _capture(tmp_path / "capture.georec", 20, qos=lambda i: i % 2)
+    assert replay.replay(str(path), None) == 20
+    assert broker.unacked_at_disconnect == 0
+    assert [qos for _, qos in broker.published] == [i % 2 for i in range(20)]
+
+
+def test_lost_pubacks_are_not_counted_as_published(
+    tmp_path: Path, broker: FakeBroker, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(replay, "INFLIGHT_TIMEOUT_S", 0.2)
+    broker.drop = frozenset({3, 5})
+    path = _capture(tmp_path / "capture.georec", 20)
+    assert replay.replay(str(path), None) == 18
+
+
+def test_speed_keeps_original_spacing(tmp_path: Path, broker: FakeBroker) -> None:
+    path = _capture(tmp_path / "capture.georec", 11)  # 0.1 s of capture
+    start = time.monotonic()
+    replay.replay(str(path), 0.5)
+    assert time.monotonic() - start >= 0.2
+
+
+@pytest.mark.parametrize("raw, speed", [("max", None), ("0", None), ("", None), ("10", 10.0), ("2.5x", 2.5)])
+def test_parse_speed(raw: str, speed: Optional[float]) -> None:
+    assert parse_speed(raw) == speed
+
+
+def test_parse_speed_rejects_negative() -> None:
+    with pytest.raises(ValueError):
+        parse_speed("-1")
@@ -0,0 +1,160 @@
+"""
+GEOINT Demo — IoT Backbone: MQTT Transports
+============================================
+How the simulator's paho client gets its network I/O serviced.
+
+    thread   paho's own ``loop_start()`` background thread (default). Every
+             publish wakes that thread through a socketpair and crosses the GIL.
+    asyncio  paho driven from the running asyncio loop via its socket
+             callbacks: reads on ``add_reader``, writes on ``add_writer``,
+             keepalive from a small task. No extra thread; publishes made
+             during one scheduler wake are queued by paho and drained in a
+             single writable callback, with TCP_CORK (Linux) coalescing them
+             into full segments. If the broker drops the connection it is
+             re-established with exponential backoff, as ``loop_start()``
+             does for the thread transport.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+from typing import Any
+
+import paho.mqtt.client as mqtt
+
+TRANSPORTS = ("thread", "asyncio")
+
+# Backoff between reconnect attempts of the asyncio transport
+RECONNECT_MIN_DELAY_S = 1.0
+RECONNECT_MAX_DELAY_S = 60.0
+
+
+class ThreadTransport:
+    """paho's background network thread."""
+
+    def __init__(self, client: mqtt.Client) -> None:
+        self._client = client
+
+    def start(self) -> None:
+        self._client.loop_start()
+
+    async def stop(self) -> None:
+        self._client.loop_stop()
+        self._client.disconnect()
+
+
+class AsyncioTransport:
+    """Services a paho client from the asyncio event loop instead of a thread.
+
+    Must be constructed before ``client.connect()`` so the socket callbacks
+    are in place when paho opens the socket.
+    """
+
+    def __init__(self, client: mqtt.Client, loop: asyncio.AbstractEventLoop) -> None:
+        self._client = client
+        self._loop = loop
+        self._misc: asyncio.Task[None] | None = None
+        self._reconnect: asyncio.Task[None] | None = None
+        self._stopping = False
+        self._closed = asyncio.Event()
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def start(self) -> None:
+        """Nothing to start; I/O is registered when paho opens its socket."""
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        if self._client.socket() is None:
+            return
+        self._closed.clear()
+        self._client.disconnect()
+        try:
+            # DISCONNECT is written by the writer callback, then paho closes the socket
+            await asyncio.wait_for(self._closed.wait(), timeout=5.0)
+        except asyncio.TimeoutError:
+            pass
+
+    # -- paho socket callbacks ---------------------------------------------
+
+    def _on_socket_open(self, client: mqtt.Client, _userdata: Any, sock: socket.socket) -> None:
+        self._loop.add_reader(sock, client.loop_read)
+        self._misc = self._loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, _client: mqtt.Client, _userdata: Any, sock: socket.socket) -> None:
+        self._loop.remove_reader(sock)
+        self._loop.remove_writer(sock)
+        if self._misc is not None:
+            self._misc.cancel()
+            self._misc = None
+        self._closed.set()
+        if not self._stopping and self._reconnect is None:
+            # Broker went away (or keepalive expired) without us asking
+            self._reconnect = self._loop.create_task(self._reconnect_loop())
+
+    def _on_socket_register_write(self, _client: mqtt.Client, _userdata: Any, sock: socket.socket) -> None:
+        self._loop.add_writer(sock, self._flush, sock)
+
+    def _on_socket_unregister_write(self, _client: mqtt.Client, _userdata: Any, sock: socket.socket) -> None:
+        self._loop.remove_writer(sock)
+
+    # -- I/O ------------------------------------------------------------------
+
+    def _flush(self, sock: socket.socket) -> None:
+        """Write every packet paho has queued since the last flush."""
+        corked = _set_cork(sock, True)
+        try:
+            self._client.loop_write()
+        finally:
+            if corked:
+                _set_cork(sock, False)
+
+    async def _misc_loop(self) -> None:
+        # Keepalive PINGREQs and retry handling
+        while self._client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1.0)
+
+    async def _reconnect_loop(self) -> None:
+        """Reconnect after an unrequested disconnect, backing off up to ``RECONNECT_MAX_DELAY_S``.
+
+        paho re-sends unacknowledged QoS 1 publishes once the session is back,
+        and ``_on_socket_open`` re-registers the reader and keepalive task.
+        """
+        delay = RECONNECT_MIN_DELAY_S
+        try:
+            while not self._stopping:
+                await asyncio.sleep(delay)
+                try:
+                    # Runs on the loop: paho's socket callbacks must fire here.
+                    # A broker that is down refuses the connect straight away.
+                    self._client.reconnect()
+                    return
+                except OSError:
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY_S)
+        finally:
+            self._reconnect = None
+
+
+def _set_cork(sock: socket.socket, on: bool) -> bool:
+    cork = getattr(socket, "TCP_CORK", None)
+    if cork is None:
+        return False
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, cork, 1 if on else 0)
+        return True
+    except OSError:
+        return False
+
+
+def create_transport(kind: str, client: mqtt.Client) -> ThreadTransport | AsyncioTransport:
+    """Return the transport named by ``kind`` (see ``TRANSPORTS``)."""
+    if kind == "asyncio":
+        return AsyncioTransport(client, asyncio.get_running_loop())
+    if kind == "thread":
+        return ThreadTransport(client)
+    raise ValueError(f"Unknown MQTT transport {kind!r}; expected one of {TRANSPORTS}")
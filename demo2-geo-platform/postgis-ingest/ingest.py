@@ -1,7 +1,19 @@
 """PostGIS ingest worker for MQTT sensor telemetry.
 
 Subscribes to the Azure IoT Operations pipeline topic and persists each
-message into the `sensor_telemetry` PostGIS table.
+message into the `sensor_telemetry` PostGIS table. Messages are either a
+single flattened reading or a columnar envelope of many readings (see
+`ENVELOPE_SCHEMA`), which is unpacked into one row per reading.
+
+Rows are buffered and written in batches, each as one binary
+`COPY ... FROM STDIN` in its own transaction. A batch is flushed once it holds
+`INGEST_BATCH_ROWS` rows, once half of `MQTT_RECEIVE_MAXIMUM` messages are
+waiting on it, or `INGEST_FLUSH_MS` after its first message arrived. Messages
+are acknowledged only after the transaction holding their rows commits, so a
+crash or failed write leaves them for the broker to redeliver (at-least-once).
+That relies on the broker keeping the session across a restart: the client
+ID is stable (the pod or container hostname) and the session outlives the
+connection by `MQTT_SESSION_EXPIRY_S`.
 """
 
 from __future__ import annotations
@@ -10,16 +22,20 @@ import json
 import logging
 import os
 import signal
+import socket
+import struct
 import sys
 import threading
 import time
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Any, Optional
-from uuid import uuid4
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Optional
 
 import paho.mqtt.client as mqtt
 import psycopg
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 from psycopg.types.json import Jsonb
 from pythonjsonlogger import jsonlogger
 
@@ -29,7 +45,13 @@ MQTT_PORT = int(os.environ.get("MQTT_PORT", "1883"))
 MQTT_USERNAME = os.environ.get("MQTT_USERNAME", "")
 MQTT_PASSWORD = os.environ.get("MQTT_PASSWORD", "")
 MQTT_TOPIC = os.environ.get("MQTT_TOPIC", "geoint/pipelines/sensor-telemetry")
-MQTT_CLIENT_ID = os.environ.get("MQTT_CLIENT_ID", f"postgis-ingest-{uuid4().hex[:8]}")
+# Must survive restarts so the broker resumes the session and redelivers
+# whatever was left unacknowledged
+MQTT_CLIENT_ID = os.environ.get("MQTT_CLIENT_ID") or f"postgis-ingest-{socket.gethostname()}"
+# How long the broker keeps the session (and unacked messages) while disconnected
+MQTT_SESSION_EXPIRY_S = int(os.environ.get("MQTT_SESSION_EXPIRY_S", "3600"))
+# Unacknowledged QoS 1 messages the broker may have outstanding (1-65535)
+MQTT_RECEIVE_MAXIMUM = min(max(int(os.environ.get("MQTT_RECEIVE_MAXIMUM", "2000")), 1), 65535)
 
 POSTGRES_HOST = os.environ.get("POSTGRES_HOST", "postgis")
 POSTGRES_PORT = int(os.environ.get("POSTGRES_PORT", "5432"))
@@ -38,6 +60,12 @@ POSTGRES_USER = os.environ.get("POSTGRES_USER", "geoint")
 POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD", "geoint_demo_2026")
 POSTGRES_CONNECT_RETRY_SECONDS = int(os.environ.get("POSTGRES_CONNECT_RETRY_SECONDS", "5"))
 
+INGEST_BATCH_ROWS = int(os.environ.get("INGEST_BATCH_ROWS", "5000"))
+INGEST_FLUSH_MS = int(os.environ.get("INGEST_FLUSH_MS", "250"))
+
+# Columnar multi-reading payload published by the simulator in envelope mode
+ENVELOPE_SCHEMA = "geoint.telemetry.envelope/v1"
+
 INSERT_SQL = """
 INSERT INTO sensor_telemetry (
     sensor_id,
@@ -63,6 +91,29 @@ VALUES (
 );
 """
 
+COPY_SQL = """
+COPY sensor_telemetry (
+    sensor_id,
+    sensor_type,
+    grid_ref,
+    recorded_at,
+    lat,
+    lon,
+    geom,
+    is_alert,
+    reading
+)
+FROM STDIN (FORMAT BINARY)
+"""
+
+# Binary wire type of each COPY_SQL column. geom is sent as EWKB, which is
+# what PostGIS's binary input reads, so no per-row ST_GeomFromEWKT is needed.
+COPY_TYPES = ["text", "text", "text", "timestamptz", "float8", "float8", "bytea", "bool", "jsonb"]
+
+# Little-endian EWKB point with an SRID: byte order, type | SRID flag, SRID, x, y
+_EWKB_POINT = struct.Struct("<BIIdd")
+_EWKB_POINT_WITH_SRID = 0x20000001
+
 
 def configure_logging() -> None:
     handler = logging.StreamHandler(sys.stdout)
@@ -101,10 +152,46 @@ class SensorRecord:
             "reading": Jsonb(self.reading) if self.reading is not None else None,
         }
 
+    @property
+    def geom_ewkb(self) -> Optional[bytes]:
+        if self.geom_ewkt is None or self.lat is None or self.lon is None:
+            return None
+        return _EWKB_POINT.pack(1, _EWKB_POINT_WITH_SRID, 4326, self.lon, self.lat)
+
+    @property
+    def as_copy_row(self) -> tuple[Any, ...]:
+        """Values in COPY_SQL column order."""
+        # COPY gets no server-side casts, so ids that arrived as JSON numbers
+        # are sent as text here
+        return (
+            str(self.sensor_id),
+            str(self.sensor_type),
+            None if self.grid_ref is None else str(self.grid_ref),
+            self.recorded_at,
+            self.lat,
+            self.lon,
+            self.geom_ewkb,
+            self.is_alert,
+            Jsonb(self.reading) if self.reading is not None else None,
+        )
+
 
 class PostgisWriter:
+    """Buffers records and writes each batch with one binary COPY.
+
+    ``add`` is called from the MQTT network thread; a flusher thread owns the
+    connection and does all the writing.
+    """
+
     def __init__(self) -> None:
         self._conn: Optional[psycopg.Connection] = None
+        self._cond = threading.Condition()
+        self._records: list[SensorRecord] = []
+        # One per buffered message, run once its rows are committed
+        self._acks: list[Callable[[], Any]] = []
+        self._first_at = 0.0
+        self._stopping = False
+        self._flusher: Optional[threading.Thread] = None
 
     def connect(self) -> None:
         dsn = (
@@ -114,17 +201,26 @@ class PostgisWriter:
         while True:
             try:
                 self._conn = psycopg.connect(dsn, autocommit=True)
-                logging.info("Connected to PostGIS", host=POSTGRES_HOST, db=POSTGRES_DB)
+                logging.info("Connected to PostGIS", extra={"host": POSTGRES_HOST, "db": POSTGRES_DB})
                 return
             except psycopg.OperationalError as exc:
                 logging.error(
                     "PostGIS connection failed, retrying",
-                    error=str(exc),
-                    host=POSTGRES_HOST,
+                    extra={"error": str(exc), "host": POSTGRES_HOST},
                 )
                 time.sleep(POSTGRES_CONNECT_RETRY_SECONDS)
 
+    def start(self) -> None:
+        self._flusher = threading.Thread(target=self._run, name="postgis-writer", daemon=True)
+        self._flusher.start()
+
     def close(self) -> None:
+        """Flush what is buffered, then close the connection."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._flusher is not None:
+            self._flusher.join()
         if self._conn and not self._conn.closed:
             self._conn.close()
             logging.info("PostGIS connection closed")
@@ -133,18 +229,100 @@ class PostgisWriter:
         if self._conn is None or self._conn.closed:
             self.connect()
 
-    def insert(self, record: SensorRecord) -> None:
-        self._ensure_connection()
-        assert self._conn is not None  # For mypy/static analyzers
+    def add(self, records: list[SensorRecord], ack: Optional[Callable[[], Any]] = None) -> None:
+        """Buffer one message's records; ``ack`` runs after they are committed."""
+        with self._cond:
+            first = not self._records and not self._acks
+            if first:
+                self._first_at = time.monotonic()
+            self._records.extend(records)
+            if ack is not None:
+                self._acks.append(ack)
+            # The first message starts the flush timer
+            if first or self._full():
+                self._cond.notify()
+
+    def _full(self) -> bool:
+        # The broker stops sending at MQTT_RECEIVE_MAXIMUM unacked messages;
+        # flushing at half keeps the other half arriving during the write
+        return len(self._records) >= INGEST_BATCH_ROWS or len(self._acks) >= max(1, MQTT_RECEIVE_MAXIMUM // 2)
+
+    def _run(self) -> None:
+        flush_s = INGEST_FLUSH_MS / 1000.0
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if not self._records and not self._acks:
+                        self._cond.wait()
+                        continue
+                    remaining = self._first_at + flush_s - time.monotonic()
+                    if remaining <= 0 or self._full():
+                        break
+                    self._cond.wait(remaining)
+                records, acks = self._records, self._acks
+                self._records, self._acks = [], []
+                stopping = self._stopping
+            if records:
+                started = time.monotonic()
+                self._write(records)
+                logging.debug(
+                    "Ingested sensor telemetry",
+                    extra={
+                        "rows": len(records),
+                        "messages": len(acks),
+                        "ms": round((time.monotonic() - started) * 1000, 1),
+                    },
+                )
+            for ack in acks:
+                ack()
+            if stopping:
+                return
+
+    def _retrying(self, work: Callable[[psycopg.Connection], None]) -> None:
+        """Run ``work``, reconnecting and retrying while the connection is at fault."""
+        while True:
+            self._ensure_connection()
+            assert self._conn is not None  # For mypy/static analyzers
+            try:
+                work(self._conn)
+                return
+            except psycopg.OperationalError as exc:
+                logging.error("PostGIS write failed, reconnecting", extra={"error": str(exc)})
+                self.connect()
+
+    def _write(self, records: list[SensorRecord]) -> None:
+        rows = [record.as_copy_row for record in records]
+
+        def copy_batch(conn: psycopg.Connection) -> None:
+            with conn.transaction(), conn.cursor() as cur, cur.copy(COPY_SQL) as copy:
+                copy.set_types(COPY_TYPES)
+                for row in rows:
+                    copy.write_row(row)
+
         try:
-            with self._conn.cursor() as cur:
-                cur.execute(INSERT_SQL, record.as_params)
-        except psycopg.Error as exc:
-            logging.error("Insert failed, reconnecting", error=str(exc))
-            self.connect()
-            with self._conn.cursor() as cur:
+            self._retrying(copy_batch)
+        except Exception as exc:  # Rejected by PostGIS, or a value COPY could not encode
+            # Retrying the batch would fail forever, so isolate the bad rows
+            logging.warning(
+                "Batch COPY rejected, inserting rows one at a time",
+                extra={"error": str(exc), "rows": len(records)},
+            )
+            for record in records:
+                self._insert(record)
+
+    def _insert(self, record: SensorRecord) -> None:
+        def insert_row(conn: psycopg.Connection) -> None:
+            with conn.cursor() as cur:
                 cur.execute(INSERT_SQL, record.as_params)
 
+        try:
+            self._retrying(insert_row)
+        except Exception as exc:  # Keep the flusher alive; the row is lost either way
+            logging.warning(
+                "Dropping row rejected by PostGIS",
+                extra={"error": str(exc), "sensor_id": record.sensor_id},
+            )
+
 
 def parse_float(value: Any) -> Optional[float]:
     if value is None:
@@ -161,13 +339,16 @@ def parse_timestamp(raw: Any) -> Optional[datetime]:
     if isinstance(raw, datetime):
         return raw
     if isinstance(raw, (int, float)):
-        return datetime.fromtimestamp(float(raw))
+        return datetime.fromtimestamp(float(raw), tz=timezone.utc)
     if isinstance(raw, str):
         normalized = raw.strip().replace("Z", "+00:00")
         try:
-            return datetime.fromisoformat(normalized)
+            parsed = datetime.fromisoformat(normalized)
         except ValueError:
             return None
+        # Binary COPY sends an instant, so pin naive values to UTC as the
+        # server's default TimeZone would have
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
     return None
 
 
@@ -185,68 +366,147 @@ def coerce_json(value: Any) -> Optional[dict[str, Any]]:
     return None
 
 
-def build_record(payload: bytes) -> SensorRecord:
-    try:
-        message = json.loads(payload.decode("utf-8"))
-    except json.JSONDecodeError as exc:
-        raise ValueError(f"Invalid JSON payload: {exc}") from exc
-
-    sensor_id = message.get("sensor_id")
-    sensor_type = message.get("sensor_type")
+def _make_record(
+    sensor_id: Any,
+    sensor_type: Any,
+    grid_ref: Any,
+    recorded_at: Any,
+    raw_lat: Any,
+    raw_lon: Any,
+    is_alert: Any,
+    reading: Any,
+) -> SensorRecord:
     if not sensor_id or not sensor_type:
         raise ValueError("sensor_id and sensor_type are required")
 
-    lat = parse_float(message.get("lat"))
-    lon = parse_float(message.get("lon"))
+    lat = parse_float(raw_lat)
+    lon = parse_float(raw_lon)
     geom = None
     if lat is not None and lon is not None:
         geom = f"SRID=4326;POINT({lon} {lat})"
 
-    reading_payload = message.get("reading_json") or message.get("reading")
-    record = SensorRecord(
+    return SensorRecord(
         sensor_id=sensor_id,
         sensor_type=sensor_type,
-        grid_ref=message.get("grid_ref"),
-        recorded_at=parse_timestamp(message.get("recorded_at")),
+        grid_ref=grid_ref,
+        recorded_at=parse_timestamp(recorded_at),
         lat=lat,
         lon=lon,
         geom_ewkt=geom,
-        is_alert=bool(message.get("is_alert", message.get("alert", False))),
-        reading=coerce_json(reading_payload),
+        is_alert=bool(is_alert),
+        reading=coerce_json(reading),
     )
-    return record
 
 
-def on_connect(client: mqtt.Client, userdata: Any, flags: dict[str, Any], rc: int) -> None:
-    if rc == 0:
-        logging.info("Connected to MQTT broker", host=MQTT_HOST, port=MQTT_PORT)
-        client.subscribe(MQTT_TOPIC, qos=1)
-        logging.info("Subscribed to topic", topic=MQTT_TOPIC)
-    else:
-        logging.error("MQTT connection failed", return_code=rc)
+def records_from_envelope(message: dict[str, Any]) -> list[SensorRecord]:
+    """Unpack a columnar envelope into one record per reading."""
+    count = message.get("count")
+    sensor_ids = message.get("sensor_id") or []
+    if not isinstance(count, int) or len(sensor_ids) != count:
+        raise ValueError("Envelope count does not match sensor_id column")
 
+    columns: dict[str, list[Any]] = {
+        name: message.get(name) or [None] * count
+        for name in ("grid_ref", "lat", "lon", "alert")
+    }
+    readings: dict[str, list[Any]] = message.get("reading") or {}
+    for name, values in (*columns.items(), *readings.items()):
+        if not isinstance(values, list) or len(values) != count:
+            raise ValueError(f"Envelope column {name!r} does not have {count} values")
 
-def on_disconnect(client: mqtt.Client, userdata: Any, rc: int) -> None:
-    if rc != 0:
-        logging.warning("Unexpected MQTT disconnect", return_code=rc)
+    sensor_type = message.get("sensor_type")
+    recorded_at = parse_timestamp(message.get("timestamp"))
+    fields = list(readings)
+    return [
+        _make_record(
+            sensor_ids[i],
+            sensor_type,
+            columns["grid_ref"][i],
+            recorded_at,
+            columns["lat"][i],
+            columns["lon"][i],
+            columns["alert"][i],
+            {name: readings[name][i] for name in fields},
+        )
+        for i in range(count)
+    ]
+
+
+def build_records(payload: bytes) -> list[SensorRecord]:
+    try:
+        message = json.loads(payload.decode("utf-8"))
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid JSON payload: {exc}") from exc
+    if not isinstance(message, dict):
+        raise ValueError("Payload must be a JSON object")
+
+    if message.get("schema") == ENVELOPE_SCHEMA:
+        return records_from_envelope(message)
+
+    return [
+        _make_record(
+            message.get("sensor_id"),
+            message.get("sensor_type"),
+            message.get("grid_ref"),
+            message.get("recorded_at"),
+            message.get("lat"),
+            message.get("lon"),
+            message.get("is_alert", message.get("alert", False)),
+            message.get("reading_json") or message.get("reading"),
+        )
+    ]
+
+
+def on_connect(
+    client: mqtt.Client,
+    userdata: Any,
+    flags: Any,
+    reason_code: Any,
+    properties: Any = None,
+) -> None:
+    if reason_code == 0:
+        logging.info("Connected to MQTT broker", extra={"host": MQTT_HOST, "port": MQTT_PORT})
+        client.subscribe(MQTT_TOPIC, qos=1)
+        logging.info("Subscribed to topic", extra={"topic": MQTT_TOPIC})
+    else:
+        logging.error("MQTT connection failed", extra={"reason_code": str(reason_code)})
+
+
+def on_disconnect(
+    client: mqtt.Client,
+    userdata: Any,
+    flags: Any,
+    reason_code: Any,
+    properties: Any = None,
+) -> None:
+    if reason_code != 0:
+        logging.warning("Unexpected MQTT disconnect", extra={"reason_code": str(reason_code)})
     else:
         logging.info("MQTT disconnected")
 
 
 def on_message(client: mqtt.Client, userdata: Any, msg: mqtt.MQTTMessage) -> None:
     writer: PostgisWriter = userdata["writer"]
+    records: list[SensorRecord] = []
     try:
-        record = build_record(msg.payload)
-        writer.insert(record)
-        logging.debug("Ingested sensor telemetry", sensor_id=record.sensor_id, topic=msg.topic)
+        records = build_records(msg.payload)
     except ValueError as exc:
-        logging.warning("Dropping invalid payload", error=str(exc))
+        logging.warning("Dropping invalid payload", extra={"error": str(exc)})
     except Exception as exc:  # Catch-all to keep MQTT loop alive
-        logging.exception("Unexpected error while processing message", error=str(exc))
+        logging.exception("Unexpected error while processing message", extra={"error": str(exc)})
+    # Dropped messages are acked through the writer too, so acks go out in
+    # the order the messages arrived
+    writer.add(records, partial(client.ack, msg.mid, msg.qos))
 
 
 def build_mqtt_client(writer: PostgisWriter) -> mqtt.Client:
-    client = mqtt.Client(client_id=MQTT_CLIENT_ID, protocol=mqtt.MQTTv311)
+    # Acks are sent by the writer once a message's rows are committed
+    client = mqtt.Client(
+        mqtt.CallbackAPIVersion.VERSION2,
+        client_id=MQTT_CLIENT_ID,
+        protocol=mqtt.MQTTv5,
+        manual_ack=True,
+    )
     if MQTT_USERNAME:
         client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
     client.user_data_set({"writer": writer})
@@ -254,7 +514,12 @@ def build_mqtt_client(writer: PostgisWriter) -> mqtt.Client:
     client.on_disconnect = on_disconnect
     client.on_message = on_message
     client.reconnect_delay_set(min_delay=1, max_delay=60)
-    client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
+    properties = Properties(PacketTypes.CONNECT)
+    properties.ReceiveMaximum = MQTT_RECEIVE_MAXIMUM
+    properties.SessionExpiryInterval = MQTT_SESSION_EXPIRY_S
+    # Resume the previous session, so messages delivered but never acked
+    # before a crash or disconnect are sent again
+    client.connect(MQTT_HOST, MQTT_PORT, keepalive=60, clean_start=False, properties=properties)
     return client
 
 
@@ -262,14 +527,14 @@ def main() -> None:
     configure_logging()
     writer = PostgisWriter()
     writer.connect()
+    writer.start()
 
     mqtt_client = build_mqtt_client(writer)
     stop_event = threading.Event()
 
     def handle_signal(signum: int, _frame: Any) -> None:
-        logging.info("Received shutdown signal", signal=signum)
+        logging.info("Received shutdown signal", extra={"signal": signum})
         stop_event.set()
-        mqtt_client.disconnect()
 
     signal.signal(signal.SIGINT, handle_signal)
     signal.signal(signal.SIGTERM, handle_signal)
@@ -279,8 +544,10 @@ def main() -> None:
         while not stop_event.is_set():
             time.sleep(1)
     finally:
-        mqtt_client.loop_stop()
+        # Flush and ack what is buffered before leaving the broker
         writer.close()
+        mqtt_client.disconnect()
+        mqtt_client.loop_stop()
         logging.info("PostGIS ingest worker stopped")
 
 
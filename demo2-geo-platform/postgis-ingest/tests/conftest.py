@@ -0,0 +1,8 @@
+"""Make ``ingest`` importable, as the Docker image does by copying it into /app."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,134 @@
+"""Unpacking columnar telemetry envelopes into one record per reading."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import pytest
+
+import ingest
+from ingest import SensorRecord, build_records
+
+
+def _envelope(**overrides: Any) -> bytes:
+    """Shaped as the simulator's ``_encode_envelope`` publishes it."""
+    message = {
+        "schema": ingest.ENVELOPE_SCHEMA,
+        "sensor_type": "seismic",
+        "timestamp": "2026-01-01T00:00:00Z",
+        "count": 2,
+        "sensor_id": ["s-1", "s-2"],
+        "grid_ref": ["33U 1 1", "33U 1 2"],
+        "lat": [51.5, 51.6],
+        "lon": [-0.1, -0.2],
+        "reading": {"magnitude": [3.1, 0.2], "depth_m": [10.0, 12.5]},
+        "alert": [True, False],
+    }
+    message.update(overrides)
+    return json.dumps(message).encode()
+
+
+def test_envelope_unpacks_one_record_per_reading() -> None:
+    first, second = build_records(_envelope())
+    assert (first.sensor_id, first.grid_ref, first.lat, first.lon) == ("s-1", "33U 1 1", 51.5, -0.1)
+    assert first.is_alert
+    assert first.reading == {"magnitude": 3.1, "depth_m": 10.0}
+    assert first.geom_ewkt == "SRID=4326;POINT(-0.1 51.5)"
+    assert (second.sensor_id, second.is_alert, second.reading) == ("s-2", False, {"magnitude": 0.2, "depth_m": 12.5})
+    # Type and timestamp are shared by every reading in the envelope
+    recorded_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert {(r.sensor_type, r.recorded_at) for r in (first, second)} == {("seismic", recorded_at)}
+
+
+def test_envelope_without_optional_columns() -> None:
+    records = build_records(_envelope(grid_ref=None, lat=None, lon=None, alert=None, reading=None))
+    assert [r.sensor_id for r in records] == ["s-1", "s-2"]
+    assert all(r.grid_ref is None and r.geom_ewkt is None and not r.is_alert for r in records)
+    # An envelope of a type without reading fields still yields empty readings
+    assert [r.reading for r in records] == [{}, {}]
+
+
+def test_empty_envelope_has_no_records() -> None:
+    assert build_records(_envelope(count=0, sensor_id=[], grid_ref=[], lat=[], lon=[], reading={}, alert=[])) == []
+
+
+@pytest.mark.parametrize(
+    "overrides, error",
+    [
+        ({"count": 3}, "count does not match"),
+        ({"count": "2"}, "count does not match"),
+        ({"sensor_id": ["s-1"]}, "count does not match"),
+        ({"lat": [51.5]}, "'lat' does not have 2 values"),
+        ({"alert": "true"}, "'alert' does not have 2 values"),
+        ({"reading": {"magnitude": [3.1]}}, "'magnitude' does not have 2 values"),
+    ],
+)
+def test_misaligned_envelope_is_rejected(overrides: dict[str, Any], error: str) -> None:
+    with pytest.raises(ValueError, match=error):
+        build_records(_envelope(**overrides))
+
+
+def test_envelope_reading_without_sensor_id_is_rejected() -> None:
+    with pytest.raises(ValueError, match="required"):
+        build_records(_envelope(sensor_id=["s-1", None]))
+
+
+def test_single_reading_is_still_one_record() -> None:
+    [record] = build_records(
+        json.dumps(
+            {
+                "sensor_id": "s-1",
+                "sensor_type": "seismic",
+                "recorded_at": "2026-01-01T00:00:00Z",
+                "lat": "51.5",
+                "lon": "-0.1",
+                "alert": True,
+                "reading_json": '{"magnitude": 3.1}',
+            }
+        ).encode()
+    )
+    assert (record.lat, record.is_alert, record.reading) == (51.5, True, {"magnitude": 3.1})
+
+
+class FakeWriter:
+    def __init__(self) -> None:
+        self.added: list[tuple[list[SensorRecord], Optional[Callable[[], Any]]]] = []
+
+    def add(self, records: list[SensorRecord], ack: Optional[Callable[[], Any]] = None) -> None:
+        self.added.append((records, ack))
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.acked: list[tuple[int, int]] = []
+
+    def ack(self, mid: int, qos: int) -> None:
+        self.acked.append((mid, qos))
+
+
+def _deliver(payload: bytes, mid: int) -> ingest.mqtt.MQTTMessage:
+    msg = ingest.mqtt.MQTTMessage(mid, ingest.MQTT_TOPIC.encode())
+    msg.payload = payload
+    msg.qos = 1
+    return msg
+
+
+def test_on_message_buffers_every_envelope_reading_under_one_ack() -> None:
+    writer, client = FakeWriter(), FakeClient()
+    ingest.on_message(client, {"writer": writer}, _deliver(_envelope(), 5))
+    [(records, ack)] = writer.added
+    assert [r.sensor_id for r in records] == ["s-1", "s-2"]
+    assert ack is not None and client.acked == []
+    ack()
+    assert client.acked == [(5, 1)]
+
+
+def test_on_message_drops_a_bad_envelope_but_still_acks_it() -> None:
+    writer, client = FakeWriter(), FakeClient()
+    ingest.on_message(client, {"writer": writer}, _deliver(_envelope(count=3), 6))
+    [(records, ack)] = writer.added
+    assert records == [] and ack is not None
+    ack()
+    assert client.acked == [(6, 1)]
@@ -0,0 +1,215 @@
+"""Batched binary COPY writes, and acks that wait for the commit."""
+
+from __future__ import annotations
+
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timezone
+from typing import Any, Callable, Iterator, Optional
+
+import psycopg
+import pytest
+
+import ingest
+from ingest import PostgisWriter, SensorRecord
+
+
+class FakeDatabase:
+    """Stands in for PostGIS behind ``psycopg.connect``.
+
+    Errors in ``copy_errors`` are raised by successive COPYs; INSERTs of a
+    sensor in ``rejected`` fail as PostGIS would reject a bad value.
+    """
+
+    def __init__(self) -> None:
+        self.batches: list[list[tuple[Any, ...]]] = []
+        self.inserted: list[dict[str, Any]] = []
+        self.events: list[str] = []
+        self.types: Optional[list[str]] = None
+        self.copy_errors: list[Exception] = []
+        self.rejected: set[str] = set()
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def connect(self, _dsn: str, autocommit: bool = False) -> FakeConnection:
+        assert autocommit
+        self.connections += 1
+        return FakeConnection(self)
+
+    def record(self, event: str) -> None:
+        with self._lock:
+            self.events.append(event)
+
+
+class FakeCopy:
+    def __init__(self, db: FakeDatabase, rows: list[tuple[Any, ...]]) -> None:
+        self.db = db
+        self.rows = rows
+
+    def set_types(self, types: list[str]) -> None:
+        self.db.types = list(types)
+
+    def write_row(self, row: tuple[Any, ...]) -> None:
+        assert self.db.types is not None and len(row) == len(self.db.types)
+        self.rows.append(row)
+
+
+class FakeCursor:
+    def __init__(self, conn: FakeConnection) -> None:
+        self.conn = conn
+        self.db = conn.db
+
+    @contextmanager
+    def copy(self, sql: str) -> Iterator[FakeCopy]:
+        assert sql == ingest.COPY_SQL
+        rows: list[tuple[Any, ...]] = []
+        yield FakeCopy(self.db, rows)
+        if self.db.copy_errors:
+            error = self.db.copy_errors.pop(0)
+            if isinstance(error, psycopg.OperationalError):
+                self.conn.closed = True
+            raise error
+        self.db.batches.append(rows)
+
+    def execute(self, sql: str, params: dict[str, Any]) -> None:
+        assert sql == ingest.INSERT_SQL
+        if params["sensor_id"] in self.db.rejected:
+            raise psycopg.DataError("invalid input syntax")
+        self.db.inserted.append(params)
+
+
+class FakeConnection:
+    def __init__(self, db: FakeDatabase) -> None:
+        self.db = db
+        self.closed = False
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        yield
+        self.db.record("commit")
+
+    @contextmanager
+    def cursor(self) -> Iterator[FakeCursor]:
+        yield FakeCursor(self)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def db(monkeypatch: pytest.MonkeyPatch) -> FakeDatabase:
+    fake = FakeDatabase()
+    monkeypatch.setattr(ingest.psycopg, "connect", fake.connect)
+    # Only a full batch or close() flushes unless a test shortens the window
+    monkeypatch.setattr(ingest, "INGEST_FLUSH_MS", 60_000)
+    return fake
+
+
+@pytest.fixture
+def writer(db: FakeDatabase) -> Iterator[PostgisWriter]:
+    w = PostgisWriter()
+    w.connect()
+    w.start()
+    yield w
+    w.close()
+
+
+def _records(*sensor_ids: str) -> list[SensorRecord]:
+    return [
+        ingest._make_record(sensor_id, "seismic", "33U 1 1", "2026-01-01T00:00:00Z", 51.5, -0.1, False, {"m": 1.0})
+        for sensor_id in sensor_ids
+    ]
+
+
+def _ack(db: FakeDatabase, mid: int) -> Callable[[], None]:
+    return lambda: db.record(f"ack:{mid}")
+
+
+def _wait_for(predicate: Callable[[], bool], timeout_s: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout_s
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_buffered_messages_are_one_copy_acked_after_commit(db: FakeDatabase, writer: PostgisWriter) -> None:
+    writer.add(_records("s-1", "s-2"), _ack(db, 1))
+    writer.add(_records("s-3"), _ack(db, 2))
+    writer.close()
+    [batch] = db.batches
+    assert [row[0] for row in batch] == ["s-1", "s-2", "s-3"]
+    assert db.types == ingest.COPY_TYPES
+    assert db.events == ["commit", "ack:1", "ack:2"]
+
+
+def test_full_batch_is_written_without_waiting_for_the_window(
+    db: FakeDatabase, writer: PostgisWriter, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ingest, "INGEST_BATCH_ROWS", 3)
+    writer.add(_records("s-1", "s-2"), _ack(db, 1))
+    writer.add(_records("s-3"), _ack(db, 2))
+    assert _wait_for(lambda: db.events == ["commit", "ack:1", "ack:2"])
+
+
+def test_half_the_receive_maximum_flushes_unwritten_acks(
+    db: FakeDatabase, writer: PostgisWriter, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ingest, "MQTT_RECEIVE_MAXIMUM", 4)
+    # Dropped payloads carry no rows but still hold a receive slot until acked
+    writer.add([], _ack(db, 1))
+    writer.add([], _ack(db, 2))
+    assert _wait_for(lambda: db.events == ["ack:1", "ack:2"])
+    assert db.batches == []
+
+
+def test_window_flushes_a_partial_batch(db: FakeDatabase, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ingest, "INGEST_FLUSH_MS", 20)
+    w = PostgisWriter()
+    w.connect()
+    w.start()
+    try:
+        w.add(_records("s-1"), _ack(db, 1))
+        assert _wait_for(lambda: db.events == ["commit", "ack:1"])
+    finally:
+        w.close()
+
+
+def test_lost_connection_reconnects_and_rewrites_the_batch(db: FakeDatabase, writer: PostgisWriter) -> None:
+    db.copy_errors = [psycopg.OperationalError("server closed the connection unexpectedly")]
+    writer.add(_records("s-1", "s-2"), _ack(db, 1))
+    writer.close()
+    assert db.connections == 2
+    assert [[row[0] for row in batch] for batch in db.batches] == [["s-1", "s-2"]]
+    assert db.events == ["commit", "ack:1"]
+
+
+def test_rejected_batch_falls_back_to_row_inserts(db: FakeDatabase, writer: PostgisWriter) -> None:
+    db.copy_errors = [psycopg.DataError("invalid input syntax")]
+    db.rejected = {"s-2"}
+    writer.add(_records("s-1", "s-2", "s-3"), _ack(db, 1))
+    writer.close()
+    # Only the bad row is lost; the message is still acked so it is not redelivered forever
+    assert [params["sensor_id"] for params in db.inserted] == ["s-1", "s-3"]
+    assert db.batches == [] and db.events == ["ack:1"]
+
+
+def test_copy_row_is_typed_for_binary_copy() -> None:
+    [record] = ingest.build_records(
+        b'{"sensor_id": 7, "sensor_type": "seismic", "recorded_at": "2026-01-01T00:00:00",'
+        b' "lat": 51.5, "lon": -0.1, "reading": {"m": 1.0}}'
+    )
+    row = record.as_copy_row
+    assert len(row) == len(ingest.COPY_TYPES)
+    assert row[0] == "7"
+    assert row[3].tzinfo == timezone.utc
+    assert struct.unpack("<BIIdd", row[6]) == (1, 0x20000001, 4326, -0.1, 51.5)
+    assert row[8].obj == {"m": 1.0}
+
+
+def test_copy_row_without_position_has_no_geometry() -> None:
+    record = ingest._make_record("s-1", "seismic", None, None, None, -0.1, False, None)
+    assert record.as_copy_row[6] is None